@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+import time
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+from chip8.batch import load_manifest, run_batch
+
+
+def main():
+    # noinspection PyTypeChecker
+    parser = ArgumentParser(description="Run many CHIP-8 ROMs headlessly on a process pool",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("manifest", type=str, help="JSON manifest of jobs")
+    parser.add_argument("--workers", metavar='n', type=int, default=None,
+                        help="Number of worker processes (default: one per core)")
+    parser.add_argument("--output", metavar='file', type=str, default=None,
+                        help="Also write the results as JSON lines")
+    parser.add_argument("--previews", metavar='directory', type=str, default=None,
+                        help="Export an animated GIF of every job that doesn't name its own export")
+    args = parser.parse_args()
+
+    jobs = load_manifest(args.manifest)
+    if args.previews is not None:
+        os.makedirs(args.previews, exist_ok=True)
+        for job in jobs:
+            if job.export is None:
+                job.export = os.path.join(args.previews, os.path.splitext(job.name)[0] + ".gif")
+    output = open(args.output, "w") if args.output else None
+    errors = 0
+    start = time.perf_counter()
+    try:
+        for result in run_batch(jobs, args.workers):
+            line = json.dumps(result)
+            print(line, flush=True)
+            if output:
+                output.write(line + "\n")
+            errors += result['error'] is not None
+    finally:
+        if output:
+            output.close()
+    print(f"{len(jobs)} jobs in {time.perf_counter() - start:.2f} s, {errors} failed", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
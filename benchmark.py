@@ -0,0 +1,198 @@
+import json
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from chip8.chip8 import Chip8
+from chip8.cpu import UnknownInstruction
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ROM_DIRECTORIES = ["roms/games", "roms/demos", "roms/programs"]
+KEYS = [0x5, 0x4, 0x6, 0x8, 0x2, 0x0, 0xa, 0x1]
+STARTUP_COMMANDS = {
+    'python': ["-c", "pass"],
+    'import chip8.cpu': ["-c", "import chip8.cpu"],
+    'headless Chip8': ["-c", "from chip8.chip8 import Chip8; Chip8(1, 10, 0x200, headless=True)"],
+    'main.py --help': ["main.py", "--help"],
+}
+
+
+def find_roms(paths: List[str]) -> List[Path]:
+    roms = []
+    for path in map(Path, paths):
+        roms += sorted(path.glob("*.ch8")) if path.is_dir() else [path]
+    return roms
+
+
+def benchmark_rom(path: str, instructions: int, cycles_per_frame: int, jit: bool, timeout: float) -> Dict:
+    """
+    Runs a ROM headlessly at full speed until it has executed the given number of instructions. Whenever the ROM
+    waits for a keypress, a key is pressed and released so that it keeps going.
+    """
+    chip8 = Chip8(scaling_factor=1, cycles_per_frame=cycles_per_frame, starting_address=0x200, headless=True, jit=jit)
+    with open(path, "rb") as f:
+        chip8.load(f.read())
+
+    error = None
+    keypresses = 0
+    start = time.perf_counter()
+    deadline = start + timeout
+    try:
+        while chip8.cycles < instructions and time.perf_counter() < deadline:
+            if chip8.cpu.waiting_for_keypress:
+                key = KEYS[keypresses % len(KEYS)]
+                chip8.press_key(key)
+                chip8.release_key(key)
+                keypresses += 1
+            chip8.tick()
+    except (UnknownInstruction, IndexError) as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+
+    return {
+        'rom': str(path),
+        'instructions': chip8.cycles,
+        'seconds': elapsed,
+        'instructions_per_second': chip8.cycles / elapsed if elapsed else 0.0,
+        'draws': chip8.draws,
+        'frames': chip8.frames,
+        'frame_time_ms': elapsed / chip8.frames * 1000 if chip8.frames else 0.0,
+        'peak_memory_kb': peak_memory_kb(),
+        'error': error
+    }
+
+
+def benchmark_startup(runs: int) -> Dict[str, float]:
+    """
+    Runs every startup command in fresh interpreters and returns its median wall time in milliseconds, including
+    the interpreter's own startup, which 'python' measures on its own.
+    """
+    results = {}
+    for name, arguments in STARTUP_COMMANDS.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *arguments], check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        results[name] = statistics.median(times) * 1000
+    return results
+
+
+def peak_memory_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run(roms: List[Path], instructions: int, cycles_per_frame: int, jit: bool, timeout: float) -> List[Dict]:
+    """
+    Benchmarks every ROM in a fresh worker process, one at a time, so that timings do not compete for cores and
+    peak memory is measured per ROM.
+    """
+    results = []
+    with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+        for rom in roms:
+            result = pool.apply(benchmark_rom, (str(rom), instructions, cycles_per_frame, jit, timeout))
+            print_result(result)
+            results.append(result)
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[Dict]:
+    """
+    Returns a comparison for every ROM present in both runs. A ROM has regressed when its instructions per second
+    dropped by more than the tolerance, given as a fraction of the baseline.
+    """
+    baseline_by_rom = {result['rom']: result for result in baseline}
+    comparisons = []
+    for result in results:
+        before = baseline_by_rom.get(result['rom'])
+        if before is None or not before['instructions_per_second']:
+            continue
+        change = result['instructions_per_second'] / before['instructions_per_second'] - 1
+        comparisons.append({
+            'rom': result['rom'],
+            'baseline': before['instructions_per_second'],
+            'current': result['instructions_per_second'],
+            'change': change,
+            'regression': change < -tolerance
+        })
+    return comparisons
+
+
+def print_result(result: Dict):
+    error = f"  [{result['error']}]" if result['error'] else ""
+    print(f"{result['instructions_per_second']:>12,.0f} ips {result['draws']:>9} DRW "
+          f"{result['frame_time_ms']:>8.3f} ms/frame {result['peak_memory_kb'] or 0:>8} KB  "
+          f"{Path(result['rom']).name}{error}", flush=True)
+
+
+def print_comparison(comparisons: List[Dict]):
+    for comparison in comparisons:
+        marker = "REGRESSION" if comparison['regression'] else ""
+        print(f"{comparison['baseline']:>12,.0f} -> {comparison['current']:>12,.0f} ips "
+              f"{comparison['change']:>+8.1%}  {Path(comparison['rom']).name}  {marker}")
+
+
+def main():
+    # noinspection PyTypeChecker
+    parser = ArgumentParser(description="CHIP-8 interpreter benchmark", formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("roms", type=str, nargs="*", default=ROM_DIRECTORIES, help="ROM files or directories")
+    parser.add_argument("--instructions", metavar='n', type=float, default=1,
+                        help="Millions of instructions to execute per ROM")
+    parser.add_argument("--cycles-per-frame", metavar='n', type=int, default=10,
+                        help="CPU cycles per frame (at 60 fps)")
+    parser.add_argument("--jit", action="store_true", help="Compile basic blocks into Python functions")
+    parser.add_argument("--timeout", metavar='s', type=float, default=60, help="Maximum seconds per ROM")
+    parser.add_argument("--output", metavar='file', type=str, help="Write the results as JSON")
+    parser.add_argument("--compare", metavar='file', type=str, help="Compare against the results of an earlier run")
+    parser.add_argument("--tolerance", metavar='fraction', type=float, default=0.1,
+                        help="Slowdown relative to the baseline that counts as a regression")
+    parser.add_argument("--startup", metavar='runs', type=int, default=0,
+                        help="Time the startup of the CLI and of headless machines instead, over this many runs")
+    args = parser.parse_args()
+
+    if args.startup:
+        for name, milliseconds in benchmark_startup(args.startup).items():
+            print(f"{milliseconds:>8.1f} ms  {name}")
+        return
+
+    config = {
+        'instructions': int(args.instructions * 1_000_000),
+        'cycles_per_frame': args.cycles_per_frame,
+        'jit': args.jit,
+        'timeout': args.timeout
+    }
+    results = run(find_roms(args.roms), config['instructions'], config['cycles_per_frame'], config['jit'],
+                  config['timeout'])
+
+    total_instructions = sum(result['instructions'] for result in results)
+    total_seconds = sum(result['seconds'] for result in results)
+    if total_seconds:
+        print(f"Total: {total_instructions / total_seconds:,.0f} instructions per second")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparisons = compare(results, baseline['results'], args.tolerance)
+        print_comparison(comparisons)
+        if any(comparison['regression'] for comparison in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
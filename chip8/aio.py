@@ -0,0 +1,84 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+
+from chip8.chip8 import Chip8
+
+Frame = Tuple[int, Tuple[int, ...]]
+
+
+class AsyncChip8(Chip8):
+    """
+    A headless Chip8 whose run() is a coroutine that yields to the event loop after every frame, so that one event
+    loop can host many sessions without a thread each.
+    Key transitions are put on `keys` as (key, pressed) pairs and applied before the next frame starts. Frames come
+    out of stream() as (frame number, rows); a consumer that falls behind skips to the latest `frame_backlog` frames
+    instead of slowing the emulator down.
+    """
+
+    keys: 'asyncio.Queue[Tuple[int, bool]]'
+    frame_backlog: int
+    subscribers: List['asyncio.Queue[Optional[Frame]]']
+    finished: bool
+
+    def __init__(self, cycles_per_frame: int, starting_address: int, turbo: bool = False, frame_backlog: int = 2,
+                 **kwargs):
+        super().__init__(scaling_factor=1, cycles_per_frame=cycles_per_frame, starting_address=starting_address,
+                         headless=True, turbo=turbo, **kwargs)
+        self.keys = asyncio.Queue()
+        self.frame_backlog = frame_backlog
+        self.subscribers = []
+        self.finished = False
+        self.frame_hooks.append(self._publish)
+
+    async def run(self, frames: Optional[int] = None):
+        scheduler = self.scheduler
+        scheduler.restart()
+        self.finished = False
+        try:
+            while frames is None or self.frames < frames:
+                due = 1 if self.turbo else scheduler.due_frames(None if frames is None else frames - self.frames)
+                if not due:
+                    await asyncio.sleep(scheduler.time_until_next_frame())
+                    continue
+                for _ in range(due):
+                    self._apply_keys()
+                    self.tick()
+                    await asyncio.sleep(0)
+        finally:
+            self.finished = True
+            for subscriber in self.subscribers:
+                subscriber.put_nowait(None)
+
+    async def stream(self) -> AsyncIterator[Frame]:
+        """
+        Yields the frames emulated from now on, until run() returns.
+        """
+        if self.finished:
+            return
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.subscribers.remove(queue)
+
+    def _apply_keys(self):
+        keys = self.keys
+        while not keys.empty():
+            key, pressed = keys.get_nowait()
+            if pressed:
+                self.press_key(key)
+            else:
+                self.release_key(key)
+
+    def _publish(self, frame: int, buffer: List[int]):
+        if self.subscribers:
+            rows = tuple(buffer)
+            for subscriber in self.subscribers:
+                if subscriber.qsize() >= self.frame_backlog:
+                    subscriber.get_nowait()
+                subscriber.put_nowait((frame, rows))
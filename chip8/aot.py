@@ -0,0 +1,103 @@
+import hashlib
+import marshal
+import os
+import sys
+from types import ModuleType
+from typing import Optional
+
+from chip8.cpu import CPU
+from chip8.disassembler import disassemble
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+from chip8.jit import JIT, TEMPLATES, TERMINATORS, Block
+
+# Bumped whenever the layout of compiled modules changes. Changes to the JIT's templates change the cache key too.
+AOT_VERSION = 1
+
+
+class AOT(JIT):
+    """
+    Compiles the reachable code of a ROM ahead of time into a Python module, which is cached on disk and imported
+    by later runs instead of translating blocks as they are reached.
+    A block is compiled at every reachable instruction, since frames can end in the middle of a basic block.
+    Anything the static analysis misses, like the targets of Bnnn jumps, and blocks invalidated by self-modifying
+    code are still translated when they are reached, as by the JIT.
+    """
+
+    cache_directory: str
+    module: Optional[ModuleType]
+
+    def __init__(self, cpu: CPU, max_block_length: int = 64, cache_directory: Optional[str] = None):
+        super().__init__(cpu, max_block_length)
+        self.cache_directory = cache_directory or default_cache_directory()
+        self.module = None
+
+    def preload(self, rom: bytes):
+        self.module = load_module(rom, self.cpu.starting_address, self.max_block_length, self.cache_directory)
+        for start, end, length, function, source in self.module.BLOCKS:
+            block = self.blocks[start] = Block(start, end, length, source)
+            block.function = function
+            self.code_map[start:end] = b"\x01" * (end - start)
+
+
+def default_cache_directory() -> str:
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "chip8")
+
+
+def cache_key(rom: bytes, starting_address: int, max_block_length: int) -> str:
+    key = hashlib.sha1(rom)
+    key.update(f"{starting_address}:{max_block_length}:{AOT_VERSION}".encode())
+    key.update(repr(sorted(TEMPLATES.items())).encode())
+    key.update(repr(sorted(TERMINATORS.items())).encode())
+    return key.hexdigest()
+
+
+def compile_rom(rom: bytes, starting_address: int = 0x200, max_block_length: int = 64) -> str:
+    """
+    Returns the source of a module whose BLOCKS list holds (start, end, length, function, source) for a block at
+    every instruction reachable from the starting address.
+    """
+    cpu = CPU(HeadlessScreen(), HeadlessKeyboard(), starting_address)
+    cpu.load(rom)
+    jit = JIT(cpu, max_block_length)
+    blocks = [jit.translate(address) for address in sorted(disassemble(rom, starting_address).instructions)]
+    lines = [f"# Compiled ahead of time from a ROM with SHA-1 {hashlib.sha1(rom).hexdigest()} by chip8.aot.", ""]
+    for block in blocks:
+        lines += ["", block.source]
+    lines += ["", "BLOCKS = ["]
+    lines += [f"    (0x{block.start:03X}, 0x{block.end:03X}, {block.length}, {block.name}, {block.source!r}),"
+              for block in blocks]
+    lines += ["]", ""]
+    return "\n".join(lines)
+
+
+def load_module(rom: bytes, starting_address: int, max_block_length: int, cache_directory: str) -> ModuleType:
+    """
+    Imports the compiled module of a ROM from the cache, compiling it first if it isn't there.
+    Its bytecode is cached next to it, keyed by the Python version, whether or not Python writes .pyc files.
+    """
+    name = f"rom_{cache_key(rom, starting_address, max_block_length)}"
+    path = os.path.join(cache_directory, f"{name}.py")
+    code_path = os.path.join(cache_directory, f"{name}.{sys.implementation.cache_tag}.code")
+    try:
+        with open(code_path, "rb") as f:
+            code = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        if not os.path.exists(path):
+            write_atomically(path, compile_rom(rom, starting_address, max_block_length).encode())
+        with open(path) as f:
+            code = compile(f.read(), path, "exec")
+        write_atomically(code_path, marshal.dumps(code))
+    module = ModuleType(name)
+    module.__file__ = path
+    exec(code, module.__dict__)
+    return module
+
+
+def write_atomically(path: str, data: bytes):
+    # Write under a unique name and rename, so that concurrent runs never read a partial file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
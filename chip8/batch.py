@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from chip8.chip8 import Chip8
+from chip8.cpu import UnknownInstruction
+from chip8.export import FrameExporter, open_writer
+
+
+class Job:
+    """
+    One run of a ROM: it runs headlessly for a number of frames and/or cycles, whichever budget is used up first,
+    pressing and releasing keys at the frames given by its input script, e.g.
+    [{"frame": 30, "press": 5}, {"frame": 32, "release": 5}]. A run also ends when the ROM waits for a keypress
+    after the script is exhausted. Random numbers are seeded so that runs are repeatable. If `export` is given,
+    the frames are exported there as a preview (see chip8.export.open_writer).
+    """
+
+    name: str
+    rom: str
+    frames: Optional[int]
+    cycles: Optional[int]
+    cycles_per_frame: int
+    starting_address: int
+    inputs: List[Dict[str, int]]
+    seed: int
+    export: Optional[str]
+
+    def __init__(self, rom: str, frames: Optional[int] = None, cycles: Optional[int] = None,
+                 cycles_per_frame: int = 10, starting_address: int = 0x200,
+                 inputs: Optional[List[Dict[str, int]]] = None, seed: int = 0, name: Optional[str] = None,
+                 export: Optional[str] = None):
+        if frames is None and cycles is None:
+            raise ValueError(f"{rom}: a job needs a frame or cycle budget")
+        self.name = name or os.path.basename(rom)
+        self.rom = rom
+        self.frames = frames
+        self.cycles = cycles
+        self.cycles_per_frame = cycles_per_frame
+        self.starting_address = starting_address
+        self.inputs = sorted(inputs or [], key=lambda event: event['frame'])
+        self.seed = seed
+        self.export = export
+
+    @classmethod
+    def from_dict(cls, job: Dict, directory: str = ".") -> 'Job':
+        job = dict(job)
+        job['rom'] = os.path.join(directory, job['rom'])
+        if isinstance(job.get('starting_address'), str):
+            job['starting_address'] = int(job['starting_address'], 0)
+        return cls(**job)
+
+
+def load_manifest(path: str) -> List[Job]:
+    """
+    Reads a JSON manifest, either a list of jobs or an object with a "jobs" list. ROM paths are relative to the
+    manifest.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    jobs = manifest['jobs'] if isinstance(manifest, dict) else manifest
+    return [Job.from_dict(job, os.path.dirname(path)) for job in jobs]
+
+
+def run_job(job: Job) -> Dict:
+    random.seed(job.seed)
+    chip8 = Chip8(scaling_factor=1, cycles_per_frame=job.cycles_per_frame, starting_address=job.starting_address,
+                  headless=True)
+    with open(job.rom, "rb") as f:
+        chip8.load(f.read())
+    exporter = None
+    if job.export is not None:
+        exporter = FrameExporter(open_writer(job.export, scale=4))
+        chip8.frame_hooks.append(exporter.capture)
+
+    error = None
+    inputs = iter(job.inputs)
+    event = next(inputs, None)
+    start = time.perf_counter()
+    try:
+        while (job.frames is None or chip8.frames < job.frames) and (job.cycles is None or chip8.cycles < job.cycles):
+            while event is not None and event['frame'] <= chip8.frames:
+                if 'press' in event:
+                    chip8.press_key(event['press'])
+                if 'release' in event:
+                    chip8.release_key(event['release'])
+                event = next(inputs, None)
+            if event is None and chip8.cpu.waiting_for_keypress:
+                break
+            if job.cycles is not None:
+                # The last frame is cut short so that the run stops exactly at the cycle budget.
+                chip8.cycles_per_frame = min(job.cycles_per_frame, job.cycles - chip8.cycles)
+            chip8.tick()
+    except (UnknownInstruction, IndexError) as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    if exporter is not None:
+        exporter.close()
+
+    cpu = chip8.cpu
+    return {
+        'name': job.name,
+        'rom': job.rom,
+        'frames': chip8.frames,
+        'cycles': chip8.cycles,
+        'seconds': elapsed,
+        'framebuffer': framebuffer_hash(chip8.screen.buffer),
+        'registers': {'pc': cpu.pc, 'I': cpu.I, 'V': list(cpu.V), 'stack': list(cpu.stack),
+                      'delay_timer': cpu.delay_timer, 'sound_timer': cpu.sound_timer},
+        'error': error
+    }
+
+
+def framebuffer_hash(buffer: List[int]) -> str:
+    return hashlib.sha1(b"".join(row.to_bytes(8, 'big') for row in buffer)).hexdigest()
+
+
+def run_batch(jobs: List[Job], workers: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Runs the jobs on a pool of worker processes and yields their results in the order they finish. A job that
+    fails, e.g. because its ROM is missing, yields a result with only its error, so that the others still run.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                job = futures[future]
+                yield {
+                    'name': job.name,
+                    'rom': job.rom,
+                    'frames': 0,
+                    'cycles': 0,
+                    'seconds': 0.0,
+                    'framebuffer': None,
+                    'registers': None,
+                    'error': f"{type(e).__name__}: {e}"
+                }
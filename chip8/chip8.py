@@ -1,76 +1,252 @@
-import os
 import sys
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Union
+
+from chip8.cpu import CPU
+from chip8.headless import HeadlessKeyboard, HeadlessScreen, HeadlessSound
+from chip8.idle import IdleLoopDetector
+from chip8.jit import JIT, DifferentialJIT
+from chip8.profiler import Profiler
+from chip8.rewind import Rewind
+from chip8.scheduler import FrameScheduler
+
+if TYPE_CHECKING:
+    from chip8.keyboard import Keyboard
+    from chip8.screen import Screen
+    from chip8.sound import Sound
 
-from chip8.sound import Sound
-
-os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = ""
-import pygame
-
-from chip8.cpu import CPU, UpdateScreen, WaitForKeypress
-from chip8.keyboard import Keyboard
-from chip8.screen import Screen
-
-SIXTY_HERTZ_CLOCK = pygame.USEREVENT
 SIXTY_HERTZ = 60
 
 
 class Chip8:
-    screen: Screen
-    keyboard: Keyboard
-    sound: Sound
+    screen: Union['Screen', HeadlessScreen]
+    keyboard: Union['Keyboard', HeadlessKeyboard]
+    sound: Union['Sound', HeadlessSound]
     cpu: CPU
     cycles_per_frame: int
-
-    def __init__(self, scaling_factor: int, cycles_per_frame: int, starting_address: int):
-        pygame.init()
-        self.screen = Screen(scaling_factor)
-        self.keyboard = Keyboard()
-        self.sound = Sound()
+    headless: bool
+    turbo: bool
+    presentation_rate: int
+    jit: Optional[JIT]
+    profiler: Optional[Profiler]
+    idle: Optional[IdleLoopDetector]
+    rewind: Optional[Rewind]
+    rewinding: bool
+    scheduler: FrameScheduler
+    key_hooks: List[Callable[[int, bool], None]]
+    frame_hooks: List[Callable[[int, List[int]], None]]
+    rom: bytes
+    frames: int
+
+    def __init__(self, scaling_factor: int, cycles_per_frame: int, starting_address: int, headless: bool = False,
+                 turbo: bool = False, presentation_rate: int = SIXTY_HERTZ, jit: bool = False,
+                 jit_verify: bool = False, renderer: str = "rect", profile: bool = False,
+                 rewind_seconds: float = 0, aot: bool = False, aot_cache: Optional[str] = None,
+                 idle_skip: bool = False, mute: bool = False):
+        self.headless = headless
+        self.turbo = turbo
+        self.presentation_rate = presentation_rate
+        if headless:
+            self.screen = HeadlessScreen()
+            self.keyboard = HeadlessKeyboard()
+            self.sound = HeadlessSound()
+        else:
+            # pygame is only imported for a window, so that headless machines start quickly.
+            from chip8.keyboard import Keyboard
+            from chip8.screen import Screen
+            from chip8.sound import open_sound
+            self.screen = Screen(scaling_factor, renderer)
+            self.keyboard = Keyboard()
+            self.sound = HeadlessSound() if mute else open_sound()
         self.cpu = CPU(self.screen, self.keyboard, starting_address)
         self.cycles_per_frame = cycles_per_frame
-
-        sixty_hertz_ms = round(1000 / SIXTY_HERTZ)
-        pygame.time.set_timer(SIXTY_HERTZ_CLOCK, sixty_hertz_ms)
-        print(f"Target CPU speed: {cycles_per_frame * SIXTY_HERTZ} instructions per second")
-        print(f"Screen scaling factor: {scaling_factor}")
+        self.frames = 0
+        if jit_verify:
+            self.jit = DifferentialJIT(self.cpu, max_block_length=cycles_per_frame)
+        elif aot:
+            from chip8.aot import AOT
+            self.jit = AOT(self.cpu, max_block_length=cycles_per_frame, cache_directory=aot_cache)
+        elif jit:
+            self.jit = JIT(self.cpu, max_block_length=cycles_per_frame)
+        else:
+            self.jit = None
+        self.profiler = Profiler(self.cpu) if profile else None
+        self.idle = IdleLoopDetector(self.cpu) if idle_skip else None
+        self.rewind = Rewind(self.cpu, rewind_seconds) if rewind_seconds > 0 else None
+        self.rewinding = False
+        self.scheduler = FrameScheduler(SIXTY_HERTZ)
+        self.key_hooks = []
+        self.frame_hooks = []
+        self.rom = b""
+
+        if not headless:
+            if turbo:
+                print(f"Target CPU speed: unlimited, {cycles_per_frame} instructions per timer decrement")
+                print(f"Presentation rate: {presentation_rate} frames per second")
+            else:
+                print(f"Target CPU speed: {cycles_per_frame * SIXTY_HERTZ} instructions per second")
+            print(f"Screen scaling factor: {scaling_factor}")
+
+    @property
+    def cycles(self) -> int:
+        return self.cpu.cycles
+
+    @property
+    def draws(self) -> int:
+        return self.cpu.draws
 
     def load(self, rom: bytes):
+        self.rom = rom
         self.cpu.load(rom)
+        if self.jit is not None:
+            self.jit.preload(rom)
+
+    def save_state(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.cpu.snapshot())
+
+    def load_state(self, path: str):
+        with open(path, "rb") as f:
+            self.cpu.restore(f.read())
+
+    def run(self, frames: Optional[int] = None):
+        if self.turbo:
+            self._run_turbo(frames)
+        else:
+            self._run_paced(frames)
+
+    def _run_paced(self, frames: Optional[int]):
+        scheduler = self.scheduler
+        scheduler.restart()
+        while frames is None or self.frames < frames:
+            due = scheduler.due_frames(None if frames is None else frames - self.frames)
+            if due:
+                # Frames that are caught up on are emulated back to back and presented once.
+                has_screen_changed = False
+                for _ in range(due):
+                    has_screen_changed |= self._emulate_frame()
+                if has_screen_changed:
+                    self.screen.update()
+                # Input is handled even when frames take longer than their duration and are always due.
+                if not self.headless:
+                    self._handle_events()
+            elif self.headless:
+                time.sleep(scheduler.time_until_next_frame())
+            else:
+                self._handle_events(timeout=scheduler.time_until_next_frame())
+
+    def _run_turbo(self, frames: Optional[int]):
+        presentation_interval = 1 / self.presentation_rate
+        next_presentation = time.monotonic()
+        has_screen_changed = False
+        while frames is None or self.frames < frames:
+            has_screen_changed |= self._emulate_frame()
+            now = time.monotonic()
+            if now >= next_presentation:
+                if has_screen_changed:
+                    self.screen.update()
+                    has_screen_changed = False
+                if not self.headless:
+                    self._handle_events()
+                next_presentation = now + presentation_interval
+        if has_screen_changed:
+            self.screen.update()
+
+    def press_key(self, key: int):
+        for hook in self.key_hooks:
+            hook(key, True)
+        self.keyboard.press(key)
+
+    def release_key(self, key: int):
+        for hook in self.key_hooks:
+            hook(key, False)
+        self.keyboard.release(key)
+        if self.cpu.waiting_for_keypress:
+            self.cpu.key_was_pressed(key)
 
-    def run(self):
-        while True:
-            self._handle_events()
+    def _handle_events(self, timeout: Optional[float] = None):
+        """
+        Handles the pending events, first waiting up to `timeout` seconds for one if given, so that the host
+        thread sleeps between frames but still wakes up for input.
+        """
+        import pygame
+        from chip8.keyboard import KEY_MAPPING, REWIND_KEY
 
-    def _handle_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                self.keyboard.keydown(event)
+        events = pygame.event.get()
+        if not events and timeout is not None and timeout >= 0.001:
+            events = [pygame.event.wait(int(timeout * 1000))] + pygame.event.get()
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key in KEY_MAPPING:
+                self.press_key(KEY_MAPPING[event.key])
 
-            elif event.type == pygame.KEYUP:
-                key = self.keyboard.keyup(event)
-                if self.cpu.waiting_for_keypress and key is not None:
-                    self.cpu.key_was_pressed(key)
+            elif event.type == pygame.KEYUP and event.key in KEY_MAPPING:
+                self.release_key(KEY_MAPPING[event.key])
 
-            elif event.type == SIXTY_HERTZ_CLOCK:
-                self.tick()
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key == REWIND_KEY:
+                self.rewinding = event.type == pygame.KEYDOWN and self.rewind is not None
 
             elif event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
 
     def tick(self):
+        if self._emulate_frame():
+            self.screen.update()
+
+    def _emulate_frame(self) -> bool:
+        has_screen_changed = self._advance_frame()
+        for hook in self.frame_hooks:
+            hook(self.frames, self.screen.buffer)
+        return has_screen_changed
+
+    def _advance_frame(self) -> bool:
+        self.frames += 1
+        if self.rewind is not None:
+            if self.rewinding:
+                return self.rewind.rewind()
+            self.rewind.record()
+
         if self.cpu.waiting_for_keypress:
-            return
+            if self.profiler is not None:
+                self.profiler.wait_cycles += self.cycles_per_frame
+            return False
 
-        has_screen_changed = False
         self.cpu.decrease_timers()
-        for _ in range(self.cycles_per_frame):
+        cycles = self.cycles
+        if self.jit is None:
+            has_screen_changed = self._interpret()
+        else:
+            has_screen_changed = self._run_compiled()
+        if self.profiler is not None and self.cpu.waiting_for_keypress:
+            self.profiler.wait_cycles += self.cycles_per_frame - (self.cycles - cycles)
+        self.sound.update(self.cpu.sound_timer)
+        return has_screen_changed
+
+    def _interpret(self) -> bool:
+        draws = self.cpu.draws
+        cycles = self.cycles_per_frame
+        if self.idle is not None:
+            cycles = self.idle.fast_forward(cycles)
+        self.cpu.run_cycles(cycles)
+        return self.cpu.draws != draws
+
+    def _run_compiled(self) -> bool:
+        cpu = self.cpu
+        draws = cpu.draws
+        blocks = self.jit.blocks
+        remaining = self.cycles_per_frame
+        if self.idle is not None:
+            remaining = self.idle.fast_forward(remaining)
+        while remaining > 0:
+            block = blocks.get(cpu.pc) or self.jit.block_at(cpu.pc)
+            if block.length > remaining:
+                cpu.run_cycles(remaining)
+                break
+            remaining -= block.length
             try:
-                self.cpu.step()
-            except UpdateScreen:
-                has_screen_changed = True
-            except WaitForKeypress:
+                stopped = block.function(cpu)
+            finally:
+                cpu.cycles += block.length
+            if stopped:
                 break
-        self.sound.update(self.cpu.sound_timer)
-        if has_screen_changed:
-            self.screen.update()
+        return cpu.draws != draws
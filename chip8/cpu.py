@@ -1,11 +1,23 @@
 import random
-from typing import Callable, List, Dict, Union
+import struct
+from enum import Enum
+from functools import partial
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Tuple, Union
 
-from chip8.keyboard import Keyboard
-from chip8.screen import Screen
+from chip8.display import WIDTH, HEIGHT, ROW_MASK, ALL_ROWS
+
+if TYPE_CHECKING:
+    from chip8.keyboard import Keyboard
+    from chip8.screen import Screen
 
 MEMORY_SIZE = 4096
 
+# Save states are laid out as a fixed-size header (magic, version, registers, timers, counters, the framebuffer
+# rows) followed by the memory and the stack. All values are big-endian; the version is bumped on any change.
+SNAPSHOT_MAGIC = b"CH8S"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct(f">4sBHHBBHBQQH16B{HEIGHT}Q")
+
 
 class CPU:
     """
@@ -17,10 +29,19 @@ class CPU:
     n:   the lowest 4 bits of the instruction
     x:   the lower 4 bits of the high byte of the instruction
     y:   the upper 4 bits of the low byte of the instruction
+
+    Opcode handlers take their operands as arguments, named after the nibbles above.
+    Each instruction word is decoded only once: the dispatch table maps it to its handler
+    with the operands already bound.
+
+    Handlers signal that execution has to stop by returning a truthy value, which only Fx0A does.
+    DRW counts itself in `draws` so that callers can check once per batch whether the screen changed.
+    Cxnn draws from `random`, the global random module unless replaced, e.g. to record or replay a session.
     """
 
-    screen: Screen
-    keyboard: Keyboard
+    screen: 'Screen'
+    keyboard: 'Keyboard'
+    random: random.Random
     waiting_for_keypress: bool
 
     memory: bytearray
@@ -31,12 +52,17 @@ class CPU:
     delay_timer: int
     sound_timer: int
     instruction: int
+    cycles: int
+    draws: int
 
     opcode_table: Dict[int, Union[Callable, Dict[int, Callable]]]
+    dispatch_table: Dict[int, Callable[[], Optional[bool]]]
+    write_hooks: List[Callable[[int, int], None]]
 
-    def __init__(self, screen: Screen, keyboard: Keyboard, starting_address: int = 0x200):
+    def __init__(self, screen: 'Screen', keyboard: 'Keyboard', starting_address: int = 0x200):
         self.screen = screen
         self.keyboard = keyboard
+        self.random = random
         self.waiting_for_keypress = False
         self.starting_address = starting_address
 
@@ -49,16 +75,76 @@ class CPU:
         self.delay_timer = 0x00
         self.sound_timer = 0x00
         self.instruction = 0x0000
+        self.cycles = 0
+        self.draws = 0
 
         self.opcode_table = self._build_opcode_table()
+        self.dispatch_table = DispatchTable(self)
+        self.write_hooks = []
 
     def load(self, rom: bytes):
         self.memory[self.starting_address:self.starting_address + len(rom)] = rom
-
-    def step(self):
-        self.instruction = self.memory[self.pc] << 8 | self.memory[self.pc + 1]
-        self.pc += 2
-        self.opcode_handler()
+        self._memory_written(self.starting_address, len(rom))
+
+    def step(self) -> bool:
+        pc = self.pc
+        self.instruction = instruction = self.memory[pc] << 8 | self.memory[pc + 1]
+        self.pc = pc + 2
+        self.cycles += 1
+        return self.dispatch_table[instruction]()
+
+    def run_cycles(self, cycles: int) -> 'StopReason':
+        memory = self.memory
+        dispatch_table = self.dispatch_table
+        cycle = -1
+        try:
+            for cycle in range(cycles):
+                pc = self.pc
+                self.instruction = instruction = memory[pc] << 8 | memory[pc + 1]
+                self.pc = pc + 2
+                if dispatch_table[instruction]():
+                    return StopReason.WAITING_FOR_KEYPRESS
+            return StopReason.COMPLETED
+        finally:
+            # Like step, an instruction that fails is counted as run.
+            self.cycles += cycle + 1
+
+    def snapshot(self) -> bytes:
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.pc, self.I, self.delay_timer,
+                                      self.sound_timer, self.instruction, self.waiting_for_keypress, self.cycles,
+                                      self.draws, len(self.stack), *self.V, *self.screen.buffer)
+        return b"".join([header, self.memory, struct.pack(f">{len(self.stack)}H", *self.stack)])
+
+    def restore(self, snapshot: bytes):
+        try:
+            fields = SNAPSHOT_HEADER.unpack_from(snapshot)
+        except struct.error:
+            raise InvalidSnapshot("truncated header")
+        magic, version, pc, I, delay_timer, sound_timer, instruction, waiting, cycles, draws, depth = fields[:11]
+        if magic != SNAPSHOT_MAGIC:
+            raise InvalidSnapshot("not a CHIP-8 save state")
+        if version != SNAPSHOT_VERSION:
+            raise InvalidSnapshot(f"unsupported version {version}")
+        memory_end = SNAPSHOT_HEADER.size + MEMORY_SIZE
+        if len(snapshot) != memory_end + 2 * depth:
+            raise InvalidSnapshot("unexpected length")
+
+        self.pc = pc
+        self.I = I
+        self.delay_timer = delay_timer
+        self.sound_timer = sound_timer
+        self.instruction = instruction
+        self.waiting_for_keypress = bool(waiting)
+        self.cycles = cycles
+        self.draws = draws
+        self.V[:] = fields[11:27]
+        self.screen.buffer[:] = fields[27:]
+        self.screen.dirty_rows = ALL_ROWS
+        self.stack[:] = struct.unpack_from(f">{depth}H", snapshot, memory_end)
+        memory = snapshot[SNAPSHOT_HEADER.size:memory_end]
+        if self.memory != memory:
+            self.memory[:] = memory
+            self._memory_written(0, MEMORY_SIZE)
 
     def decrease_timers(self):
         if self.delay_timer > 0:
@@ -70,6 +156,38 @@ class CPU:
         self.waiting_for_keypress = False
         self.Vx = key
 
+    def _memory_written(self, address: int, length: int):
+        for hook in self.write_hooks:
+            hook(address, length)
+
+    def decode(self, instruction: int) -> Tuple[Callable, Tuple[int, ...]]:
+        first_nibble = (instruction & 0xf000) >> 12
+        handler = self.opcode_table[first_nibble]
+        if not callable(handler):
+            key = instruction & 0x000f if first_nibble in (0x5, 0x8, 0x9) else instruction & 0x00ff
+            try:
+                handler = handler[key]
+            except KeyError:
+                raise UnknownInstruction(instruction)
+
+        operands = {
+            'x': (instruction & 0x0f00) >> 8,
+            'y': (instruction & 0x00f0) >> 4,
+            'n': instruction & 0x000f,
+            'nn': instruction & 0x00ff,
+            'nnn': instruction & 0x0fff
+        }
+        code = handler.__func__.__code__
+        operand_names = code.co_varnames[1:code.co_argcount]
+        return handler, tuple(operands[name] for name in operand_names)
+
+    def _bind(self, instruction: int) -> Callable[[], Optional[bool]]:
+        try:
+            handler, operands = self.decode(instruction)
+        except UnknownInstruction:
+            return partial(self._unknown_instruction, instruction)
+        return partial(handler, *operands)
+
     def _build_opcode_table(self):
         return {
             0x0: {
@@ -80,7 +198,9 @@ class CPU:
             0x2: self._CALL_nnn,  # 2nnn
             0x3: self._SE_Vx_nn,  # 3xnn
             0x4: self._SNE_Vx_nn,  # 4xnn
-            0x5: self._SE_Vx_Vy,  # 5xy0
+            0x5: {
+                0x0: self._SE_Vx_Vy  # 5xy0
+            },
             0x6: self._LD_Vx_nn,  # 6xnn
             0x7: self._ADD_Vx_nn,  # 7xnn
             0x8: {
@@ -94,7 +214,9 @@ class CPU:
                 0x7: self._SUBN_Vx_Vy,  # 8xy7
                 0xE: self._SHL_Vx_Vy  # 8xyE
             },
-            0x9: self._SNE_Vx_Vy,  # 9xy0
+            0x9: {
+                0x0: self._SNE_Vx_Vy  # 9xy0
+            },
             0xA: self._LD_I_nnn,  # Annn
             0xB: self._JP_V0_nnn,  # Bnnn
             0xC: self._RND_Vx_nn,  # Cxnn
@@ -117,17 +239,8 @@ class CPU:
         }
 
     @property
-    def opcode_handler(self) -> Callable[[], None]:
-        first_nibble = (self.instruction & 0xf000) >> 12
-        try:
-            if callable(self.opcode_table[first_nibble]):
-                return self.opcode_table[first_nibble]
-            elif first_nibble == 0x8:
-                return self.opcode_table[first_nibble][self.n]
-            else:
-                return self.opcode_table[first_nibble][self.nn]
-        except KeyError:
-            raise UnknownInstruction(self.instruction)
+    def opcode_handler(self) -> Callable[[], Optional[bool]]:
+        return self.dispatch_table[self.instruction]
 
     @property
     def x(self) -> int:
@@ -161,152 +274,163 @@ class CPU:
     def Vy(self) -> int:
         return self.V[self.y]
 
+    def _unknown_instruction(self, instruction: int):
+        raise UnknownInstruction(instruction)
+
     def _CLS(self):  # 00E0
-        for row in self.screen.buffer:
-            for x, _ in enumerate(row):
-                row[x] = False
+        self.screen.buffer[:] = [0] * HEIGHT
+        self.screen.dirty_rows = ALL_ROWS
 
     def _RET(self):  # 00EE
         self.pc = self.stack.pop()
 
-    def _JP_nnn(self):  # 1nnn
-        self.pc = self.nnn
+    def _JP_nnn(self, nnn: int):  # 1nnn
+        self.pc = nnn
 
-    def _CALL_nnn(self):  # 2nnn
+    def _CALL_nnn(self, nnn: int):  # 2nnn
         self.stack.append(self.pc)
-        self.pc = self.nnn
+        self.pc = nnn
 
-    def _SE_Vx_nn(self):  # 3xnn
-        if self.Vx == self.nn:
+    def _SE_Vx_nn(self, x: int, nn: int):  # 3xnn
+        if self.V[x] == nn:
             self.pc += 2
 
-    def _SNE_Vx_nn(self):  # 4xnn
-        if self.Vx != self.nn:
+    def _SNE_Vx_nn(self, x: int, nn: int):  # 4xnn
+        if self.V[x] != nn:
             self.pc += 2
 
-    def _SE_Vx_Vy(self):  # 5xy0
-        if self.n != 0:
-            raise UnknownInstruction(self.instruction)
-
-        if self.Vx == self.Vy:
+    def _SE_Vx_Vy(self, x: int, y: int):  # 5xy0
+        if self.V[x] == self.V[y]:
             self.pc += 2
 
-    def _LD_Vx_nn(self):  # 6xnn
-        self.Vx = self.nn
-
-    def _ADD_Vx_nn(self):  # 7xnn
-        self.Vx += self.nn
+    def _LD_Vx_nn(self, x: int, nn: int):  # 6xnn
+        self.V[x] = nn
 
-    def _LD_Vx_Vy(self):  # 8xy0
-        self.Vx = self.Vy
+    def _ADD_Vx_nn(self, x: int, nn: int):  # 7xnn
+        V = self.V
+        V[x] = (V[x] + nn) & 0xff
 
-    def _OR_Vx_Vy(self):  # 8xy1
-        self.Vx |= self.Vy
+    def _LD_Vx_Vy(self, x: int, y: int):  # 8xy0
+        V = self.V
+        V[x] = V[y]
 
-    def _AND_Vx_Vy(self):  # 8xy2
-        self.Vx &= self.Vy
+    def _OR_Vx_Vy(self, x: int, y: int):  # 8xy1
+        V = self.V
+        V[x] |= V[y]
 
-    def _XOR_Vx_Vy(self):  # 8xy3
-        self.Vx ^= self.Vy
+    def _AND_Vx_Vy(self, x: int, y: int):  # 8xy2
+        V = self.V
+        V[x] &= V[y]
 
-    def _ADD_Vx_Vy(self):  # 8xy4
-        self.V[0xf] = 1 if self.Vx + self.Vy > 0xff else 0
-        self.Vx += self.Vy
+    def _XOR_Vx_Vy(self, x: int, y: int):  # 8xy3
+        V = self.V
+        V[x] ^= V[y]
 
-    def _SUB_Vx_Vy(self):  # 8xy5
-        self.V[0xf] = 0 if self.Vy > self.Vx else 1
-        self.Vx -= self.Vy
+    def _ADD_Vx_Vy(self, x: int, y: int):  # 8xy4
+        V = self.V
+        V[0xf] = 1 if V[x] + V[y] > 0xff else 0
+        V[x] = (V[x] + V[y]) & 0xff
 
-    def _SHR_Vx_Vy(self):  # 8xy6
-        self.V[0xf] = self.Vy & 0b00000001
-        self.Vx = self.Vy >> 1
+    def _SUB_Vx_Vy(self, x: int, y: int):  # 8xy5
+        V = self.V
+        V[0xf] = 0 if V[y] > V[x] else 1
+        V[x] = (V[x] - V[y]) & 0xff
 
-    def _SUBN_Vx_Vy(self):  # 8xy7
-        self.V[0xf] = 0 if self.Vx > self.Vy else 1
-        self.Vx = self.Vy - self.Vx
+    def _SHR_Vx_Vy(self, x: int, y: int):  # 8xy6
+        V = self.V
+        V[0xf] = V[y] & 0b00000001
+        V[x] = V[y] >> 1
 
-    def _SHL_Vx_Vy(self):  # 8xyE
-        self.V[0xf] = self.Vy >> 7
-        self.Vx = self.Vy << 1
+    def _SUBN_Vx_Vy(self, x: int, y: int):  # 8xy7
+        V = self.V
+        V[0xf] = 0 if V[x] > V[y] else 1
+        V[x] = (V[y] - V[x]) & 0xff
 
-    def _SNE_Vx_Vy(self):  # 9xy0
-        if self.n != 0:
-            raise UnknownInstruction(self.instruction)
+    def _SHL_Vx_Vy(self, x: int, y: int):  # 8xyE
+        V = self.V
+        V[0xf] = V[y] >> 7
+        V[x] = (V[y] << 1) & 0xff
 
-        if self.Vx != self.Vy:
+    def _SNE_Vx_Vy(self, x: int, y: int):  # 9xy0
+        if self.V[x] != self.V[y]:
             self.pc += 2
 
-    def _LD_I_nnn(self):  # Annn
-        self.I = self.nnn
+    def _LD_I_nnn(self, nnn: int):  # Annn
+        self.I = nnn
 
-    def _JP_V0_nnn(self):  # Bnnn
-        self.pc = self.nnn + self.V[0x0]
+    def _JP_V0_nnn(self, nnn: int):  # Bnnn
+        self.pc = nnn + self.V[0x0]
 
-    def _RND_Vx_nn(self):  # Cxnn
-        self.Vx = random.getrandbits(8) & self.nn
+    def _RND_Vx_nn(self, x: int, nn: int):  # Cxnn
+        self.V[x] = self.random.getrandbits(8) & nn
 
-    def _DRW_Vx_Vy_n(self):  # Dxyn
+    def _DRW_Vx_Vy_n(self, x: int, y: int, n: int):  # Dxyn
         self.V[0xf] = 0
-        sprite = self.memory[self.I:self.I + self.n]
-        for byte_number, byte in enumerate(sprite):
-            y = (self.Vy + byte_number) % len(self.screen.buffer)
-            row = self.screen.buffer[y]
-
-            sprite_bits = [(byte >> bit_number) & 0b00000001 for bit_number in range(7, -1, -1)]
-            for bit_number, sprite_bit in enumerate(sprite_bits):
-                if not sprite_bit:
-                    continue
-                x = (self.Vx + bit_number) % len(row)
-                if row[x]:
-                    self.V[0xf] = 1
-                row[x] = not row[x]
-        raise UpdateScreen
-
-    def _SKP_Vx(self):  # Ex9E
-        if self.Vx in self.keyboard.pressed_keys:
+        buffer = self.screen.buffer
+        column = self.V[x] % WIDTH
+        first_row = self.V[y]
+        collision = 0
+        dirty_rows = 0
+        for byte_number, byte in enumerate(self.memory[self.I:self.I + n]):
+            sprite_row = byte << (WIDTH - 8)
+            sprite_row = (sprite_row >> column | sprite_row << (WIDTH - column)) & ROW_MASK
+            row_number = (first_row + byte_number) % HEIGHT
+            row = buffer[row_number]
+            collision |= row & sprite_row
+            buffer[row_number] = row ^ sprite_row
+            dirty_rows |= 1 << row_number
+        self.screen.dirty_rows |= dirty_rows
+        if collision:
+            self.V[0xf] = 1
+        self.draws += 1
+
+    def _SKP_Vx(self, x: int):  # Ex9E
+        if self.V[x] in self.keyboard.pressed_keys:
             self.pc += 2
 
-    def _SKNP_Vx(self):  # ExA1
-        if self.Vx not in self.keyboard.pressed_keys:
+    def _SKNP_Vx(self, x: int):  # ExA1
+        if self.V[x] not in self.keyboard.pressed_keys:
             self.pc += 2
 
-    def _LD_Vx_DT(self):  # Fx07
-        self.Vx = self.delay_timer
+    def _LD_Vx_DT(self, x: int):  # Fx07
+        self.V[x] = self.delay_timer
 
-    def _LD_Vx_K(self):  # Fx0A
+    def _LD_Vx_K(self, x: int) -> bool:  # Fx0A
         self.waiting_for_keypress = True
-        raise WaitForKeypress
+        return True
 
-    def _LD_DT_Vx(self):  # Fx15
-        self.delay_timer = self.Vx
+    def _LD_DT_Vx(self, x: int):  # Fx15
+        self.delay_timer = self.V[x]
 
-    def _LD_ST_Vx(self):  # Fx18
-        self.sound_timer = self.Vx
+    def _LD_ST_Vx(self, x: int):  # Fx18
+        self.sound_timer = self.V[x]
 
-    def _ADD_I_Vx(self):  # Fx1E
-        self.I += self.Vx
+    def _ADD_I_Vx(self, x: int):  # Fx1E
+        self.I += self.V[x]
         self.I &= 0xfff
 
-    def _LD_F_Vx(self):  # Fx29
-        self.I = self.Vx * 5
+    def _LD_F_Vx(self, x: int):  # Fx29
+        self.I = self.V[x] * 5
 
-    def _LD_B_Vx(self):  # Fx33
-        hundreds = self.Vx // 100
-        tens = (self.Vx % 100) // 10
-        ones = self.Vx % 10
+    def _LD_B_Vx(self, x: int):  # Fx33
+        hundreds = self.V[x] // 100
+        tens = (self.V[x] % 100) // 10
+        ones = self.V[x] % 10
         self.memory[self.I] = hundreds
         self.memory[self.I + 1] = tens
         self.memory[self.I + 2] = ones
+        self._memory_written(self.I, 3)
 
-    def _LD_I_Vx(self):  # Fx55
-        for reg in range(self.x + 1):
+    def _LD_I_Vx(self, x: int):  # Fx55
+        for reg in range(x + 1):
             self.memory[self.I + reg] = self.V[reg]
-        self.I += self.x + 1
+        self._memory_written(self.I, x + 1)
+        self.I += x + 1
 
-    def _LD_Vx_I(self):  # Fx65
-        for reg in range(self.x + 1):
+    def _LD_Vx_I(self, x: int):  # Fx65
+        for reg in range(x + 1):
             self.V[reg] = self.memory[self.I + reg]
-        self.I += self.x + 1
+        self.I += x + 1
 
 
 font_sprites = [
@@ -329,14 +453,30 @@ font_sprites = [
 ]
 
 
+class DispatchTable(dict):
+    """
+    Maps instruction words to their pre-bound handlers.
+    Words are decoded on first use, so a CPU only pays for the instructions its ROM executes.
+    """
+
+    def __init__(self, cpu: CPU):
+        super().__init__()
+        self.cpu = cpu
+
+    def __missing__(self, instruction: int) -> Callable[[], Optional[bool]]:
+        handler = self[instruction] = self.cpu._bind(instruction)
+        return handler
+
+
 class UnknownInstruction(Exception):
     def __init__(self, instruction):
         super().__init__(f"{instruction:0{4}X}")
 
 
-class UpdateScreen(Exception):
+class InvalidSnapshot(Exception):
     pass
 
 
-class WaitForKeypress(Exception):
-    pass
+class StopReason(Enum):
+    COMPLETED = "completed"
+    WAITING_FOR_KEYPRESS = "waiting for keypress"
@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Set
+
+from chip8.cpu import CPU, UnknownInstruction
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+
+# Instructions are listed in Cowgod's syntax, keyed by handler name like the JIT's templates.
+# {x} and {y} are register numbers, {n} and {nn} immediates, and {nnn} an address, shown as its label if it has one.
+MNEMONICS = {
+    '_CLS': "CLS",
+    '_RET': "RET",
+    '_JP_nnn': "JP {nnn}",
+    '_CALL_nnn': "CALL {nnn}",
+    '_SE_Vx_nn': "SE V{x}, {nn}",
+    '_SNE_Vx_nn': "SNE V{x}, {nn}",
+    '_SE_Vx_Vy': "SE V{x}, V{y}",
+    '_LD_Vx_nn': "LD V{x}, {nn}",
+    '_ADD_Vx_nn': "ADD V{x}, {nn}",
+    '_LD_Vx_Vy': "LD V{x}, V{y}",
+    '_OR_Vx_Vy': "OR V{x}, V{y}",
+    '_AND_Vx_Vy': "AND V{x}, V{y}",
+    '_XOR_Vx_Vy': "XOR V{x}, V{y}",
+    '_ADD_Vx_Vy': "ADD V{x}, V{y}",
+    '_SUB_Vx_Vy': "SUB V{x}, V{y}",
+    '_SHR_Vx_Vy': "SHR V{x}, V{y}",
+    '_SUBN_Vx_Vy': "SUBN V{x}, V{y}",
+    '_SHL_Vx_Vy': "SHL V{x}, V{y}",
+    '_SNE_Vx_Vy': "SNE V{x}, V{y}",
+    '_LD_I_nnn': "LD I, {nnn}",
+    '_JP_V0_nnn': "JP V0, {nnn}",
+    '_RND_Vx_nn': "RND V{x}, {nn}",
+    '_DRW_Vx_Vy_n': "DRW V{x}, V{y}, {n}",
+    '_SKP_Vx': "SKP V{x}",
+    '_SKNP_Vx': "SKNP V{x}",
+    '_LD_Vx_DT': "LD V{x}, DT",
+    '_LD_Vx_K': "LD V{x}, K",
+    '_LD_DT_Vx': "LD DT, V{x}",
+    '_LD_ST_Vx': "LD ST, V{x}",
+    '_ADD_I_Vx': "ADD I, V{x}",
+    '_LD_F_Vx': "LD F, V{x}",
+    '_LD_B_Vx': "LD B, V{x}",
+    '_LD_I_Vx': "LD [I], V{x}",
+    '_LD_Vx_I': "LD V{x}, [I]",
+}
+
+SKIPS = {'_SE_Vx_nn', '_SNE_Vx_nn', '_SE_Vx_Vy', '_SNE_Vx_Vy', '_SKP_Vx', '_SKNP_Vx'}
+
+# Data bytes are listed with their pixels, since most of them are sprites.
+DATA_LINES = [f"{byte:02X}    DB 0x{byte:02X}  ; " + f"{byte:08b}".replace("0", ".").replace("1", "#")
+              for byte in range(256)]
+
+
+class Instruction:
+    address: int
+    word: int
+    name: str
+    operands: Dict[str, int]
+    successors: List[int]
+
+    def __init__(self, address: int, word: int, name: str, operands: Dict[str, int]):
+        self.address = address
+        self.word = word
+        self.name = name
+        self.operands = operands
+        self.successors = []
+
+    @property
+    def next(self) -> int:
+        return self.address + 2
+
+    def format(self, labels: Dict[int, str]) -> str:
+        fields = {name: f"{value:X}" if name in 'xy' else hex(value) for name, value in self.operands.items()}
+        if 'nnn' in self.operands:
+            fields['nnn'] = labels.get(self.operands['nnn'], fields['nnn'])
+        return MNEMONICS[self.name].format(**fields)
+
+
+class BasicBlock:
+    """
+    A run of instructions that is only entered at its first one and only left after its last one, which
+    continues at the block's successors.
+    """
+
+    start: int
+    end: int
+    instructions: List[Instruction]
+
+    def __init__(self, instructions: List[Instruction]):
+        self.start = instructions[0].address
+        self.end = instructions[-1].next
+        self.instructions = instructions
+
+    @property
+    def successors(self) -> List[int]:
+        return self.instructions[-1].successors
+
+
+class Disassembly:
+    """
+    The code reachable from the entry point of a ROM, found by following jumps, calls, skips and fall-through,
+    and everything else in the ROM as data.
+    Calls are assumed to return to the following instruction. The target of a Bnnn jump depends on V0, so only
+    nnn is followed and the jump is listed in `indirect_jumps`. Words that can't be decoded end a path and are
+    listed in `invalid`.
+    """
+
+    rom: bytes
+    starting_address: int
+    instructions: Dict[int, Instruction]
+    blocks: Dict[int, BasicBlock]
+    labels: Dict[int, str]
+    subroutines: Set[int]
+    data_references: Set[int]
+    indirect_jumps: List[int]
+    invalid: List[int]
+
+    def __init__(self, rom: bytes, starting_address: int = 0x200):
+        self.rom = rom
+        self.starting_address = starting_address
+        self.instructions = {}
+        self.blocks = {}
+        self.labels = {}
+        self.subroutines = set()
+        self.data_references = set()
+        self.indirect_jumps = []
+        self.invalid = []
+        self._decoder = CPU(HeadlessScreen(), HeadlessKeyboard(), starting_address)
+        self._trace()
+        self._split_blocks()
+        self._label()
+
+    @property
+    def end(self) -> int:
+        return self.starting_address + len(self.rom)
+
+    def is_code(self, address: int) -> bool:
+        return address in self.instructions or address - 1 in self.instructions
+
+    def code_map(self) -> bytearray:
+        """
+        Returns one byte per ROM byte: 1 for code and 0 for data.
+        """
+        code_map = bytearray(len(self.rom))
+        for address in self.instructions:
+            offset = address - self.starting_address
+            code_map[offset:offset + 2] = b"\x01\x01"
+        return code_map
+
+    def listing(self) -> str:
+        lines = []
+        address = self.starting_address
+        while address < self.end:
+            if address in self.labels:
+                lines.append(f"{self.labels[address]}:")
+            instruction = self.instructions.get(address)
+            if instruction is not None:
+                lines.append(f"    {address:03X}  {instruction.word:04X}  {instruction.format(self.labels)}")
+                address += 2
+            else:
+                lines.append(f"    {address:03X}  {DATA_LINES[self.rom[address - self.starting_address]]}")
+                address += 1
+        return "\n".join(lines) + "\n"
+
+    def _word(self, address: int) -> Optional[int]:
+        offset = address - self.starting_address
+        if offset < 0 or offset + 2 > len(self.rom):
+            return None
+        return self.rom[offset] << 8 | self.rom[offset + 1]
+
+    def _trace(self):
+        pending = [self.starting_address]
+        while pending:
+            address = pending.pop()
+            if address in self.instructions:
+                continue
+            word = self._word(address)
+            if word is None:
+                continue
+            try:
+                handler, operand_values = self._decoder.decode(word)
+            except UnknownInstruction:
+                self.invalid.append(address)
+                continue
+            code = handler.__func__.__code__
+            operands = dict(zip(code.co_varnames[1:code.co_argcount], operand_values))
+            instruction = self.instructions[address] = Instruction(address, word, handler.__name__, operands)
+            instruction.successors = self._successors(instruction)
+            pending.extend(instruction.successors)
+        self.invalid.sort()
+        self.indirect_jumps.sort()
+
+    def _successors(self, instruction: Instruction) -> List[int]:
+        name = instruction.name
+        if name == '_RET':
+            return []
+        if name == '_JP_nnn':
+            return [instruction.operands['nnn']]
+        if name == '_CALL_nnn':
+            self.subroutines.add(instruction.operands['nnn'])
+            return [instruction.operands['nnn'], instruction.next]
+        if name == '_JP_V0_nnn':
+            self.indirect_jumps.append(instruction.address)
+            return [instruction.operands['nnn']]
+        if name in SKIPS:
+            return [instruction.next, instruction.next + 2]
+        if name == '_LD_I_nnn':
+            self.data_references.add(instruction.operands['nnn'])
+        return [instruction.next]
+
+    def _split_blocks(self):
+        leaders = {self.starting_address} | self.subroutines
+        for instruction in self.instructions.values():
+            if instruction.successors != [instruction.next]:
+                leaders.update(instruction.successors)
+        for start in sorted(leaders & self.instructions.keys()):
+            block = [self.instructions[start]]
+            while block[-1].successors == [block[-1].next] and block[-1].next in self.instructions \
+                    and block[-1].next not in leaders:
+                block.append(self.instructions[block[-1].next])
+            self.blocks[start] = BasicBlock(block)
+
+    def _label(self):
+        for instruction in self.instructions.values():
+            if instruction.name in ('_JP_nnn', '_JP_V0_nnn'):
+                self.labels[instruction.operands['nnn']] = f"label_{instruction.operands['nnn']:03X}"
+        for address in self.data_references:
+            if self.starting_address <= address < self.end and not self.is_code(address):
+                self.labels[address] = f"data_{address:03X}"
+        for address in self.subroutines:
+            self.labels[address] = f"sub_{address:03X}"
+        self.labels[self.starting_address] = "start"
+
+
+def disassemble(rom: bytes, starting_address: int = 0x200) -> Disassembly:
+    return Disassembly(rom, starting_address)
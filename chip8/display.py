@@ -0,0 +1,30 @@
+from typing import Iterator, List, Tuple
+
+WIDTH = 64
+HEIGHT = 32
+ROW_MASK = (1 << WIDTH) - 1
+ALL_ROWS = (1 << HEIGHT) - 1
+
+RENDERERS = ("rect", "blit")
+
+
+def row_pixels(row: int) -> List[bool]:
+    """
+    Unpacks a framebuffer row, in which the most significant bit is the leftmost pixel.
+    """
+    return [bit == "1" for bit in f"{row:0{WIDTH}b}"]
+
+
+def dirty_spans(dirty_rows: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yields the first and last row of every run of consecutive rows set in the dirty_rows bit mask,
+    in which bit n stands for row n.
+    """
+    y = 0
+    while dirty_rows >> y:
+        if dirty_rows >> y & 1:
+            first = y
+            while dirty_rows >> (y + 1) & 1:
+                y += 1
+            yield first, y
+        y += 1
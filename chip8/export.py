@@ -0,0 +1,275 @@
+import os
+import queue
+import struct
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List, Optional, Tuple
+
+from chip8.display import WIDTH, HEIGHT
+
+Frame = Tuple[int, ...]
+# Frames waiting to be encoded; when the encoder falls this far behind, e.g. in turbo mode, capturing waits for it.
+EXPORT_QUEUE_SIZE = 256
+
+
+class FrameExporter:
+    """
+    Encodes the frames of a running machine in a background thread.
+    The emulation thread only compares each frame with the previous one and queues it if it changed, so unchanged
+    frames become a longer duration of the last one and encoding only holds up emulation when it falls
+    EXPORT_QUEUE_SIZE changed frames behind.
+    """
+
+    writer: 'Writer'
+    frame: Optional[Frame]
+    frame_number: int
+    queue: queue.Queue
+    thread: threading.Thread
+    error: Optional[BaseException]
+
+    def __init__(self, writer: 'Writer'):
+        self.writer = writer
+        self.frame = None
+        self.frame_number = -1
+        self.queue = queue.Queue(EXPORT_QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self._encode, name="frame-exporter", daemon=True)
+        self.thread.start()
+
+    def capture(self, frame_number: int, buffer: List[int]):
+        """
+        Captures the framebuffer as shown after the given frame, until the next capture.
+        """
+        self.frame_number = frame_number
+        frame = tuple(buffer)
+        if frame != self.frame:
+            self.frame = frame
+            self.queue.put((frame_number, frame))
+
+    def close(self):
+        """
+        Writes the last frame, with a duration of one frame after the last capture, and waits for encoding to finish.
+        """
+        self.queue.put((self.frame_number + 1, None))
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _encode(self):
+        previous_number, previous = None, None
+        try:
+            try:
+                while True:
+                    number, frame = self.queue.get()
+                    if previous is not None and number > previous_number:
+                        self.writer.write(previous, number - previous_number)
+                    if frame is None:
+                        break
+                    previous_number, previous = number, frame
+            finally:
+                # The file is closed even if writing failed.
+                self.writer.close()
+        except BaseException as e:
+            self.error = e
+            # Frames are still taken off the queue, so that capture() and close() don't block on a dead encoder.
+            while frame is not None:
+                _, frame = self.queue.get()
+
+
+class Writer(ABC):
+    @abstractmethod
+    def write(self, frame: Frame, duration: int):
+        """
+        Writes a frame shown for `duration` sixtieths of a second.
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        Finishes writing, after the last frame.
+        """
+
+
+class RawWriter(Writer):
+    """
+    Writes a header (magic, version, width, height) followed by each frame as its duration in frames and its
+    rows as big-endian 64-bit integers.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "wb")
+        self.file.write(struct.pack(">4sBBB", b"CH8F", 1, WIDTH, HEIGHT))
+        self.frame_format = struct.Struct(f">I{HEIGHT}Q")
+
+    def write(self, frame: Frame, duration: int):
+        self.file.write(self.frame_format.pack(duration, *frame))
+
+    def close(self):
+        self.file.close()
+
+
+class GIFWriter(Writer):
+    """
+    Writes a looping, black and white animated GIF.
+    Delays are in hundredths of a second, and browsers slow down frames shorter than two, so a frame that would
+    get less is dropped and the next one shown in its place, like a 50 Hz display showing 60 Hz video.
+    """
+
+    MINIMUM_DELAY = 2
+
+    def __init__(self, path: str, scale: int = 1):
+        self.file = open(path, "wb")
+        self.scale = scale
+        self.elapsed = 0
+        self.written = 0
+        self.pending = None
+        width, height = WIDTH * scale, HEIGHT * scale
+        self.file.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x80, 0, 0))
+        self.file.write(b"\x00\x00\x00\xff\xff\xff")
+        self.file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+        self.image_descriptor = b"\x2c" + struct.pack("<HHHHB", 0, 0, width, height, 0)
+
+    def write(self, frame: Frame, duration: int):
+        # Round the end time rather than each duration, so that rounding errors don't add up.
+        self.elapsed += duration
+        delay = round(self.elapsed * 100 / 60) - self.written
+        if delay < self.MINIMUM_DELAY:
+            self.pending = frame
+            return
+        self._write_image(frame, delay)
+
+    def close(self):
+        if self.pending is not None:
+            self._write_image(self.pending, self.MINIMUM_DELAY)
+        self.file.write(b"\x3b")
+        self.file.close()
+
+    def _write_image(self, frame: Frame, delay: int):
+        self.written += delay
+        self.pending = None
+        self.file.write(b"\x21\xf9\x04\x04" + struct.pack("<H", min(delay, 0xffff)) + b"\x00\x00")
+        self.file.write(self.image_descriptor)
+        data = lzw_encode(b"".join(scaled_pixels(row, self.scale) for row in frame), 2)
+        self.file.write(b"\x02" + b"".join(bytes([len(data[i:i + 255])]) + data[i:i + 255]
+                                           for i in range(0, len(data), 255)) + b"\x00")
+
+
+class PNGSequenceWriter(Writer):
+    """
+    Writes every frame as a 1-bit PNG into a directory, along with a frames.ffconcat file listing their durations,
+    which ffmpeg can turn into a video: `ffmpeg -f concat -i frames.ffconcat preview.mp4`.
+    """
+
+    def __init__(self, directory: str, scale: int = 1):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.scale = scale
+        self.count = 0
+        self.playlist = open(os.path.join(directory, "frames.ffconcat"), "w")
+        self.playlist.write("ffconcat version 1.0\n")
+
+    def write(self, frame: Frame, duration: int):
+        name = f"frame_{self.count:05d}.png"
+        with open(os.path.join(self.directory, name), "wb") as f:
+            write_png(f, frame, self.scale)
+        self.playlist.write(f"file {name}\nduration {duration / 60:.4f}\n")
+        self.count += 1
+
+    def close(self):
+        self.playlist.close()
+
+
+def open_writer(path: str, scale: int = 1) -> Writer:
+    """
+    Picks the format from the path: .gif for an animated GIF, .raw for a raw frame stream, and a directory of
+    PNGs otherwise.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gif":
+        return GIFWriter(path, scale)
+    if extension == ".raw":
+        return RawWriter(path)
+    return PNGSequenceWriter(path, scale)
+
+
+PIXEL_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def scaled_pixels(row: int, scale: int) -> bytes:
+    """
+    Returns one byte per pixel, 0 or 1, for each of the `scale` lines a row is scaled to.
+    """
+    pixels = f"{row:0{WIDTH}b}".encode().translate(PIXEL_BYTES)
+    if scale > 1:
+        pixels = bytes(pixel for pixel in pixels for _ in range(scale))
+    return pixels * scale
+
+
+def scaled_row(row: int, scale: int) -> bytes:
+    """
+    Returns a row scaled horizontally, packed 8 pixels per byte with the leftmost pixel in the most significant bit.
+    """
+    if scale > 1:
+        row = int("".join(bit * scale for bit in f"{row:0{WIDTH}b}"), 2)
+    return row.to_bytes(WIDTH * scale // 8, 'big')
+
+
+def write_png(file: BinaryIO, frame: Frame, scale: int = 1):
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    scanlines = b"".join((b"\x00" + scaled_row(row, scale)) * scale for row in frame)
+    file.write(b"\x89PNG\r\n\x1a\n")
+    file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", WIDTH * scale, HEIGHT * scale, 1, 0, 0, 0, 0)))
+    file.write(chunk(b"IDAT", zlib.compress(scanlines)))
+    file.write(chunk(b"IEND", b""))
+
+
+def lzw_encode(pixels: bytes, minimum_code_size: int) -> bytes:
+    """
+    Compresses pixels with the variable-length LZW coding GIF uses, packing codes least significant bit first.
+    """
+    clear_code = 1 << minimum_code_size
+    end_code = clear_code + 1
+    output = bytearray()
+    bits = 0
+    bit_count = 0
+
+    def emit(code: int, code_size: int):
+        nonlocal bits, bit_count
+        bits |= code << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            output.append(bits & 0xff)
+            bits >>= 8
+            bit_count -= 8
+
+    table = {bytes([value]): value for value in range(clear_code)}
+    next_code = end_code + 1
+    code_size = minimum_code_size + 1
+    emit(clear_code, code_size)
+    prefix = b""
+    for pixel in pixels:
+        string = prefix + bytes([pixel])
+        if string in table:
+            prefix = string
+            continue
+        emit(table[prefix], code_size)
+        if next_code < 4096:
+            table[string] = next_code
+            next_code += 1
+            if next_code > 1 << code_size and code_size < 12:
+                code_size += 1
+        else:
+            emit(clear_code, code_size)
+            table = {bytes([value]): value for value in range(clear_code)}
+            next_code = end_code + 1
+            code_size = minimum_code_size + 1
+        prefix = bytes([pixel])
+    if prefix:
+        emit(table[prefix], code_size)
+    emit(end_code, code_size)
+    if bit_count:
+        output.append(bits & 0xff)
+    return bytes(output)
@@ -0,0 +1,41 @@
+from typing import List, Set
+
+from chip8.display import HEIGHT, ALL_ROWS
+
+
+class HeadlessScreen:
+    buffer: List[int]
+    dirty_rows: int
+    frames: int
+
+    def __init__(self):
+        self.buffer = [0] * HEIGHT
+        self.dirty_rows = ALL_ROWS
+        self.frames = 0
+
+    def update(self):
+        self.dirty_rows = 0
+        self.frames += 1
+
+
+class HeadlessKeyboard:
+    pressed_keys: Set[int]
+
+    def __init__(self):
+        self.pressed_keys = set()
+
+    def press(self, key: int):
+        self.pressed_keys.add(key)
+
+    def release(self, key: int):
+        self.pressed_keys.discard(key)
+
+
+class HeadlessSound:
+    is_playing: bool
+
+    def __init__(self):
+        self.is_playing = False
+
+    def update(self, sound_timer: int):
+        self.is_playing = sound_timer > 0
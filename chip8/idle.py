@@ -0,0 +1,141 @@
+from typing import Dict, List
+
+from chip8.cpu import CPU, MEMORY_SIZE, UnknownInstruction
+
+# Instructions that only read memory, the timers and the keys and only write V, I and pc. Nothing they read can
+# change within a frame: timers are decremented and keys read between frames.
+PURE = {
+    '_JP_nnn', '_SE_Vx_nn', '_SNE_Vx_nn', '_SE_Vx_Vy', '_SNE_Vx_Vy', '_SKP_Vx', '_SKNP_Vx',
+    '_LD_Vx_nn', '_ADD_Vx_nn', '_LD_Vx_Vy', '_OR_Vx_Vy', '_AND_Vx_Vy', '_XOR_Vx_Vy', '_ADD_Vx_Vy', '_SUB_Vx_Vy',
+    '_SHR_Vx_Vy', '_SUBN_Vx_Vy', '_SHL_Vx_Vy', '_LD_I_nnn', '_LD_Vx_DT', '_ADD_I_Vx', '_LD_F_Vx', '_LD_Vx_I',
+}
+SKIPS = {'_SE_Vx_nn', '_SNE_Vx_nn', '_SE_Vx_Vy', '_SNE_Vx_Vy', '_SKP_Vx', '_SKNP_Vx'}
+
+
+class IdleLoopDetector:
+    """
+    Skips the rest of a frame when the CPU spins in a loop that can't get anywhere before the next frame, like
+    polling the delay timer or the keys.
+    A loop of pure instructions that comes back to the same pc with the same V and I is a fixed point: every
+    further iteration in the frame repeats it exactly. Such a loop is executed once, the whole iterations left in
+    the frame are only counted, and the remainder is executed, so the CPU ends the frame in the same state.
+    """
+
+    max_period: int
+    cpu: CPU
+    loops: Dict[int, bool]
+    pure_words: Dict[int, bool]
+    analyzed: bytearray
+    skipped_cycles: int
+
+    def __init__(self, cpu: CPU, max_period: int = 16):
+        self.cpu = cpu
+        self.max_period = max_period
+        self.loops = {}
+        self.pure_words = {}
+        self.analyzed = bytearray(MEMORY_SIZE)
+        self.skipped_cycles = 0
+        cpu.write_hooks.append(self.invalidate)
+
+    def fast_forward(self, cycles: int) -> int:
+        """
+        Fast-forwards through an idle loop at pc, if there is one, and returns how many of the cycles are left to
+        run.
+        """
+        cpu = self.cpu
+        start = cpu.pc
+        is_loop = self.loops.get(start)
+        if is_loop is None:
+            is_loop = self.loops[start] = self._is_pure_cycle(start)
+        if not is_loop:
+            return cycles
+
+        # The first iteration may still change V or I, e.g. when a loop polling the delay timer loads it into a
+        # register that held something else. If so, the second iteration has to repeat it.
+        V = list(cpu.V)
+        I = cpu.I
+        memory = cpu.memory
+        dispatch_table = cpu.dispatch_table
+        pure_words = self.pure_words
+        period = steps = 0
+        limit = min(cycles, 2 * self.max_period)
+        while steps < limit:
+            pc = cpu.pc
+            if pc + 1 >= MEMORY_SIZE:
+                break
+            instruction = memory[pc] << 8 | memory[pc + 1]
+            pure = pure_words.get(instruction)
+            if not (self._is_pure(pc) if pure is None else pure):
+                break
+            cpu.instruction = instruction
+            cpu.pc = pc + 2
+            try:
+                dispatch_table[instruction]()
+            except Exception:
+                cpu.cycles += steps + 1
+                raise
+            period += 1
+            steps += 1
+            if cpu.pc == start:
+                if cpu.V == V and cpu.I == I:
+                    remaining = cycles - steps
+                    skipped = remaining - remaining % period
+                    cpu.cycles += steps + skipped
+                    self.skipped_cycles += skipped
+                    return remaining % period
+                if steps > period:
+                    break
+                V[:] = cpu.V
+                I = cpu.I
+                period = 0
+        cpu.cycles += steps
+        return cycles - steps
+
+    def invalidate(self, address: int, length: int):
+        if any(self.analyzed[address:address + length]):
+            self.loops.clear()
+            self.analyzed = bytearray(MEMORY_SIZE)
+
+    def _is_pure(self, address: int) -> bool:
+        if address + 1 >= MEMORY_SIZE:
+            return False
+        word = self.cpu.memory[address] << 8 | self.cpu.memory[address + 1]
+        try:
+            return self.pure_words[word]
+        except KeyError:
+            try:
+                handler, _ = self.cpu.decode(word)
+                pure = handler.__name__ in PURE
+            except UnknownInstruction:
+                pure = False
+            self.pure_words[word] = pure
+            return pure
+
+    def _is_pure_cycle(self, start: int) -> bool:
+        """
+        Whether some path of at most max_period pure instructions leads from start back to it.
+        """
+        frontier = [start]
+        seen = {start}
+        for _ in range(self.max_period):
+            next_frontier = []
+            for address in frontier:
+                self.analyzed[address:address + 2] = b"\x01\x01"
+                if not self._is_pure(address):
+                    continue
+                for successor in self._successors(address):
+                    if successor == start:
+                        return True
+                    if successor not in seen:
+                        seen.add(successor)
+                        next_frontier.append(successor)
+            frontier = next_frontier
+        return False
+
+    def _successors(self, address: int) -> List[int]:
+        handler, operands = self.cpu.decode(self.cpu.memory[address] << 8 | self.cpu.memory[address + 1])
+        if handler.__name__ == '_JP_nnn':
+            return [operands[0]]
+        if handler.__name__ in SKIPS:
+            return [address + 2, address + 4]
+        return [address + 2]
@@ -0,0 +1,237 @@
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from chip8.cpu import CPU, MEMORY_SIZE, UnknownInstruction
+from chip8.headless import HeadlessScreen
+
+# Instructions are translated into Python statements mirroring their handlers in chip8/cpu.py.
+# Straight-line instructions are translated by TEMPLATES. Jumps, skips, calls and RET end the block and are
+# translated by TERMINATORS, where {next} is the address of the following instruction and {skip} the one after.
+# Every other instruction (Fx0A, the memory accesses Fx33, Fx55 and Fx65, and unknown words) ends the block and is
+# executed through the CPU's dispatch table. The block returns the handler's result, so Fx0A stops the frame.
+# Only the last instruction of a block can fail, so a block that raises has run all of its instructions.
+TEMPLATES = {
+    '_CLS': ["cpu._CLS()"],
+    '_LD_Vx_nn': ["V[{x}] = {nn}"],
+    '_ADD_Vx_nn': ["V[{x}] = (V[{x}] + {nn}) & 0xff"],
+    '_LD_Vx_Vy': ["V[{x}] = V[{y}]"],
+    '_OR_Vx_Vy': ["V[{x}] |= V[{y}]"],
+    '_AND_Vx_Vy': ["V[{x}] &= V[{y}]"],
+    '_XOR_Vx_Vy': ["V[{x}] ^= V[{y}]"],
+    '_ADD_Vx_Vy': ["V[0xf] = 1 if V[{x}] + V[{y}] > 0xff else 0", "V[{x}] = (V[{x}] + V[{y}]) & 0xff"],
+    '_SUB_Vx_Vy': ["V[0xf] = 0 if V[{y}] > V[{x}] else 1", "V[{x}] = (V[{x}] - V[{y}]) & 0xff"],
+    '_SHR_Vx_Vy': ["V[0xf] = V[{y}] & 0b00000001", "V[{x}] = V[{y}] >> 1"],
+    '_SUBN_Vx_Vy': ["V[0xf] = 0 if V[{x}] > V[{y}] else 1", "V[{x}] = (V[{y}] - V[{x}]) & 0xff"],
+    '_SHL_Vx_Vy': ["V[0xf] = V[{y}] >> 7", "V[{x}] = (V[{y}] << 1) & 0xff"],
+    '_LD_I_nnn': ["cpu.I = {nnn}"],
+    '_RND_Vx_nn': ["V[{x}] = cpu.random.getrandbits(8) & {nn}"],
+    '_DRW_Vx_Vy_n': ["cpu._DRW_Vx_Vy_n({x}, {y}, {n})"],
+    '_LD_Vx_DT': ["V[{x}] = cpu.delay_timer"],
+    '_LD_DT_Vx': ["cpu.delay_timer = V[{x}]"],
+    '_LD_ST_Vx': ["cpu.sound_timer = V[{x}]"],
+    '_ADD_I_Vx': ["cpu.I = (cpu.I + V[{x}]) & 0xfff"],
+    '_LD_F_Vx': ["cpu.I = V[{x}] * 5"],
+}
+
+TERMINATORS = {
+    '_RET': ["cpu.pc = cpu.stack.pop()"],
+    '_JP_nnn': ["cpu.pc = {nnn}"],
+    '_CALL_nnn': ["cpu.stack.append({next})", "cpu.pc = {nnn}"],
+    '_SE_Vx_nn': ["cpu.pc = {skip} if V[{x}] == {nn} else {next}"],
+    '_SNE_Vx_nn': ["cpu.pc = {skip} if V[{x}] != {nn} else {next}"],
+    '_SE_Vx_Vy': ["cpu.pc = {skip} if V[{x}] == V[{y}] else {next}"],
+    '_SNE_Vx_Vy': ["cpu.pc = {skip} if V[{x}] != V[{y}] else {next}"],
+    '_JP_V0_nnn': ["cpu.pc = {nnn} + V[0x0]"],
+    '_SKP_Vx': ["cpu.pc = {skip} if V[{x}] in cpu.keyboard.pressed_keys else {next}"],
+    '_SKNP_Vx': ["cpu.pc = {skip} if V[{x}] not in cpu.keyboard.pressed_keys else {next}"],
+}
+
+
+class Block:
+    start: int
+    end: int
+    length: int
+    source: str
+    function: Callable[[CPU], Optional[bool]]
+
+    def __init__(self, start: int, end: int, length: int, source: str):
+        self.start = start
+        self.end = end
+        self.length = length
+        self.source = source
+
+    @property
+    def name(self) -> str:
+        return f"block_{self.start:03x}"
+
+
+class JIT:
+    """
+    Translates basic blocks starting at a given address into Python functions, which are cached by start address.
+    A block covers the memory range [start, end) and executes exactly `length` instructions.
+    """
+
+    cpu: CPU
+    max_block_length: int
+    blocks: Dict[int, Block]
+    code_map: bytearray
+
+    def __init__(self, cpu: CPU, max_block_length: int = 64):
+        self.cpu = cpu
+        self.max_block_length = max_block_length
+        self.blocks = {}
+        self.code_map = bytearray(MEMORY_SIZE)
+        cpu.write_hooks.append(self.invalidate)
+
+    def preload(self, rom: bytes):
+        """
+        Called once a ROM is loaded. Blocks are translated as they are reached, so there is nothing to do yet.
+        """
+
+    def block_at(self, address: int) -> Block:
+        try:
+            return self.blocks[address]
+        except KeyError:
+            block = self.blocks[address] = self.compile(address)
+            self.code_map[block.start:block.end] = b"\x01" * (block.end - block.start)
+            return block
+
+    def invalidate(self, address: int, length: int):
+        end = address + length
+        if not any(self.code_map[address:end]):
+            return
+        for start, block in list(self.blocks.items()):
+            if block.start < end and address < block.end:
+                del self.blocks[start]
+        self.code_map = bytearray(MEMORY_SIZE)
+        for block in self.blocks.values():
+            self.code_map[block.start:block.end] = b"\x01" * (block.end - block.start)
+
+    def compile(self, start: int) -> Block:
+        block = self.translate(start)
+        namespace = {}
+        exec(compile(block.source, f"<block 0x{start:03X}>", "exec"), namespace)
+        block.function = namespace[block.name]
+        return block
+
+    def translate(self, start: int) -> Block:
+        memory = self.cpu.memory
+        lines = [f"def block_{start:03x}(cpu):", "V = cpu.V"]
+        address = start
+        length = 0
+        while length < self.max_block_length and address + 1 < MEMORY_SIZE:
+            instruction = memory[address] << 8 | memory[address + 1]
+            length += 1
+            address += 2
+            try:
+                handler, operands = self.cpu.decode(instruction)
+                name = handler.__name__
+            except UnknownInstruction:
+                handler, operands, name = None, (), None
+
+            if name in TEMPLATES:
+                lines += self._format(TEMPLATES[name], handler, operands, address)
+                continue
+
+            lines.append(f"cpu.instruction = 0x{instruction:04X}")
+            if name in TERMINATORS:
+                lines += self._format(TERMINATORS[name], handler, operands, address)
+            else:
+                lines += [f"cpu.pc = 0x{address:03X}", f"return cpu.dispatch_table[0x{instruction:04X}]()"]
+            break
+        else:
+            if length == 0:
+                # Too close to the end of memory to fetch an instruction: let the interpreter fail the same way.
+                lines += [f"cpu.pc = 0x{address:03X}", "return cpu.step()"]
+                length = 1
+                address += 2
+            else:
+                lines += [f"cpu.instruction = 0x{instruction:04X}", f"cpu.pc = 0x{address:03X}"]
+
+        source = "\n    ".join(lines) + "\n"
+        return Block(start, address, length, source)
+
+    @staticmethod
+    def _format(template: List[str], handler: Callable, operands: Tuple[int, ...], next_address: int) -> List[str]:
+        code = handler.__func__.__code__
+        fields = dict(zip(code.co_varnames[1:code.co_argcount], operands), next=next_address, skip=next_address + 2)
+        return [line.format(**{name: hex(value) for name, value in fields.items()}) for line in template]
+
+
+class DifferentialJIT(JIT):
+    """
+    Runs every compiled block alongside the interpreter on a shadow CPU, starting from the same state and drawing
+    the same random numbers, and raises JITMismatch as soon as the two disagree.
+    """
+
+    shadow: CPU
+
+    def __init__(self, cpu: CPU, max_block_length: int = 64):
+        super().__init__(cpu, max_block_length)
+        self.shadow = CPU(HeadlessScreen(), cpu.keyboard, cpu.starting_address)
+
+    def compile(self, start: int) -> Block:
+        block = super().compile(start)
+        compiled = block.function
+
+        def checked(cpu: CPU):
+            self._synchronize()
+            source = cpu.random
+            cpu.random = capture = RandomCapture(source)
+            try:
+                return compiled(cpu)
+            finally:
+                cpu.random = source
+                self.shadow.random = RandomPlayback(capture.draws)
+                try:
+                    self.shadow.run_cycles(block.length)
+                except StopIteration:
+                    raise JITMismatch(block, 'random')
+                self._compare(block)
+
+        block.function = checked
+        return block
+
+    def _synchronize(self):
+        cpu, shadow = self.cpu, self.shadow
+        shadow.memory[:] = cpu.memory
+        shadow.stack[:] = cpu.stack
+        shadow.V[:] = cpu.V
+        shadow.screen.buffer[:] = cpu.screen.buffer
+        for field in STATE_FIELDS:
+            setattr(shadow, field, getattr(cpu, field))
+
+    def _compare(self, block: Block):
+        cpu, shadow = self.cpu, self.shadow
+        for field in STATE_FIELDS + ['memory', 'stack', 'V']:
+            if getattr(cpu, field) != getattr(shadow, field):
+                raise JITMismatch(block, field)
+        if cpu.screen.buffer != shadow.screen.buffer:
+            raise JITMismatch(block, 'screen')
+
+
+class RandomCapture:
+    def __init__(self, source: random.Random):
+        self.source = source
+        self.draws = []
+
+    def getrandbits(self, k: int) -> int:
+        value = self.source.getrandbits(k)
+        self.draws.append(value)
+        return value
+
+
+class RandomPlayback:
+    def __init__(self, draws: List[int]):
+        self.draws = iter(draws)
+
+    def getrandbits(self, k: int) -> int:
+        return next(self.draws)
+
+
+STATE_FIELDS: List[str] = ['pc', 'I', 'delay_timer', 'sound_timer', 'instruction', 'waiting_for_keypress']
+
+
+class JITMismatch(Exception):
+    def __init__(self, block: Block, field: str):
+        super().__init__(f"block at {block.start:03X}: {field} differs from the interpreter")
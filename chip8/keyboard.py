@@ -10,6 +10,7 @@ KEY_MAPPING = {
     pygame.K_a: 0x7, pygame.K_s: 0x8, pygame.K_d: 0x9, pygame.K_f: 0xe,
     pygame.K_z: 0xa, pygame.K_x: 0x0, pygame.K_c: 0xb, pygame.K_v: 0xf
 }
+REWIND_KEY = pygame.K_BACKSPACE
 
 
 class Keyboard:
@@ -18,13 +19,19 @@ class Keyboard:
     def __init__(self):
         self.pressed_keys = set()
 
+    def press(self, key: int):
+        self.pressed_keys.add(key)
+
+    def release(self, key: int):
+        self.pressed_keys.discard(key)
+
     def keydown(self, event):
         if event.key in KEY_MAPPING:
-            self.pressed_keys.add(KEY_MAPPING[event.key])
+            self.press(KEY_MAPPING[event.key])
 
     def keyup(self, event) -> Union[int, None]:
         if event.key in KEY_MAPPING:
-            self.pressed_keys.discard(KEY_MAPPING[event.key])
+            self.release(KEY_MAPPING[event.key])
             return KEY_MAPPING[event.key]
         else:
             return None
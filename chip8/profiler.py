@@ -0,0 +1,106 @@
+import json
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from chip8.cpu import CPU, DispatchTable, UnknownInstruction
+
+
+class Profiler:
+    """
+    Counts executions and time per opcode family (handler) and per address, by replacing the CPU's dispatch table
+    with one whose entries wrap the pre-bound handlers. A CPU without a profiler attached keeps the plain dispatch
+    table, so profiling costs nothing unless it is enabled.
+
+    Compiled JIT blocks bypass the dispatch table, so only instructions executed by the interpreter are counted.
+    """
+
+    cpu: CPU
+    samples: Dict[Tuple[str, int], List[int]]
+    wait_cycles: int
+
+    def __init__(self, cpu: CPU):
+        self.cpu = cpu
+        self.samples = {}
+        self.wait_cycles = 0
+        cpu.dispatch_table = ProfilingDispatchTable(cpu, self)
+
+    def detach(self):
+        self.cpu.dispatch_table = DispatchTable(self.cpu)
+
+    def call(self, family: str, handler: Callable[[], Optional[bool]]) -> Optional[bool]:
+        # The CPU advances pc before dispatching, both when stepping and from compiled blocks.
+        key = (family, self.cpu.pc - 2)
+        start = time.perf_counter_ns()
+        try:
+            return handler()
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            try:
+                sample = self.samples[key]
+            except KeyError:
+                sample = self.samples[key] = [0, 0]
+            sample[0] += 1
+            sample[1] += elapsed
+
+    def families(self) -> Dict[str, Dict[str, float]]:
+        totals = {}
+        for (family, _), (count, nanoseconds) in self.samples.items():
+            total = totals.setdefault(family, {'count': 0, 'nanoseconds': 0})
+            total['count'] += count
+            total['nanoseconds'] += nanoseconds
+        return dict(sorted(totals.items(), key=lambda item: item[1]['nanoseconds'], reverse=True))
+
+    def addresses(self) -> Dict[int, Dict[str, object]]:
+        return {address: {'family': family, 'count': count, 'nanoseconds': nanoseconds}
+                for (family, address), (count, nanoseconds) in sorted(self.samples.items(), key=lambda s: s[0][1])}
+
+    def to_dict(self) -> Dict:
+        families = self.families()
+        return {
+            'instructions': sum(count for count, _ in self.samples.values()),
+            'draws': families.get('DRW_Vx_Vy_n', {}).get('count', 0),
+            'keypress_waits': families.get('LD_Vx_K', {}).get('count', 0),
+            'wait_cycles': self.wait_cycles,
+            'families': families,
+            'addresses': {f"0x{address:03X}": stats for address, stats in self.addresses().items()}
+        }
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def folded(self, by_time: bool = True) -> List[str]:
+        """
+        Returns one `family;address weight` line per sampled address, as read by flamegraph.pl and speedscope.
+        Lines are weighted by nanoseconds spent, or by execution count.
+        """
+        lines = []
+        for (family, address), (count, nanoseconds) in sorted(self.samples.items()):
+            lines.append(f"{family};0x{address:03X} {nanoseconds if by_time else count}")
+        if self.wait_cycles and not by_time:
+            lines.append(f"LD_Vx_K;waiting {self.wait_cycles}")
+        return lines
+
+    def write_folded(self, path: str, by_time: bool = True):
+        with open(path, "w") as f:
+            f.write("\n".join(self.folded(by_time)) + "\n")
+
+
+class ProfilingDispatchTable(DispatchTable):
+    def __init__(self, cpu: CPU, profiler: Profiler):
+        super().__init__(cpu)
+        self.profiler = profiler
+
+    def __missing__(self, instruction: int) -> Callable[[], Optional[bool]]:
+        handler = self[instruction] = partial(self.profiler.call, family(self.cpu, instruction),
+                                              self.cpu._bind(instruction))
+        return handler
+
+
+def family(cpu: CPU, instruction: int) -> str:
+    try:
+        handler, _ = cpu.decode(instruction)
+    except UnknownInstruction:
+        return "unknown"
+    return handler.__name__.lstrip("_")
@@ -0,0 +1,211 @@
+import hashlib
+import random
+import struct
+from collections import deque
+from typing import BinaryIO, Deque, Iterator, Optional, Tuple
+
+from chip8.chip8 import Chip8
+
+# A recording is a header followed by a stream of events, written as they happen:
+#   header: magic, version, starting address (2 bytes), cycles per frame (2 bytes), SHA-1 of the ROM (20 bytes)
+#   event:  cycles executed since the previous event as a LEB128 varint, a tag byte, and for RND the drawn byte.
+# Key transitions are applied between frames, so they are replayed before the first frame that starts at their
+# cycle count. RND draws are replayed in order.
+RECORDING_MAGIC = b"CH8R"
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct(">4sBHH20s")
+
+PRESS = 0x00  # | key
+RELEASE = 0x10  # | key
+RND = 0x20
+END = 0x30
+
+
+class Recorder:
+    """
+    Logs the key transitions and random numbers of a session from power-on, so that replay() can reproduce it.
+    """
+
+    chip8: Chip8
+    stream: BinaryIO
+    cycles: int
+
+    def __init__(self, chip8: Chip8, stream: BinaryIO):
+        self.chip8 = chip8
+        self.stream = stream
+        self.cycles = chip8.cycles
+        stream.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, chip8.cpu.starting_address,
+                                           chip8.cycles_per_frame, hashlib.sha1(chip8.rom).digest()))
+        chip8.cpu.random = RecordingRandom(chip8.cpu.random, self)
+        chip8.key_hooks.append(self.key_changed)
+
+    def key_changed(self, key: int, pressed: bool):
+        self._write(bytes([(PRESS if pressed else RELEASE) | key]))
+
+    def close(self):
+        self._write(bytes([END]))
+        self.stream.flush()
+
+    def _write(self, event: bytes):
+        cycles = self.chip8.cycles
+        self.stream.write(encode_varint(cycles - self.cycles) + event)
+        self.cycles = cycles
+
+
+class RecordingRandom:
+    def __init__(self, source: random.Random, recorder: Recorder):
+        self.source = source
+        self.recorder = recorder
+
+    def getrandbits(self, k: int) -> int:
+        value = self.source.getrandbits(k)
+        self.recorder._write(bytes([RND, value]))
+        return value
+
+
+class Player:
+    """
+    Reads the events of a recording as they are needed: random numbers for the CPU, and key transitions for the
+    frames about to start.
+    """
+
+    events: Iterator[Tuple[int, int, int]]
+    keys: Deque[Tuple[int, int]]
+    draws: Deque[int]
+    end: Optional[int]
+    exhausted: bool
+
+    def __init__(self, events: Iterator[Tuple[int, int, int]]):
+        self.events = events
+        self.keys = deque()
+        self.draws = deque()
+        self.end = None
+        self.exhausted = False
+
+    def getrandbits(self, k: int) -> int:
+        while not self.draws:
+            if not self._read():
+                raise ReplayDivergence("the replay draws more random numbers than were recorded")
+        return self.draws.popleft()
+
+    def due_keys(self, cycles: int) -> Iterator[int]:
+        while True:
+            if self.keys:
+                if self.keys[0][0] > cycles:
+                    return
+                yield self.keys.popleft()[1]
+            elif self.end is not None or not self._read():
+                return
+
+    def _read(self) -> bool:
+        event = next(self.events, None)
+        if event is None:
+            self.exhausted = True
+            return False
+        cycles, tag, value = event
+        if tag == RND:
+            self.draws.append(value)
+        elif tag == END:
+            self.end = cycles
+        else:
+            self.keys.append((cycles, tag))
+        return True
+
+
+def read_header(stream: BinaryIO) -> Tuple[int, int, bytes]:
+    header = stream.read(RECORDING_HEADER.size)
+    if len(header) != RECORDING_HEADER.size:
+        raise ValueError("truncated recording header")
+    magic, version, starting_address, cycles_per_frame, rom_hash = RECORDING_HEADER.unpack(header)
+    if magic != RECORDING_MAGIC:
+        raise ValueError("not a CHIP-8 recording")
+    if version != RECORDING_VERSION:
+        raise ValueError(f"unsupported recording version {version}")
+    return starting_address, cycles_per_frame, rom_hash
+
+
+def read_events(stream: BinaryIO) -> Iterator[Tuple[int, int, int]]:
+    """
+    Yields (cycles, tag, value) for every event, where value is the drawn number for RND and 0 otherwise. Raises
+    ValueError if the recording ends in the middle of an event.
+    """
+    cycles = 0
+    while True:
+        delta = decode_varint(stream)
+        if delta is None:
+            return
+        cycles += delta
+        tag = read_byte(stream)
+        yield cycles, tag, read_byte(stream) if tag == RND else 0
+
+
+def replay(rom: bytes, stream: BinaryIO, jit: bool = False) -> Chip8:
+    """
+    Runs a recording headlessly at full speed and returns the machine in its final state.
+    """
+    starting_address, cycles_per_frame, rom_hash = read_header(stream)
+    if hashlib.sha1(rom).digest() != rom_hash:
+        raise ValueError("the recording was made with a different ROM")
+    chip8 = Chip8(scaling_factor=1, cycles_per_frame=cycles_per_frame, starting_address=starting_address,
+                  headless=True, jit=jit)
+    chip8.load(rom)
+    player = Player(read_events(stream))
+    chip8.cpu.random = player
+
+    while True:
+        for event in player.due_keys(chip8.cycles):
+            if event & 0xf0 == PRESS:
+                chip8.press_key(event & 0x0f)
+            else:
+                chip8.release_key(event & 0x0f)
+        waiting_for_key = chip8.cpu.waiting_for_keypress and not player.keys
+        if player.end is not None:
+            if chip8.cycles >= player.end or waiting_for_key:
+                break
+        elif player.exhausted and not player.keys and (not player.draws or waiting_for_key):
+            # The recording was cut off without an END event: replay as far as it goes.
+            break
+        chip8.tick()
+
+    if player.end is not None and chip8.cycles != player.end:
+        raise ReplayDivergence(f"the replay stopped after {chip8.cycles} cycles instead of {player.end}")
+    if player.draws:
+        raise ReplayDivergence("the replay drew fewer random numbers than were recorded")
+    return chip8
+
+
+def encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def decode_varint(stream: BinaryIO) -> Optional[int]:
+    """
+    Returns the next varint, or None at the end of the stream.
+    """
+    byte = stream.read(1)
+    if not byte:
+        return None
+    byte = byte[0]
+    value = 0
+    shift = 0
+    while byte >= 0x80:
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        byte = read_byte(stream)
+    return value | byte << shift
+
+
+def read_byte(stream: BinaryIO) -> int:
+    byte = stream.read(1)
+    if not byte:
+        raise ValueError("truncated recording")
+    return byte[0]
+
+
+class ReplayDivergence(Exception):
+    pass
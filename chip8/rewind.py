@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from chip8.cpu import CPU, MEMORY_SIZE, SNAPSHOT_HEADER
+
+MEMORY_START = SNAPSHOT_HEADER.size
+MEMORY_END = MEMORY_START + MEMORY_SIZE
+
+# A recorded frame is its keyframe plus, unless it is the keyframe itself, the snapshot header (registers, timers
+# and framebuffer), the memory written since the keyframe and its offset, and the stack.
+Frame = Tuple[bytes, Optional[bytes], int, bytes, bytes]
+
+
+class Rewind:
+    """
+    Keeps the CPU snapshots of the last `seconds` of frames in a ring buffer.
+    Every `keyframe_interval` frames a full snapshot is kept as a keyframe. The frames in between store their
+    small header and stack in full, but only the span of memory written since their keyframe, which the CPU's
+    write hooks report and games keep short since they mostly write a score or a few variables.
+    """
+
+    cpu: CPU
+    frames: Deque[Frame]
+    keyframe_interval: int
+    keyframe: Optional[bytes]
+    since_keyframe: int
+    written_start: int
+    written_end: int
+
+    def __init__(self, cpu: CPU, seconds: float, keyframe_interval: int = 60, frame_rate: int = 60):
+        self.cpu = cpu
+        self.frames = deque(maxlen=max(1, round(seconds * frame_rate)))
+        self.keyframe_interval = keyframe_interval
+        self.keyframe = None
+        self.since_keyframe = 0
+        self.written_start = MEMORY_SIZE
+        self.written_end = 0
+        cpu.write_hooks.append(self.memory_written)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def memory_written(self, address: int, length: int):
+        if address < self.written_start:
+            self.written_start = address
+        if address + length > self.written_end:
+            self.written_end = min(address + length, MEMORY_SIZE)
+
+    def record(self):
+        snapshot = self.cpu.snapshot()
+        if self.keyframe is None or self.since_keyframe >= self.keyframe_interval:
+            self.keyframe = snapshot
+            self.since_keyframe = 1
+            self.written_start = MEMORY_SIZE
+            self.written_end = 0
+            self.frames.append((snapshot, None, 0, b"", b""))
+            return
+
+        start = MEMORY_START + self.written_start
+        span = snapshot[start:MEMORY_START + self.written_end]
+        self.frames.append((self.keyframe, snapshot[:MEMORY_START], start, span, snapshot[MEMORY_END:]))
+        self.since_keyframe += 1
+
+    def pop(self) -> Optional[bytes]:
+        if not self.frames:
+            return None
+        keyframe, header, start, span, stack = self.frames.pop()
+        # Later frames must not be encoded against a keyframe that may just have been dropped.
+        self.keyframe = None
+        if header is None:
+            return keyframe
+        return b"".join([header, keyframe[MEMORY_START:start], span, keyframe[start + len(span):MEMORY_END], stack])
+
+    def rewind(self, frames: int = 1) -> bool:
+        """
+        Restores the CPU to its state `frames` recorded frames ago, dropping those frames from the buffer.
+        Returns False if there is nothing left to rewind to.
+        """
+        snapshot = None
+        for _ in range(frames):
+            snapshot = self.pop() or snapshot
+        if snapshot is None:
+            return False
+        self.cpu.restore(snapshot)
+        return True
+
+    def size(self) -> int:
+        keyframes = {id(frame[0]): len(frame[0]) for frame in self.frames}
+        return sum(keyframes.values()) + sum(len(header or b"") + len(span) + len(stack)
+                                             for _, header, _, span, stack in self.frames)
@@ -0,0 +1,95 @@
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class FrameStats:
+    """
+    How late frames started relative to their deadlines, over the last `window` frames, and how many frames were
+    dropped because the host fell too far behind.
+    """
+
+    frames: int
+    dropped_frames: int
+    lateness: Deque[float]
+
+    def __init__(self, window: int = 3600):
+        self.frames = 0
+        self.dropped_frames = 0
+        self.lateness = deque(maxlen=window)
+
+    def record(self, lateness: float):
+        self.frames += 1
+        self.lateness.append(lateness)
+
+    def to_dict(self) -> Dict:
+        lateness = sorted(self.lateness)
+        if not lateness:
+            lateness = [0.0]
+        mean = sum(lateness) / len(lateness)
+        return {
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'mean_lateness_ms': mean * 1000,
+            'jitter_ms': math.sqrt(sum((value - mean) ** 2 for value in lateness) / len(lateness)) * 1000,
+            'p99_lateness_ms': lateness[min(len(lateness) - 1, int(len(lateness) * 0.99))] * 1000,
+            'max_lateness_ms': lateness[-1] * 1000,
+        }
+
+    def __str__(self) -> str:
+        stats = self.to_dict()
+        return (f"{stats['frames']} frames, {stats['dropped_frames']} dropped, lateness: "
+                f"mean {stats['mean_lateness_ms']:.2f} ms, jitter {stats['jitter_ms']:.2f} ms, "
+                f"p99 {stats['p99_lateness_ms']:.2f} ms, max {stats['max_lateness_ms']:.2f} ms")
+
+
+class FrameScheduler:
+    """
+    Paces frames against a monotonic clock, with deadlines at exact multiples of the frame duration so that
+    rounding and wake-up delays never accumulate.
+    A frame that starts late is caught up by running the frames that are due back to back, up to `max_catch_up`
+    at a time; if the host fell further behind, e.g. while the window was being dragged, the rest are dropped and
+    the schedule restarts from now rather than fast-forwarding through them.
+    """
+
+    frame_duration: float
+    max_catch_up: int
+    next_frame: float
+    stats: FrameStats
+    clock: Callable[[], float]
+
+    def __init__(self, rate: float = 60, max_catch_up: int = 4, clock: Callable[[], float] = time.monotonic):
+        self.frame_duration = 1 / rate
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.next_frame = clock()
+        self.stats = FrameStats()
+
+    def restart(self):
+        self.next_frame = self.clock()
+
+    def due_frames(self, limit: Optional[int] = None) -> int:
+        """
+        Returns how many frames to run now, at most `limit`, and schedules the next one. Frames beyond the limit, e.g.
+        past the end of a run, are neither run nor counted as dropped.
+        """
+        now = self.clock()
+        lateness = now - self.next_frame
+        if lateness < 0:
+            return 0
+        due = int(lateness / self.frame_duration) + 1
+        if limit is not None:
+            due = min(due, limit)
+        if due > self.max_catch_up:
+            self.stats.dropped_frames += due - self.max_catch_up
+            due = self.max_catch_up
+            self.next_frame = now + self.frame_duration
+        else:
+            self.next_frame += due * self.frame_duration
+        for frame in range(due):
+            self.stats.record(max(0.0, lateness - frame * self.frame_duration))
+        return due
+
+    def time_until_next_frame(self) -> float:
+        return max(0.0, self.next_frame - self.clock())
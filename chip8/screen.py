@@ -1,36 +1,87 @@
 import os
-from typing import List
+import re
+import sys
+from typing import List, Optional
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = ""
 import pygame
 
-WIDTH = 64
-HEIGHT = 32
+from chip8.display import ALL_ROWS, HEIGHT, RENDERERS, WIDTH, dirty_spans
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 
 
 class Screen:
+    """
+    Two renderers are available:
+
+    rect: fills one rect per run of lit pixels, directly on the window surface.
+    blit: writes the framebuffer into a native 64x32 surface and scales it onto the window in a single blit,
+          so its cost hardly depends on the scaling factor.
+    """
+
     surface: pygame.Surface
-    buffer: List[List[bool]]
+    native: Optional[pygame.Surface]
+    buffer: List[int]
+    dirty_rows: int
     scaling_factor: int
+    renderer: str
 
-    def __init__(self, scaling_factor: int = 1):
+    def __init__(self, scaling_factor: int = 1, renderer: str = "rect"):
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer: {renderer}")
+        pygame.display.init()
         self.surface = pygame.display.set_mode((WIDTH * scaling_factor, HEIGHT * scaling_factor))
-        self.buffer = [[False] * WIDTH for _ in range(HEIGHT)]
+        self.buffer = [0] * HEIGHT
+        self.dirty_rows = ALL_ROWS
         self.scaling_factor = scaling_factor
+        self.renderer = renderer
         pygame.display.set_caption("CHIP-8")
 
+        if renderer == "blit":
+            self.native = pygame.Surface((WIDTH, HEIGHT), 0, self.surface)
+            self._pixel_bytes = self._build_pixel_bytes()
+            self._draw_rows = self._blit_rows
+        else:
+            self.native = None
+            self._draw_rows = self._draw_rects
+
     def update(self):
-        self.surface.fill(BLACK)
-        self._draw_pixels()
-        pygame.display.flip()
-
-    def _draw_pixels(self):
-        for y, row in enumerate(self.buffer):
-            for x, pixel in enumerate(row):
-                if pixel:
-                    rect = (x * self.scaling_factor, y * self.scaling_factor,
-                            self.scaling_factor, self.scaling_factor)
-                    pygame.draw.rect(self.surface, WHITE, rect)
+        rects = [self._draw_rows(first, last) for first, last in dirty_spans(self.dirty_rows)]
+        self.dirty_rows = 0
+        pygame.display.update(rects)
+
+    def _area(self, first: int, last: int) -> pygame.Rect:
+        scaling_factor = self.scaling_factor
+        return pygame.Rect(0, first * scaling_factor, WIDTH * scaling_factor, (last - first + 1) * scaling_factor)
+
+    def _draw_rects(self, first: int, last: int) -> pygame.Rect:
+        scaling_factor = self.scaling_factor
+        area = self._area(first, last)
+        self.surface.fill(BLACK, area)
+        for y in range(first, last + 1):
+            for run in re.finditer("1+", f"{self.buffer[y]:0{WIDTH}b}"):
+                rect = (run.start() * scaling_factor, y * scaling_factor,
+                        (run.end() - run.start()) * scaling_factor, scaling_factor)
+                pygame.draw.rect(self.surface, WHITE, rect)
+        return area
+
+    def _build_pixel_bytes(self) -> List[bytes]:
+        bytesize = self.native.get_bytesize()
+        black = self.native.map_rgb(BLACK).to_bytes(bytesize, sys.byteorder)
+        white = self.native.map_rgb(WHITE).to_bytes(bytesize, sys.byteorder)
+        return [b"".join(white if byte >> bit & 1 else black for bit in range(7, -1, -1)) for byte in range(256)]
+
+    def _blit_rows(self, first: int, last: int) -> pygame.Rect:
+        pixels = self.native.get_buffer()
+        pitch = self.native.get_pitch()
+        for y in range(first, last + 1):
+            row = b"".join([self._pixel_bytes[byte] for byte in self.buffer[y].to_bytes(WIDTH // 8, "big")])
+            pixels.write(row, y * pitch)
+        del pixels
+
+        area = self._area(first, last)
+        source = self.native.subsurface(pygame.Rect(0, first, WIDTH, last - first + 1))
+        pygame.transform.scale(source, area.size, self.surface.subsurface(area))
+        return area
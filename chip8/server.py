@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import struct
+from typing import List, Optional, Tuple
+
+from chip8.aio import AsyncChip8
+from chip8.display import WIDTH, HEIGHT
+
+# Every connection plays its own headless machine. The server sends a header, then an update whenever the screen
+# changed since the last update it sent, and an error before closing the connection if the machine crashed:
+#   header: magic, version, width, height
+#   update: the UPDATE tag, the frame number, a mask of the rows that changed (bit n for row n), the length of the
+#           payload, and the payload: the changed rows XORed with their previous contents as big-endian 64-bit
+#           integers, in row order, run-length encoded as a sequence of a control byte c followed by c + 1 literal
+#           bytes if c < 0x80, or standing for c - 0x7f zero bytes otherwise.
+#   error:  the ERROR tag, the length of the message and the message in UTF-8.
+# The client sends one byte per key transition, tagged like in recordings.
+SERVER_MAGIC = b"CH8D"
+SERVER_VERSION = 2
+SERVER_HEADER = struct.Struct(">4sBBB")
+UPDATE = 0x01
+ERROR = 0x02
+UPDATE_HEADER = struct.Struct(">IIH")
+ERROR_HEADER = struct.Struct(">H")
+
+PRESS = 0x00  # | key
+RELEASE = 0x10  # | key
+
+ZERO_RUN = 0x80
+MAX_RUN = 0x80
+
+logger = logging.getLogger(__name__)
+
+
+class ServerError(Exception):
+    """
+    The machine a client was playing crashed.
+    """
+
+
+def encode_delta(previous: Tuple[int, ...], rows: Tuple[int, ...]) -> Tuple[int, bytes]:
+    """
+    Returns the mask of rows that differ and the run-length encoded XOR of those rows.
+    """
+    mask = 0
+    delta = []
+    for row, (before, after) in enumerate(zip(previous, rows)):
+        if before != after:
+            mask |= 1 << row
+            delta.append((before ^ after).to_bytes(8, 'big'))
+    return mask, run_length_encode(b"".join(delta))
+
+
+def apply_delta(rows: List[int], mask: int, payload: bytes):
+    delta = run_length_decode(payload)
+    offset = 0
+    for row in range(HEIGHT):
+        if mask >> row & 1:
+            rows[row] ^= int.from_bytes(delta[offset:offset + 8], 'big')
+            offset += 8
+
+
+def run_length_encode(data: bytes) -> bytes:
+    encoded = bytearray()
+    literal_start = i = 0
+    length = len(data)
+    while i < length:
+        if data[i]:
+            i += 1
+            continue
+        zeros_end = i
+        while zeros_end < length and not data[zeros_end] and zeros_end - i < MAX_RUN:
+            zeros_end += 1
+        # A single zero between literals is cheaper as a literal.
+        if zeros_end - i == 1 and i > literal_start and zeros_end < length and data[zeros_end]:
+            i = zeros_end
+            continue
+        _encode_literals(encoded, data[literal_start:i])
+        encoded.append(ZERO_RUN + zeros_end - i - 1)
+        literal_start = i = zeros_end
+    _encode_literals(encoded, data[literal_start:])
+    return bytes(encoded)
+
+
+def _encode_literals(encoded: bytearray, literals: bytes):
+    for start in range(0, len(literals), MAX_RUN):
+        chunk = literals[start:start + MAX_RUN]
+        encoded.append(len(chunk) - 1)
+        encoded += chunk
+
+
+def run_length_decode(payload: bytes) -> bytes:
+    decoded = bytearray()
+    i = 0
+    while i < len(payload):
+        control = payload[i]
+        if control >= ZERO_RUN:
+            decoded += bytes(control - ZERO_RUN + 1)
+            i += 1
+        else:
+            decoded += payload[i + 1:i + control + 2]
+            i += control + 2
+    return bytes(decoded)
+
+
+class Session:
+    """
+    Plays a machine for one connection: streams screen updates to the client and applies the keys it sends.
+    Updates are XORed against the last rows sent rather than the previous frame, so frames dropped while the client
+    is slow to read are merged into the next update.
+    """
+
+    chip8: AsyncChip8
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    sent_rows: Tuple[int, ...]
+    bytes_sent: int
+
+    def __init__(self, chip8: AsyncChip8, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.chip8 = chip8
+        self.reader = reader
+        self.writer = writer
+        self.sent_rows = (0,) * HEIGHT
+        self.bytes_sent = 0
+
+    async def run(self, frames: Optional[int] = None):
+        self._write(SERVER_HEADER.pack(SERVER_MAGIC, SERVER_VERSION, WIDTH, HEIGHT))
+        updates = asyncio.ensure_future(self._send_updates())
+        keys = asyncio.ensure_future(self._receive_keys())
+        # Let the update stream subscribe before the first frame.
+        await asyncio.sleep(0)
+        machine = asyncio.ensure_future(self.chip8.run(frames))
+        try:
+            await asyncio.wait([machine, keys], return_when=asyncio.FIRST_COMPLETED)
+            if machine.done():
+                # The updates up to the end, or the crash, are sent first.
+                await updates
+                error = machine.exception()
+                if error is not None:
+                    logger.error("Session crashed", exc_info=error)
+                    message = f"{type(error).__name__}: {error}".encode()
+                    self._write(bytes([ERROR]) + ERROR_HEADER.pack(len(message)) + message)
+                    try:
+                        await self.writer.drain()
+                    except ConnectionError:
+                        pass
+        finally:
+            for task in (machine, keys, updates):
+                task.cancel()
+            self.writer.close()
+
+    async def _send_updates(self):
+        try:
+            async for frame, rows in self.chip8.stream():
+                if rows != self.sent_rows:
+                    mask, payload = encode_delta(self.sent_rows, rows)
+                    self.sent_rows = rows
+                    self._write(bytes([UPDATE]) + UPDATE_HEADER.pack(frame, mask, len(payload)) + payload)
+                    await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    async def _receive_keys(self):
+        while True:
+            data = await self.reader.read(64)
+            if not data:
+                return
+            for event in data:
+                tag = event & 0xf0
+                if tag in (PRESS, RELEASE):
+                    self.chip8.keys.put_nowait((event & 0xf, tag == PRESS))
+
+    def _write(self, data: bytes):
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+
+async def start_server(rom: bytes, host: str = "127.0.0.1", port: int = 8564, cycles_per_frame: int = 10,
+                       starting_address: int = 0x200, **options) -> asyncio.AbstractServer:
+    """
+    Starts serving a fresh machine running the ROM to every connection; options are passed on to AsyncChip8.
+    """
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        chip8 = AsyncChip8(cycles_per_frame, starting_address, **options)
+        chip8.load(rom)
+        await Session(chip8, reader, writer).run()
+
+    return await asyncio.start_server(serve, host, port)
+
+
+async def read_header(reader: asyncio.StreamReader) -> Tuple[int, int]:
+    """
+    Reads the header a server sends on connecting, and returns the screen's width and height.
+    """
+    magic, version, width, height = SERVER_HEADER.unpack(await reader.readexactly(SERVER_HEADER.size))
+    if magic != SERVER_MAGIC:
+        raise ValueError("Not a CHIP-8 frame stream")
+    if version != SERVER_VERSION:
+        raise ValueError(f"Unsupported frame stream version {version}")
+    return width, height
+
+
+async def read_update(reader: asyncio.StreamReader, rows: List[int]) -> int:
+    """
+    Reads the next update into rows, and returns its frame number. Raises ServerError if the machine crashed.
+    """
+    tag = (await reader.readexactly(1))[0]
+    if tag == ERROR:
+        length, = ERROR_HEADER.unpack(await reader.readexactly(ERROR_HEADER.size))
+        raise ServerError((await reader.readexactly(length)).decode())
+    if tag != UPDATE:
+        raise ValueError(f"Unknown message {tag:#04x}")
+    frame, mask, length = UPDATE_HEADER.unpack(await reader.readexactly(UPDATE_HEADER.size))
+    apply_delta(rows, mask, await reader.readexactly(length))
+    return frame
@@ -0,0 +1,115 @@
+import struct
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+from chip8.display import WIDTH, HEIGHT
+
+# The shared memory block holds a header followed by the framebuffer:
+#   header: magic, version, width, height, a sequence number and the number of the frame shown
+#   rows:   the 32 rows as big-endian 64-bit integers, the most significant bit being the leftmost pixel
+# The sequence number is a seqlock: it is odd while the emulator is writing, and a reader's copy is consistent if
+# the sequence number was the same even number before and after copying.
+SHM_MAGIC = b"CH8M"
+SHM_VERSION = 1
+SHM_HEADER = struct.Struct(">4sBBBxQQ")
+SEQUENCE = struct.Struct(">Q")
+SEQUENCE_OFFSET = 8
+SNAPSHOT = struct.Struct(f">QQ{HEIGHT}Q")
+ROWS = struct.Struct(f">{HEIGHT}Q")
+SHM_SIZE = SHM_HEADER.size + ROWS.size
+
+# Names of the blocks this process created, which its resource tracker rightly unlinks if it dies without closing them.
+_created = set()
+
+
+class SharedFramebuffer:
+    """
+    Publishes the framebuffer after every frame in a shared memory block that other processes can map with
+    SharedFramebufferReader. Publishing never waits for readers: a reader that copies a frame while it is being
+    written notices from the sequence number and retries.
+    """
+
+    memory: shared_memory.SharedMemory
+    sequence: int
+    rows: Optional[List[int]]
+
+    def __init__(self, name: Optional[str] = None):
+        self.memory = shared_memory.SharedMemory(name, create=True, size=SHM_SIZE)
+        _created.add(self.memory.name)
+        self.sequence = 0
+        self.rows = None
+        SHM_HEADER.pack_into(self.memory.buf, 0, SHM_MAGIC, SHM_VERSION, WIDTH, HEIGHT, 0, 0)
+        ROWS.pack_into(self.memory.buf, SHM_HEADER.size, *[0] * HEIGHT)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def publish(self, frame: int, buffer: List[int]):
+        memory = self.memory.buf
+        SEQUENCE.pack_into(memory, SEQUENCE_OFFSET, self.sequence + 1)
+        if buffer != self.rows:
+            self.rows = buffer[:]
+            SNAPSHOT.pack_into(memory, SEQUENCE_OFFSET, self.sequence + 1, frame, *buffer)
+        else:
+            SEQUENCE.pack_into(memory, SEQUENCE_OFFSET + SEQUENCE.size, frame)
+        self.sequence += 2
+        SEQUENCE.pack_into(memory, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+        _created.discard(self.memory.name)
+
+
+class SharedFramebufferReader:
+    memory: shared_memory.SharedMemory
+
+    def __init__(self, name: str):
+        self.memory = attach(name)
+        magic, version, width, height, _, _ = SHM_HEADER.unpack_from(self.memory.buf)
+        if magic != SHM_MAGIC:
+            self.memory.close()
+            raise ValueError(f"{name} is not a CHIP-8 framebuffer")
+        if version != SHM_VERSION:
+            self.memory.close()
+            raise ValueError(f"Unsupported framebuffer version {version}")
+
+    @property
+    def frame(self) -> int:
+        """
+        The number of the last frame published, cheap enough to poll for new frames.
+        """
+        return SEQUENCE.unpack_from(self.memory.buf, SEQUENCE_OFFSET + SEQUENCE.size)[0]
+
+    def read(self, retries: int = 1000) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        """
+        Returns the number and rows of the last frame published, or None if every attempt overlapped a write, e.g.
+        because the emulator died while writing.
+        """
+        memory = self.memory.buf
+        for _ in range(retries):
+            sequence, frame, *rows = SNAPSHOT.unpack_from(memory, SEQUENCE_OFFSET)
+            if sequence & 1 == 0 and SEQUENCE.unpack_from(memory, SEQUENCE_OFFSET)[0] == sequence:
+                return frame, tuple(rows)
+        return None
+
+    def close(self):
+        self.memory.close()
+
+
+def attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Maps an existing block without letting this process' resource tracker unlink it on exit, which would pull it
+    from under the emulator.
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Before Python 3.13 every block mapped is tracked, so it is untracked again once mapped, unless this process
+        # created it: the tracker holds a single registration per block, which then still belongs to its creator.
+        from multiprocessing import resource_tracker
+        memory = shared_memory.SharedMemory(name)
+        if memory.name not in _created:
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
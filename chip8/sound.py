@@ -1,22 +1,77 @@
+import array
+import math
 import os
+import warnings
+from typing import Union
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = ""
 import pygame
 
+from chip8.headless import HeadlessSound
+
+BEEP_FREQUENCY = 250
+BEEP_VOLUME = 0.2
+SAMPLE_RATE = 44100
+# Samples per mixer callback: the latency between a change of the sound timer and hearing it.
+MIXER_BUFFER = 256
+# Stopping the wave abruptly clicks, so it is faded out over a few milliseconds instead.
+FADEOUT_MS = 4
+
+# Array typecodes and full scale of the sample formats pygame.mixer reports.
+SAMPLE_FORMATS = {8: ('B', 127), -8: ('b', 127), 16: ('H', 32767), -16: ('h', 32767), 32: ('f', 1.0)}
+
 
 class Sound:
+    """
+    Plays a square wave while the sound timer is non-zero. The wave is synthesized once, as a buffer of a whole
+    number of periods that loops seamlessly, and is started and stopped only when the timer starts or stops.
+    """
+
     beep: pygame.mixer.Sound
+    channel: pygame.mixer.Channel
     is_playing: bool
 
     def __init__(self):
-        pygame.mixer.init()
-        self.beep = pygame.mixer.Sound("chip8/beep.wav")
+        pygame.mixer.init(SAMPLE_RATE, -16, 1, MIXER_BUFFER)
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        self.beep = pygame.mixer.Sound(buffer=square_wave(BEEP_FREQUENCY, frequency, sample_format, channels))
+        self.channel = pygame.mixer.Channel(0)
         self.is_playing = False
 
     def update(self, sound_timer: int):
         if sound_timer > 0 and not self.is_playing:
-            self.beep.play()
+            self.channel.play(self.beep, loops=-1)
             self.is_playing = True
         elif sound_timer == 0 and self.is_playing:
-            self.beep.stop()
+            self.channel.fadeout(FADEOUT_MS)
             self.is_playing = False
+
+
+def open_sound() -> Union[Sound, HeadlessSound]:
+    """
+    Returns a Sound, or a silent HeadlessSound with a RuntimeWarning if there is no audio device.
+    """
+    try:
+        return Sound()
+    except pygame.error as e:
+        warnings.warn(f"Sound disabled: {e}", RuntimeWarning)
+        return HeadlessSound()
+
+
+def square_wave(frequency: int, sample_rate: int, sample_format: int = -16, channels: int = 1,
+                volume: float = BEEP_VOLUME) -> bytes:
+    """
+    Returns the shortest whole number of periods of a square wave, as interleaved samples in the given pygame.mixer
+    format, so that looping it never cuts a period short.
+    """
+    typecode, full_scale = SAMPLE_FORMATS[sample_format]
+    amplitude = volume * full_scale if typecode == 'f' else int(volume * full_scale)
+    # Unsigned samples are centered on half their range.
+    center = full_scale + 1 if sample_format in (8, 16) else 0
+    high, low = center + amplitude, center - amplitude
+    length = sample_rate // math.gcd(sample_rate, frequency)
+    samples = array.array(typecode)
+    for i in range(length):
+        sample = high if i * frequency * 2 // sample_rate % 2 == 0 else low
+        samples.extend([sample] * channels)
+    return samples.tobytes()
@@ -0,0 +1,293 @@
+import random
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from chip8.cpu import CPU, DispatchTable, MEMORY_SIZE, UnknownInstruction, font_sprites
+from chip8.display import WIDTH, HEIGHT
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+
+STACK_SIZE = 16
+
+
+class VectorCPU:
+    """
+    Runs many machines in lockstep, holding the state of each machine (lane) in a row of a NumPy array.
+    Every step fetches the instruction at each lane's own pc and executes each distinct instruction word once,
+    across the lanes that fetched it. While the lanes agree, as they do when running the same ROM until their
+    inputs or random numbers make them diverge, every instruction is a handful of array operations.
+
+    Instruction words are decoded by a scalar CPU and dispatched to the handler of the same name here, which takes
+    the operands followed by the indices of the lanes to run it on. Like the scalar framebuffer, each row is a
+    64-bit integer whose most significant bit is the leftmost pixel. Lanes waiting for a keypress are skipped.
+    Unlike the scalar CPU's, each lane's stack holds at most STACK_SIZE return addresses: a deeper call raises
+    IndexError naming the lane.
+    """
+
+    lanes: int
+    starting_address: int
+
+    memory: np.ndarray
+    stack: np.ndarray
+    stack_pointer: np.ndarray
+    pc: np.ndarray
+    V: np.ndarray
+    I: np.ndarray
+    delay_timer: np.ndarray
+    sound_timer: np.ndarray
+    instruction: np.ndarray
+    buffer: np.ndarray
+    pressed_keys: np.ndarray
+    waiting_for_keypress: np.ndarray
+    cycles: np.ndarray
+    draws: np.ndarray
+
+    random: List[random.Random]
+    decoder: CPU
+    dispatch_table: DispatchTable
+
+    def __init__(self, lanes: int, starting_address: int = 0x200, seeds: Optional[List[int]] = None):
+        self.lanes = lanes
+        self.starting_address = starting_address
+
+        self.memory = np.zeros((lanes, MEMORY_SIZE), dtype=np.uint8)
+        self.memory[:, 0x000:len(font_sprites)] = font_sprites
+        self.stack = np.zeros((lanes, STACK_SIZE), dtype=np.int64)
+        self.stack_pointer = np.zeros(lanes, dtype=np.int64)
+        self.pc = np.full(lanes, starting_address, dtype=np.int64)
+        self.V = np.zeros((lanes, 16), dtype=np.uint8)
+        self.I = np.zeros(lanes, dtype=np.int64)
+        self.delay_timer = np.zeros(lanes, dtype=np.uint8)
+        self.sound_timer = np.zeros(lanes, dtype=np.uint8)
+        self.instruction = np.zeros(lanes, dtype=np.int64)
+        self.buffer = np.zeros((lanes, HEIGHT), dtype=np.uint64)
+        self.pressed_keys = np.zeros((lanes, 16), dtype=bool)
+        self.waiting_for_keypress = np.zeros(lanes, dtype=bool)
+        self.cycles = np.zeros(lanes, dtype=np.int64)
+        self.draws = np.zeros(lanes, dtype=np.int64)
+
+        self.random = [random.Random(seed) for seed in (seeds if seeds is not None else range(lanes))]
+        self.decoder = CPU(HeadlessScreen(), HeadlessKeyboard(), starting_address)
+        self.dispatch_table = DispatchTable(self)
+
+    def load(self, rom: bytes):
+        self.memory[:, self.starting_address:self.starting_address + len(rom)] = np.frombuffer(rom, dtype=np.uint8)
+
+    def step(self):
+        active = np.flatnonzero(~self.waiting_for_keypress)
+        if not active.size:
+            return
+        pc = self.pc[active]
+        instructions = self.memory[active, pc].astype(np.int64) << 8 | self.memory[active, pc + 1]
+        self.instruction[active] = instructions
+        self.pc[active] = pc + 2
+        self.cycles[active] += 1
+
+        if (instructions == instructions[0]).all():
+            self.dispatch_table[int(instructions[0])](active)
+            return
+        words, groups = np.unique(instructions, return_inverse=True)
+        for group, word in enumerate(words):
+            self.dispatch_table[int(word)](active[groups == group])
+
+    def run_cycles(self, cycles: int):
+        for _ in range(cycles):
+            self.step()
+
+    def run_frame(self, cycles: int):
+        """
+        Emulates a frame the way Chip8 does: lanes waiting for a keypress neither run nor decrease their timers.
+        """
+        running = ~self.waiting_for_keypress
+        self.delay_timer[running & (self.delay_timer > 0)] -= 1
+        self.sound_timer[running & (self.sound_timer > 0)] -= 1
+        self.run_cycles(cycles)
+
+    def press(self, lane: int, key: int):
+        self.pressed_keys[lane, key] = True
+
+    def release(self, lane: int, key: int):
+        self.pressed_keys[lane, key] = False
+        if self.waiting_for_keypress[lane]:
+            self.waiting_for_keypress[lane] = False
+            self.V[lane, (self.instruction[lane] & 0x0f00) >> 8] = key
+
+    def to_cpu(self, lane: int) -> CPU:
+        """
+        Returns a scalar CPU in the state of the given lane.
+        """
+        cpu = CPU(HeadlessScreen(), HeadlessKeyboard(), self.starting_address)
+        cpu.memory[:] = self.memory[lane].tobytes()
+        cpu.stack[:] = self.stack[lane, :self.stack_pointer[lane]].tolist()
+        cpu.V[:] = self.V[lane].tolist()
+        cpu.screen.buffer[:] = self.buffer[lane].tolist()
+        cpu.keyboard.pressed_keys.update(np.flatnonzero(self.pressed_keys[lane]).tolist())
+        cpu.waiting_for_keypress = bool(self.waiting_for_keypress[lane])
+        for field in ['pc', 'I', 'delay_timer', 'sound_timer', 'instruction', 'cycles', 'draws']:
+            setattr(cpu, field, int(getattr(self, field)[lane]))
+        return cpu
+
+    def _bind(self, instruction: int) -> Callable[[np.ndarray], None]:
+        try:
+            handler, operands = self.decoder.decode(instruction)
+        except UnknownInstruction:
+            return partial(self._unknown_instruction, instruction)
+        return partial(getattr(self, handler.__name__), *operands)
+
+    def _unknown_instruction(self, instruction: int, lanes: np.ndarray):
+        raise UnknownInstruction(instruction)
+
+    def _skip_if(self, lanes: np.ndarray, condition: np.ndarray):
+        self.pc[lanes] += 2 * condition
+
+    def _CLS(self, lanes: np.ndarray):  # 00E0
+        self.buffer[lanes] = 0
+
+    def _RET(self, lanes: np.ndarray):  # 00EE
+        if (self.stack_pointer[lanes] == 0).any():
+            raise IndexError("pop from empty list")
+        self.stack_pointer[lanes] -= 1
+        self.pc[lanes] = self.stack[lanes, self.stack_pointer[lanes]]
+
+    def _JP_nnn(self, nnn: int, lanes: np.ndarray):  # 1nnn
+        self.pc[lanes] = nnn
+
+    def _CALL_nnn(self, nnn: int, lanes: np.ndarray):  # 2nnn
+        full = lanes[self.stack_pointer[lanes] == STACK_SIZE]
+        if full.size:
+            raise IndexError(f"stack overflow in lane {full[0]}: more than {STACK_SIZE} nested calls")
+        self.stack[lanes, self.stack_pointer[lanes]] = self.pc[lanes]
+        self.stack_pointer[lanes] += 1
+        self.pc[lanes] = nnn
+
+    def _SE_Vx_nn(self, x: int, nn: int, lanes: np.ndarray):  # 3xnn
+        self._skip_if(lanes, self.V[lanes, x] == nn)
+
+    def _SNE_Vx_nn(self, x: int, nn: int, lanes: np.ndarray):  # 4xnn
+        self._skip_if(lanes, self.V[lanes, x] != nn)
+
+    def _SE_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 5xy0
+        self._skip_if(lanes, self.V[lanes, x] == self.V[lanes, y])
+
+    def _LD_Vx_nn(self, x: int, nn: int, lanes: np.ndarray):  # 6xnn
+        self.V[lanes, x] = nn
+
+    def _ADD_Vx_nn(self, x: int, nn: int, lanes: np.ndarray):  # 7xnn
+        self.V[lanes, x] += np.uint8(nn)
+
+    def _LD_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy0
+        self.V[lanes, x] = self.V[lanes, y]
+
+    def _OR_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy1
+        self.V[lanes, x] |= self.V[lanes, y]
+
+    def _AND_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy2
+        self.V[lanes, x] &= self.V[lanes, y]
+
+    def _XOR_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy3
+        self.V[lanes, x] ^= self.V[lanes, y]
+
+    # The flag is set before the result is computed, as in the scalar handlers, so that x or y being 0xf
+    # behaves the same way. Unsigned 8-bit arithmetic wraps around like the scalar `& 0xff`.
+
+    def _ADD_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy4
+        V = self.V
+        V[lanes, 0xf] = V[lanes, x].astype(np.int64) + V[lanes, y] > 0xff
+        V[lanes, x] = V[lanes, x] + V[lanes, y]
+
+    def _SUB_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy5
+        V = self.V
+        V[lanes, 0xf] = V[lanes, y] <= V[lanes, x]
+        V[lanes, x] = V[lanes, x] - V[lanes, y]
+
+    def _SHR_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy6
+        V = self.V
+        V[lanes, 0xf] = V[lanes, y] & 0b00000001
+        V[lanes, x] = V[lanes, y] >> 1
+
+    def _SUBN_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xy7
+        V = self.V
+        V[lanes, 0xf] = V[lanes, x] <= V[lanes, y]
+        V[lanes, x] = V[lanes, y] - V[lanes, x]
+
+    def _SHL_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 8xyE
+        V = self.V
+        V[lanes, 0xf] = V[lanes, y] >> 7
+        V[lanes, x] = V[lanes, y] << 1
+
+    def _SNE_Vx_Vy(self, x: int, y: int, lanes: np.ndarray):  # 9xy0
+        self._skip_if(lanes, self.V[lanes, x] != self.V[lanes, y])
+
+    def _LD_I_nnn(self, nnn: int, lanes: np.ndarray):  # Annn
+        self.I[lanes] = nnn
+
+    def _JP_V0_nnn(self, nnn: int, lanes: np.ndarray):  # Bnnn
+        self.pc[lanes] = nnn + self.V[lanes, 0x0].astype(np.int64)
+
+    def _RND_Vx_nn(self, x: int, nn: int, lanes: np.ndarray):  # Cxnn
+        values = [self.random[lane].getrandbits(8) for lane in lanes.tolist()]
+        self.V[lanes, x] = np.array(values, dtype=np.uint8) & nn
+
+    def _DRW_Vx_Vy_n(self, x: int, y: int, n: int, lanes: np.ndarray):  # Dxyn
+        V = self.V
+        V[lanes, 0xf] = 0
+        column = (V[lanes, x] % WIDTH).astype(np.uint64)[:, None]
+        first_row = V[lanes, y].astype(np.int64)[:, None]
+        offsets = np.arange(n)
+        # Sprite bytes past the end of memory are dropped, as slicing the scalar memory does.
+        addresses = self.I[lanes][:, None] + offsets
+        in_memory = addresses < MEMORY_SIZE
+        sprite_bytes = self.memory[lanes[:, None], np.minimum(addresses, MEMORY_SIZE - 1)] * in_memory
+        sprite_rows = sprite_bytes.astype(np.uint64) << np.uint64(WIDTH - 8)
+        sprite_rows = sprite_rows >> column | sprite_rows << (np.uint64(WIDTH) - column) % np.uint64(WIDTH)
+        rows = (first_row + offsets) % HEIGHT
+        buffer_rows = self.buffer[lanes[:, None], rows]
+        self.buffer[lanes[:, None], rows] = buffer_rows ^ sprite_rows
+        V[lanes, 0xf] = (buffer_rows & sprite_rows).any(axis=1)
+        self.draws[lanes] += 1
+
+    def _SKP_Vx(self, x: int, lanes: np.ndarray):  # Ex9E
+        keys = self.V[lanes, x]
+        self._skip_if(lanes, (keys < 16) & self.pressed_keys[lanes, keys & 0xf])
+
+    def _SKNP_Vx(self, x: int, lanes: np.ndarray):  # ExA1
+        keys = self.V[lanes, x]
+        self._skip_if(lanes, ~((keys < 16) & self.pressed_keys[lanes, keys & 0xf]))
+
+    def _LD_Vx_DT(self, x: int, lanes: np.ndarray):  # Fx07
+        self.V[lanes, x] = self.delay_timer[lanes]
+
+    def _LD_Vx_K(self, x: int, lanes: np.ndarray):  # Fx0A
+        self.waiting_for_keypress[lanes] = True
+
+    def _LD_DT_Vx(self, x: int, lanes: np.ndarray):  # Fx15
+        self.delay_timer[lanes] = self.V[lanes, x]
+
+    def _LD_ST_Vx(self, x: int, lanes: np.ndarray):  # Fx18
+        self.sound_timer[lanes] = self.V[lanes, x]
+
+    def _ADD_I_Vx(self, x: int, lanes: np.ndarray):  # Fx1E
+        self.I[lanes] = (self.I[lanes] + self.V[lanes, x]) & 0xfff
+
+    def _LD_F_Vx(self, x: int, lanes: np.ndarray):  # Fx29
+        self.I[lanes] = self.V[lanes, x].astype(np.int64) * 5
+
+    def _LD_B_Vx(self, x: int, lanes: np.ndarray):  # Fx33
+        value = self.V[lanes, x]
+        I = self.I[lanes]
+        self.memory[lanes, I] = value // 100
+        self.memory[lanes, I + 1] = (value % 100) // 10
+        self.memory[lanes, I + 2] = value % 10
+
+    def _LD_I_Vx(self, x: int, lanes: np.ndarray):  # Fx55
+        I = self.I[lanes]
+        for reg in range(x + 1):
+            self.memory[lanes, I + reg] = self.V[lanes, reg]
+        self.I[lanes] = I + x + 1
+
+    def _LD_Vx_I(self, x: int, lanes: np.ndarray):  # Fx65
+        I = self.I[lanes]
+        for reg in range(x + 1):
+            self.V[lanes, reg] = self.memory[lanes, I + reg]
+        self.I[lanes] = I + x + 1
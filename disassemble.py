@@ -0,0 +1,34 @@
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+from chip8.disassembler import disassemble
+
+
+def main():
+    # noinspection PyTypeChecker
+    parser = ArgumentParser(description="Disassemble a CHIP-8 ROM, separating reachable code from data",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("rom", type=str, help="ROM file")
+    parser.add_argument("--starting-address", metavar='n', type=lambda x: int(x, 0), default=0x200,
+                        help="Starting address")
+    parser.add_argument("--blocks", action="store_true",
+                        help="List the basic blocks and their successors instead of the instructions")
+    args = parser.parse_args()
+
+    with open(args.rom, "rb") as f:
+        disassembly = disassemble(f.read(), args.starting_address)
+    if args.blocks:
+        for block in disassembly.blocks.values():
+            successors = ", ".join(f"{address:03X}" for address in block.successors) or "-"
+            print(f"{block.start:03X}-{block.end - 1:03X}  {len(block.instructions):3d} instructions  -> {successors}")
+    else:
+        print(disassembly.listing(), end="")
+    code = sum(disassembly.code_map())
+    print(f"; {code} bytes of code, {len(disassembly.rom) - code} bytes of data, {len(disassembly.blocks)} blocks")
+    for address in disassembly.indirect_jumps:
+        print(f"; {address:03X}: indirect jump, only its base address was followed")
+    for address in disassembly.invalid:
+        print(f"; {address:03X}: unknown instruction on a reachable path")
+
+
+if __name__ == "__main__":
+    main()
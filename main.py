@@ -1,6 +1,6 @@
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 
-from chip8.chip8 import Chip8
+from chip8.display import RENDERERS
 
 
 def main():
@@ -12,13 +12,102 @@ def main():
                         help="CPU cycles per frame (at 60 fps)")
     parser.add_argument("--starting-address", metavar='n', type=lambda x: int(x, 0), default=0x200,
                         help="Starting address")
+    parser.add_argument("--renderer", choices=RENDERERS, default="rect",
+                        help="Draw lit pixels as rects, or blit a scaled 64x32 surface")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run without opening a window, playing sound or reading the keyboard")
+    parser.add_argument("--mute", action="store_true", help="Don't play sound")
+    parser.add_argument("--turbo", action="store_true",
+                        help="Run the CPU as fast as possible, decrementing timers every cycles-per-frame instructions")
+    parser.add_argument("--presentation-rate", metavar='n', type=int, default=60,
+                        help="Screen updates per second in turbo mode")
+    parser.add_argument("--jit", action="store_true", help="Compile basic blocks into Python functions")
+    parser.add_argument("--jit-verify", action="store_true",
+                        help="Run the interpreter alongside every compiled block and stop at the first mismatch")
+    parser.add_argument("--aot", action="store_true",
+                        help="Compile the reachable code of the ROM ahead of time, caching it for later runs")
+    parser.add_argument("--aot-cache", metavar='directory', type=str, default=None,
+                        help="Directory of compiled ROMs instead of ~/.cache/chip8")
+    parser.add_argument("--idle-skip", action="store_true",
+                        help="Skip the rest of a frame when the ROM spins in a loop waiting for a timer or key")
+    parser.add_argument("--rewind", metavar='seconds', type=float, default=0,
+                        help="Keep the last seconds of frames to rewind through by holding Backspace")
+    parser.add_argument("--load-state", metavar='file', type=str, default=None,
+                        help="Resume from a save state after loading the ROM")
+    parser.add_argument("--save-state", metavar='file', type=str, default=None,
+                        help="Write a save state on exit")
+    parser.add_argument("--record", metavar='file', type=str, default=None,
+                        help="Record key presses and random numbers from power-on, to be replayed by replay.py")
+    parser.add_argument("--export", metavar='path', type=str, default=None,
+                        help="Export the frames as an animated .gif, a .raw frame stream, or a directory of PNGs")
+    parser.add_argument("--export-scale", metavar='n', type=int, default=4, help="Scaling factor of exported frames")
+    parser.add_argument("--shared-memory", metavar='name', type=str, default=None,
+                        help="Publish the framebuffer in a shared memory block for other processes to read")
+    parser.add_argument("--profile", metavar='file', type=str, default=None,
+                        help="Write per-opcode and per-address execution counts and times as JSON on exit")
+    parser.add_argument("--profile-folded", metavar='file', type=str, default=None,
+                        help="Write the profile as folded stacks for flamegraph tools on exit")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="Print how late frames started and how many were dropped on exit")
+    parser.add_argument("--frames", metavar='n', type=int, default=None,
+                        help="Number of frames to run before exiting")
     args = parser.parse_args()
+    if args.jit + args.jit_verify + args.aot > 1:
+        parser.error("--jit, --jit-verify and --aot are alternative compilers and cannot be combined")
+    profile = args.profile is not None or args.profile_folded is not None
+    if profile and (args.jit or args.jit_verify or args.aot):
+        parser.error("profiling measures the interpreter and cannot be combined with --jit")
+    if profile and args.idle_skip:
+        parser.error("profiling counts every instruction and cannot be combined with --idle-skip")
+    if args.record is not None and (args.load_state is not None or args.rewind):
+        parser.error("recordings start from power-on and cannot be combined with --load-state or --rewind")
+
+    # The emulator and optional features are imported once the arguments are parsed, so that --help and usage
+    # errors don't wait for them.
+    from chip8.chip8 import Chip8
 
     with open(args.rom, "rb") as f:
         rom = f.read()
-    chip8 = Chip8(args.scaling_factor, args.cycles_per_frame, args.starting_address)
+    chip8 = Chip8(args.scaling_factor, args.cycles_per_frame, args.starting_address, headless=args.headless,
+                  turbo=args.turbo, presentation_rate=args.presentation_rate, jit=args.jit,
+                  jit_verify=args.jit_verify, renderer=args.renderer, profile=profile,
+                  rewind_seconds=args.rewind, aot=args.aot, aot_cache=args.aot_cache,
+                  idle_skip=args.idle_skip, mute=args.mute)
     chip8.load(rom)
-    chip8.run()
+    if args.load_state is not None:
+        chip8.load_state(args.load_state)
+    recorder = None
+    if args.record is not None:
+        from chip8.replay import Recorder
+        recorder = Recorder(chip8, open(args.record, "wb"))
+    exporter = None
+    if args.export is not None:
+        from chip8.export import FrameExporter, open_writer
+        exporter = FrameExporter(open_writer(args.export, args.export_scale))
+        chip8.frame_hooks.append(exporter.capture)
+    shared_framebuffer = None
+    if args.shared_memory is not None:
+        from chip8.shm import SharedFramebuffer
+        shared_framebuffer = SharedFramebuffer(args.shared_memory)
+        chip8.frame_hooks.append(shared_framebuffer.publish)
+    try:
+        chip8.run(args.frames)
+    finally:
+        if args.frame_stats:
+            print(f"Frame timing: {chip8.scheduler.stats}")
+        if exporter is not None:
+            exporter.close()
+        if shared_framebuffer is not None:
+            shared_framebuffer.close()
+        if recorder is not None:
+            recorder.close()
+            recorder.stream.close()
+        if args.save_state is not None:
+            chip8.save_state(args.save_state)
+        if args.profile is not None:
+            chip8.profiler.write_json(args.profile)
+        if args.profile_folded is not None:
+            chip8.profiler.write_folded(args.profile_folded)
 
 
 if __name__ == "__main__":
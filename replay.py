@@ -0,0 +1,30 @@
+import time
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+from chip8.batch import framebuffer_hash
+from chip8.replay import replay
+
+
+def main():
+    # noinspection PyTypeChecker
+    parser = ArgumentParser(description="Replay a CHIP-8 recording headlessly at full speed",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("rom", type=str, help="ROM file the recording was made with")
+    parser.add_argument("recording", type=str, help="Recording written by main.py --record")
+    parser.add_argument("--jit", action="store_true", help="Compile basic blocks into Python functions")
+    args = parser.parse_args()
+
+    with open(args.rom, "rb") as f:
+        rom = f.read()
+    start = time.perf_counter()
+    with open(args.recording, "rb") as f:
+        chip8 = replay(rom, f, jit=args.jit)
+    elapsed = time.perf_counter() - start
+
+    print(f"Frames: {chip8.frames} ({chip8.frames / 60 / elapsed:.0f}x real time)")
+    print(f"Cycles: {chip8.cycles}")
+    print(f"Framebuffer: {framebuffer_hash(chip8.screen.buffer)}")
+
+
+if __name__ == "__main__":
+    main()
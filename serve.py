@@ -0,0 +1,36 @@
+import asyncio
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+from chip8.server import start_server
+
+
+def main():
+    # noinspection PyTypeChecker
+    parser = ArgumentParser(description="Serve a CHIP-8 ROM over TCP, one headless machine per connection",
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument("rom", type=str, help="ROM file to serve")
+    parser.add_argument("--host", metavar='address', type=str, default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", metavar='n', type=int, default=8564, help="Port to listen on")
+    parser.add_argument("--cycles-per-frame", metavar='n', type=int, default=10,
+                        help="CPU cycles per frame (at 60 fps)")
+    parser.add_argument("--starting-address", metavar='n', type=lambda x: int(x, 0), default=0x200,
+                        help="Starting address")
+    args = parser.parse_args()
+
+    with open(args.rom, "rb") as f:
+        rom = f.read()
+
+    async def serve():
+        server = await start_server(rom, args.host, args.port, args.cycles_per_frame, args.starting_address)
+        print(f"Serving {args.rom} on {args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
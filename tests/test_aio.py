@@ -0,0 +1,75 @@
+import asyncio
+import time
+import unittest
+
+from chip8.aio import AsyncChip8
+from chip8.chip8 import Chip8
+
+ld_V1_K = b"\xf1\x0a"
+ld_F_V1 = b"\xf1\x29"
+drw_V0_V0_5 = b"\xd0\x05"
+jp_0x200 = b"\x12\x00"
+DRAW_KEY = ld_V1_K + ld_F_V1 + drw_V0_V0_5 + jp_0x200
+
+
+class TestAsyncChip8(unittest.TestCase):
+    def test_frames(self):
+        async def session():
+            chip8 = AsyncChip8(cycles_per_frame=10, starting_address=0x200, turbo=True, frame_backlog=100)
+            chip8.load(DRAW_KEY)
+            run = asyncio.ensure_future(chip8.run(20))
+            frames = [frame async for frame in chip8.stream()]
+            await run
+            return chip8, frames
+
+        chip8, frames = asyncio.run(session())
+        self.assertEqual(list(range(1, 21)), [number for number, _ in frames])
+        self.assertEqual((0,) * 32, frames[-1][1])
+        self.assertTrue(chip8.cpu.waiting_for_keypress)
+
+    def test_keys(self):
+        async def session():
+            chip8 = AsyncChip8(cycles_per_frame=10, starting_address=0x200, turbo=True)
+            chip8.load(DRAW_KEY)
+            await chip8.run(1)
+            await chip8.keys.put((0x7, True))
+            await chip8.keys.put((0x7, False))
+            await chip8.run(3)
+            return chip8
+
+        chip8 = asyncio.run(session())
+        interpreter = Chip8(scaling_factor=1, cycles_per_frame=10, starting_address=0x200, headless=True)
+        interpreter.load(DRAW_KEY)
+        interpreter.tick()
+        interpreter.press_key(0x7)
+        interpreter.release_key(0x7)
+        for _ in range(2):
+            interpreter.tick()
+        self.assertEqual(0x7, chip8.cpu.V[1])
+        self.assertEqual(interpreter.cpu.snapshot(), chip8.cpu.snapshot())
+
+    def test_slow_consumer(self):
+        async def session():
+            chip8 = AsyncChip8(cycles_per_frame=10, starting_address=0x200, turbo=True, frame_backlog=2)
+            chip8.load(DRAW_KEY)
+            frames = chip8.stream()
+            first = asyncio.ensure_future(frames.__anext__())
+            await asyncio.sleep(0)
+            await chip8.run(10)
+            return [await first] + [frame async for frame in frames]
+
+        self.assertEqual([1, 9, 10], [number for number, _ in asyncio.run(session())])
+
+    def test_concurrent_sessions(self):
+        async def sessions():
+            chips = [AsyncChip8(cycles_per_frame=10, starting_address=0x200) for _ in range(100)]
+            for chip8 in chips:
+                chip8.load(DRAW_KEY)
+            await asyncio.gather(*(chip8.run(6) for chip8 in chips))
+            return chips
+
+        start = time.monotonic()
+        chips = asyncio.run(sessions())
+        # Paced sessions share the loop: 100 of them take about as long as one.
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual([6] * 100, [chip8.frames for chip8 in chips])
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from chip8.aot import AOT, cache_key, compile_rom, load_module
+from chip8.chip8 import Chip8
+from chip8.cpu import CPU
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+
+ld_V0_61 = b"\x60\x61"
+ld_I_0x208 = b"\xa2\x08"
+ld_I_V0 = b"\xf0\x55"
+add_V1_01 = b"\x71\x01"
+jp_0x208 = b"\x12\x08"
+jp_V0_0x300 = b"\xb3\x00"
+
+
+class TestAOT(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compile_rom(self):
+        source = compile_rom(ld_V0_61 + add_V1_01 + jp_0x208 + jp_0x208 + jp_0x208, max_block_length=8)
+        namespace = {}
+        exec(source, namespace)
+        self.assertEqual([0x200, 0x202, 0x204, 0x208], [block[0] for block in namespace['BLOCKS']])
+        start, end, length, function, block_source = namespace['BLOCKS'][0]
+        self.assertEqual((0x206, 3), (end, length))
+        self.assertIn("V[0x0] = 0x61", block_source)
+        self.assertEqual("block_200", function.__name__)
+
+    def test_preload(self):
+        rom = ld_V0_61 + add_V1_01 + jp_0x208 + jp_0x208 + jp_0x208
+        cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        cpu.load(rom)
+        aot = AOT(cpu, max_block_length=8, cache_directory=self.directory.name)
+        aot.translate = None
+        aot.preload(rom)
+        self.assertEqual({0x200, 0x202, 0x204, 0x208}, set(aot.blocks))
+
+        aot.block_at(0x200).function(cpu)
+        self.assertEqual(0x208, cpu.pc)
+        self.assertEqual([0x61, 0x01], cpu.V[:2])
+
+    def test_cache(self):
+        rom = ld_V0_61 + jp_0x208
+        module = load_module(rom, 0x200, 8, self.directory.name)
+        self.assertEqual(os.path.join(self.directory.name, f"rom_{cache_key(rom, 0x200, 8)}.py"), module.__file__)
+        with open(module.__file__, "a") as f:
+            f.write("BLOCKS = []\n")
+        self.assertTrue(load_module(rom, 0x200, 8, self.directory.name).BLOCKS)
+
+        self.assertNotEqual(cache_key(rom, 0x200, 8), cache_key(rom, 0x200, 9))
+        self.assertNotEqual(cache_key(rom, 0x200, 8), cache_key(rom + b"\x00", 0x200, 8))
+
+    def test_fallback(self):
+        # Self-modifying code and computed jumps are translated when they are reached.
+        rom = ld_V0_61 + ld_I_0x208 + ld_I_V0 + add_V1_01 + add_V1_01 + jp_V0_0x300
+        interpreter = Chip8(scaling_factor=1, cycles_per_frame=5, starting_address=0x200, headless=True)
+        compiled = Chip8(scaling_factor=1, cycles_per_frame=5, starting_address=0x200, headless=True, aot=True,
+                         aot_cache=self.directory.name)
+        for chip8 in (interpreter, compiled):
+            chip8.load(rom)
+            chip8.cpu.memory[0x361:0x363] = b"\x13\x61"
+            for _ in range(3):
+                chip8.tick()
+
+        self.assertIn("V[0x1] = 0x1", compiled.jit.blocks[0x206].source)
+        self.assertIn(0x361, compiled.jit.blocks)
+        self.assertEqual(0x01, compiled.cpu.V[1])
+        self.assertEqual(interpreter.cpu.snapshot(), compiled.cpu.snapshot())
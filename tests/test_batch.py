@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+
+from chip8.batch import Job, framebuffer_hash, load_manifest, run_batch, run_job
+from chip8.display import HEIGHT
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        ld_V1_K = b"\xf1\x0a"
+        ld_F_V1 = b"\xf1\x29"
+        drw_V0_V0_5 = b"\xd0\x05"
+        jp_0x206 = b"\x12\x06"
+        self.rom = os.path.join(self.directory.name, "key.ch8")
+        with open(self.rom, "wb") as f:
+            f.write(ld_V1_K + ld_F_V1 + drw_V0_V0_5 + jp_0x206)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_job(self):
+        job = Job(self.rom, frames=10, inputs=[{'frame': 3, 'press': 0x7}, {'frame': 4, 'release': 0x7}])
+        result = run_job(job)
+        self.assertEqual("key.ch8", result['name'])
+        self.assertEqual(10, result['frames'])
+        self.assertEqual(0x7, result['registers']['V'][1])
+        self.assertEqual(0x7 * 5, result['registers']['I'])
+        self.assertEqual(0x206, result['registers']['pc'])
+        self.assertNotEqual(framebuffer_hash([0] * HEIGHT), result['framebuffer'])
+        self.assertIsNone(result['error'])
+
+        self.assertEqual(result['framebuffer'], run_job(job)['framebuffer'])
+
+    def test_cycle_budget(self):
+        job = Job(self.rom, cycles=100, inputs=[{'frame': 1, 'press': 0x1, 'release': 0x1}])
+        result = run_job(job)
+        self.assertEqual(100, result['cycles'])
+        self.assertEqual(11, result['frames'])
+
+        result = run_job(Job(self.rom, cycles=100, inputs=[{'frame': 5, 'press': 0x1}]))
+        self.assertEqual(1, result['cycles'])
+        self.assertEqual(5, result['frames'])
+
+        with self.assertRaises(ValueError):
+            Job(self.rom)
+
+    def test_load_manifest(self):
+        path = os.path.join(self.directory.name, "manifest.json")
+        with open(path, "w") as f:
+            json.dump({'jobs': [{'rom': "key.ch8", 'frames': 5, 'starting_address': "0x200", 'name': "a"},
+                                {'rom': "key.ch8", 'cycles': 50, 'cycles_per_frame': 5}]}, f)
+        jobs = load_manifest(path)
+        self.assertEqual(self.rom, jobs[0].rom)
+        self.assertEqual(0x200, jobs[0].starting_address)
+        self.assertEqual(5, jobs[1].cycles_per_frame)
+
+        results = list(run_batch(jobs, workers=2))
+        self.assertEqual(["a", "key.ch8"], sorted(result['name'] for result in results))
+
+    def test_failed_job(self):
+        jobs = [Job(self.rom, frames=5), Job(os.path.join(self.directory.name, "missing.ch8"), frames=5)]
+        results = {result['name']: result for result in run_batch(jobs, workers=2)}
+        self.assertIsNone(results["key.ch8"]['error'])
+        self.assertTrue(results["missing.ch8"]['error'].startswith("FileNotFoundError"))
+
+    def test_export(self):
+        path = os.path.join(self.directory.name, "key.gif")
+        run_job(Job(self.rom, frames=10, inputs=[{'frame': 3, 'press': 0x7, 'release': 0x7}], export=path))
+        with open(path, "rb") as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b"GIF89a"))
+        self.assertEqual(2, data.count(b"\x21\xf9\x04"))
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_benchmark_rom(self):
+        ld_V1_K = b"\xf1\x0a"
+        ld_I_0x042 = b"\xa0\x42"
+        drw_V0_V1_1 = b"\xd0\x11"
+        jp_0x202 = b"\x12\x02"
+        with tempfile.NamedTemporaryFile(suffix=".ch8", delete=False) as f:
+            f.write(ld_V1_K + ld_I_0x042 + drw_V0_V1_1 + jp_0x202)
+        try:
+            result = benchmark.benchmark_rom(f.name, instructions=1000, cycles_per_frame=10, jit=False, timeout=10)
+        finally:
+            os.unlink(f.name)
+
+        self.assertEqual(1 + 1000, result['instructions'])
+        self.assertEqual(1000 // 3, result['draws'])
+        self.assertGreater(result['frames'], 100)
+        self.assertGreater(result['instructions_per_second'], 0)
+        self.assertIsNone(result['error'])
+
+    def test_find_roms(self):
+        roms = benchmark.find_roms(["roms/demos", "roms/games/Tetris [Fran Dachille, 1991].ch8"])
+        self.assertIn("Maze [David Winter, 199x].ch8", [rom.name for rom in roms])
+        self.assertEqual("Tetris [Fran Dachille, 1991].ch8", roms[-1].name)
+        self.assertTrue(all(rom.suffix == ".ch8" for rom in roms))
+
+    def test_benchmark_startup(self):
+        results = benchmark.benchmark_startup(runs=1)
+        self.assertEqual(list(benchmark.STARTUP_COMMANDS), list(results))
+        self.assertTrue(all(milliseconds > 0 for milliseconds in results.values()))
+
+    def test_compare(self):
+        baseline = [
+            {'rom': "a.ch8", 'instructions_per_second': 100.0},
+            {'rom': "b.ch8", 'instructions_per_second': 100.0},
+        ]
+        results = [
+            {'rom': "a.ch8", 'instructions_per_second': 95.0},
+            {'rom': "b.ch8", 'instructions_per_second': 80.0},
+            {'rom': "c.ch8", 'instructions_per_second': 80.0},
+        ]
+        comparisons = benchmark.compare(results, baseline, tolerance=0.1)
+        self.assertEqual(["a.ch8", "b.ch8"], [comparison['rom'] for comparison in comparisons])
+        self.assertEqual([False, True], [comparison['regression'] for comparison in comparisons])
+        self.assertAlmostEqual(-0.2, comparisons[1]['change'])
@@ -1,10 +1,15 @@
 import os
+import tempfile
+import time
 import unittest
 
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = ""
 import pygame
 
 from chip8.chip8 import Chip8
+from chip8.cpu import UnknownInstruction
+from chip8.display import row_pixels
+from chip8.headless import HeadlessKeyboard, HeadlessScreen, HeadlessSound
 
 
 class TestChip8(unittest.TestCase):
@@ -46,7 +51,7 @@ class TestChip8(unittest.TestCase):
         chip8._handle_events()
 
         pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_1))
-        chip8._handle_events()
+        chip8._handle_events(timeout=1)
         self.assertFalse(chip8.cpu.waiting_for_keypress)
         self.assertEqual(0x01, chip8.cpu.V[0])
 
@@ -65,3 +70,139 @@ class TestChip8(unittest.TestCase):
 
         chip8.tick()
         self.assertEqual(WHITE, chip8.screen.surface.get_at((0, 0)))
+
+    def test_headless(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x000, headless=True)
+        self.assertIsInstance(chip8.screen, HeadlessScreen)
+        self.assertIsInstance(chip8.keyboard, HeadlessKeyboard)
+        self.assertIsInstance(chip8.sound, HeadlessSound)
+
+        ld_I_0x042 = b"\xa0\x42"
+        drw_Vx_Vy_n = b"\xd0\x01"
+        ld_V1_K = b"\xf1\x0A"
+        chip8.load(ld_I_0x042 + drw_Vx_Vy_n + ld_V1_K)
+        chip8.cpu.memory[0x42] = 0b10000000
+
+        chip8.run(frames=3)
+        self.assertEqual(3, chip8.frames)
+        self.assertTrue(row_pixels(chip8.screen.buffer[0])[0])
+        self.assertEqual(1, chip8.screen.frames)
+        self.assertTrue(chip8.cpu.waiting_for_keypress)
+
+        chip8.press_key(0x5)
+        self.assertEqual({0x5}, chip8.keyboard.pressed_keys)
+        chip8.release_key(0x5)
+        self.assertEqual(set(), chip8.keyboard.pressed_keys)
+        self.assertFalse(chip8.cpu.waiting_for_keypress)
+        self.assertEqual(0x5, chip8.cpu.V[1])
+
+    def test_slow_frames(self):
+        # Frames that take longer than 1/60 s are always due, and input must still be handled between them.
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200)
+        jp_0x200 = b"\x12\x00"
+        chip8.load(jp_0x200)
+        emulate_frame, handle_events = chip8._emulate_frame, chip8._handle_events
+        calls = []
+
+        def slow_frame():
+            time.sleep(0.02)
+            return emulate_frame()
+
+        def count_events(timeout=None):
+            calls.append(timeout)
+            handle_events(timeout)
+
+        chip8._emulate_frame = slow_frame
+        chip8._handle_events = count_events
+        chip8.run(frames=12)
+        self.assertEqual(12, chip8.frames)
+        self.assertIn(None, calls)
+        self.assertEqual(12, chip8.scheduler.stats.frames)
+
+    def test_save_state(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200, headless=True)
+        chip8.load(b"\x71\x01\x12\x00")
+        chip8.run(frames=5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state")
+            chip8.save_state(path)
+
+            resumed = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200, headless=True)
+            resumed.load_state(path)
+        self.assertEqual(3, resumed.cpu.V[1])
+        self.assertEqual(5, resumed.cycles)
+        resumed.run(frames=1)
+        self.assertEqual(0x200, resumed.cpu.pc)
+
+    def test_rewind(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200, rewind_seconds=1)
+        chip8.load(b"\x71\x01\x12\x00")
+        for _ in range(6):
+            chip8.tick()
+        self.assertEqual(3, chip8.cpu.V[1])
+
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE))
+        chip8._handle_events()
+        chip8.tick()
+        chip8.tick()
+        self.assertEqual(2, chip8.cpu.V[1])
+        self.assertEqual(4, len(chip8.rewind))
+
+        pygame.event.post(pygame.event.Event(pygame.KEYUP, key=pygame.K_BACKSPACE))
+        chip8._handle_events()
+        chip8.tick()
+        self.assertEqual(5, len(chip8.rewind))
+
+    def test_turbo(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=2, starting_address=0x000, headless=True, turbo=True)
+        ld_V0_3C = b"\x60\x3c"
+        ld_DT_V0 = b"\xf0\x15"
+        add_V1_01 = b"\x71\x01"
+        jp_0x004 = b"\x10\x04"
+        chip8.load(ld_V0_3C + ld_DT_V0 + add_V1_01 + jp_0x004)
+
+        start = time.monotonic()
+        chip8.run(frames=31)
+        self.assertLess(time.monotonic() - start, 30 / 60)
+        self.assertEqual(31, chip8.frames)
+        self.assertEqual(0x3c - 30, chip8.cpu.delay_timer)
+        self.assertEqual(30, chip8.cpu.V[1])
+
+    def test_jit(self):
+        ld_I_0x042 = b"\xa0\x42"
+        add_V0_01 = b"\x70\x01"
+        drw_V0_V1_1 = b"\xd0\x11"
+        jp_0x002 = b"\x10\x02"
+        rom = ld_I_0x042 + add_V0_01 + drw_V0_V1_1 + jp_0x002
+
+        interpreter = Chip8(scaling_factor=1, cycles_per_frame=5, starting_address=0x000, headless=True)
+        compiled = Chip8(scaling_factor=1, cycles_per_frame=5, starting_address=0x000, headless=True, jit_verify=True)
+        for chip8 in (interpreter, compiled):
+            chip8.load(rom)
+            chip8.cpu.memory[0x42] = 0b10100000
+            for _ in range(10):
+                chip8.tick()
+
+        self.assertEqual(interpreter.cpu.pc, compiled.cpu.pc)
+        self.assertEqual(interpreter.cpu.V, compiled.cpu.V)
+        self.assertEqual(interpreter.screen.buffer, compiled.screen.buffer)
+        self.assertEqual(interpreter.screen.frames, compiled.screen.frames)
+        self.assertTrue(compiled.jit.blocks)
+
+    def test_crash_cycles(self):
+        ld_V0_01 = b"\x60\x01"
+        add_V0_01 = b"\x70\x01"
+        ld_I_0xfff = b"\xaf\xff"
+        ld_V1_I = b"\xf1\x65"
+        unknown = b"\xff\xff"
+        for rom, error in [(ld_V0_01 + add_V0_01 * 6 + unknown, UnknownInstruction),
+                           (ld_V0_01 + ld_I_0xfff + add_V0_01 + ld_V1_I, IndexError)]:
+            interpreter = Chip8(scaling_factor=1, cycles_per_frame=3, starting_address=0x200, headless=True)
+            compiled = Chip8(scaling_factor=1, cycles_per_frame=3, starting_address=0x200, headless=True, jit=True)
+            for chip8 in (interpreter, compiled):
+                chip8.load(rom)
+                with self.assertRaises(error):
+                    for _ in range(4):
+                        chip8.tick()
+            self.assertEqual(len(rom) // 2, interpreter.cycles)
+            self.assertEqual(interpreter.cycles, compiled.cycles)
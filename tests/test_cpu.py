@@ -1,7 +1,8 @@
 import unittest
 
 from chip8 import cpu
-from chip8.cpu import CPU, UpdateScreen, WaitForKeypress
+from chip8.cpu import CPU, InvalidSnapshot, StopReason, UnknownInstruction
+from chip8.display import ALL_ROWS, HEIGHT, ROW_MASK, row_pixels
 from chip8.keyboard import Keyboard
 from chip8.screen import Screen
 
@@ -37,13 +38,92 @@ class TestCPU(unittest.TestCase):
         self.assertEqual(0x00, self.cpu.delay_timer)
         self.assertEqual(0x00, self.cpu.sound_timer)
 
+    def test_step(self):
+        self.cpu.load(b"\x60\x42\x70\x01")
+        self.cpu.step()
+        self.assertEqual(0x6042, self.cpu.instruction)
+        self.assertEqual(0x202, self.cpu.pc)
+        self.assertEqual(0x42, self.cpu.V[0x0])
+
+        self.cpu.step()
+        self.assertEqual(0x204, self.cpu.pc)
+        self.assertEqual(0x43, self.cpu.V[0x0])
+
+    def test_run_cycles(self):
+        ld_V0_01 = b"\x60\x01"
+        drw_V0_V0_1 = b"\xd0\x01"
+        ld_V1_K = b"\xf1\x0a"
+        self.cpu.load(ld_V0_01 + drw_V0_V0_1 + drw_V0_V0_1 + ld_V1_K)
+        self.assertEqual(StopReason.COMPLETED, self.cpu.run_cycles(2))
+        self.assertEqual(2, self.cpu.cycles)
+        self.assertEqual(1, self.cpu.draws)
+        self.assertEqual(0x204, self.cpu.pc)
+
+        self.assertEqual(StopReason.WAITING_FOR_KEYPRESS, self.cpu.run_cycles(10))
+        self.assertEqual(4, self.cpu.cycles)
+        self.assertEqual(2, self.cpu.draws)
+        self.assertEqual(0x208, self.cpu.pc)
+        self.assertTrue(self.cpu.waiting_for_keypress)
+
+    def test_snapshot(self):
+        self.cpu.load(b"\x60\x42\x22\x06\x00\x00\xa0\x00\xd0\x05\xf0\x33")
+        self.cpu.run_cycles(4)
+        self.cpu.delay_timer = 0x12
+        snapshot = self.cpu.snapshot()
+
+        restored = CPU(Screen(), Keyboard())
+        written = []
+        restored.write_hooks.append(lambda address, length: written.append((address, length)))
+        restored.restore(snapshot)
+        self.assertEqual([(0x000, cpu.MEMORY_SIZE)], written)
+        self.assertEqual(snapshot, restored.snapshot())
+        for field in ['pc', 'I', 'V', 'stack', 'memory', 'delay_timer', 'instruction', 'cycles', 'draws']:
+            self.assertEqual(getattr(self.cpu, field), getattr(restored, field))
+        self.assertEqual(self.screen.buffer, restored.screen.buffer)
+        self.assertEqual(ALL_ROWS, restored.screen.dirty_rows)
+
+        memory = self.cpu.memory
+        self.cpu.run_cycles(1)
+        self.assertEqual(bytearray([0, 6, 6]), self.cpu.memory[0x000:0x003])
+        self.cpu.restore(snapshot)
+        self.assertIs(memory, self.cpu.memory)
+        self.assertEqual(bytearray(cpu.font_sprites[0:3]), self.cpu.memory[0x000:0x003])
+        self.assertEqual(0x20a, self.cpu.pc)
+        self.assertEqual([0x204], self.cpu.stack)
+
+    def test_invalid_snapshot(self):
+        snapshot = self.cpu.snapshot()
+        for invalid in [b"", b"XXXX" + snapshot[4:], snapshot[:4] + b"\x02" + snapshot[5:], snapshot + b"\x00"]:
+            with self.assertRaises(InvalidSnapshot):
+                self.cpu.restore(invalid)
+
+    def test_dispatch_table(self):
+        self.assertIs(self.cpu.dispatch_table[0x6142], self.cpu.dispatch_table[0x6142])
+        self.assertIsNot(self.cpu.dispatch_table[0x6142], self.cpu.dispatch_table[0x6143])
+
+        handler, operands = self.cpu.decode(0xD125)
+        self.assertEqual(self.cpu._DRW_Vx_Vy_n, handler)
+        self.assertEqual((0x1, 0x2, 0x5), operands)
+
+    def test_unknown_instruction(self):
+        for instruction in [0x0000, 0x00E1, 0x5121, 0x8128, 0x9121, 0xE100, 0xF100]:
+            with self.assertRaises(UnknownInstruction):
+                self.cpu.decode(instruction)
+
+            self.cpu.pc = 0x200
+            self.cpu.memory[0x200:0x202] = instruction.to_bytes(2, 'big')
+            with self.assertRaises(UnknownInstruction) as context:
+                self.cpu.step()
+            self.assertEqual(f"{instruction:04X}", str(context.exception))
+            self.assertEqual(0x202, self.cpu.pc)
+
     def test_CLS(self):  # 00E0
-        for row in self.screen.buffer:
-            for x, _ in enumerate(row):
-                row[x] = True
+        buffer = self.screen.buffer
+        buffer[:] = [ROW_MASK] * HEIGHT
         self.cpu._CLS()
-        for row in self.screen.buffer:
-            self.assertTrue(not any(row))
+        self.assertIs(buffer, self.screen.buffer)
+        self.assertEqual([0] * HEIGHT, self.screen.buffer)
+        self.assertEqual(ALL_ROWS, self.screen.dirty_rows)
 
     def test_RET(self):  # 00EE
         self.cpu.stack.append(0x42)
@@ -53,13 +133,13 @@ class TestCPU(unittest.TestCase):
 
     def test_JP_nnn(self):  # 1nnn
         self.cpu.instruction = 0x1042
-        self.cpu._JP_nnn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.pc)
 
     def test_CALL_nnn(self):  # 2nnn
         self.cpu.instruction = 0x2042
         self.cpu.pc = 0x1234
-        self.cpu._CALL_nnn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.pc)
         self.assertEqual([0x1234], self.cpu.stack)
 
@@ -68,15 +148,15 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0x42
 
         self.cpu.instruction = 0x3042
-        self.cpu._SE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.cpu.instruction = 0x3141
-        self.cpu._SE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.cpu.instruction = 0x3142
-        self.cpu._SE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
     def test_SNE_Vx_nn(self):  # 4xnn
@@ -84,15 +164,15 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0x42
 
         self.cpu.instruction = 0x4142
-        self.cpu._SNE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.cpu.instruction = 0x4042
-        self.cpu._SNE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
         self.cpu.instruction = 0x4141
-        self.cpu._SNE_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 4, self.cpu.pc)
 
     def test_SE_Vx_Vy(self):  # 5xy0
@@ -101,58 +181,58 @@ class TestCPU(unittest.TestCase):
 
         self.cpu.V[0x1] = 0x41
         self.cpu.V[0x2] = 0x42
-        self.cpu._SE_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.cpu.V[0x1] = 0x42
-        self.cpu._SE_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
     def test_LD_Vx_nn(self):  # 6xnn
         self.cpu.instruction = 0x6142
-        self.cpu._LD_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.V[0x1])
 
-        self.cpu._LD_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.V[0x1])
 
     def test_ADD_Vx_nn(self):  # 7xnn
         self.cpu.instruction = 0x7101
         self.cpu.V[0x1] = 0xfe
 
-        self.cpu._ADD_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(0xff, self.cpu.V[0x1])
         self.assertEqual(0x00, self.cpu.V[0xf])
 
-        self.cpu._ADD_Vx_nn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x00, self.cpu.V[0x1])
         self.assertEqual(0x00, self.cpu.V[0xf])
 
     def test_LD_Vx_Vy(self):  # 8xy0
         self.cpu.instruction = 0x8010
         self.cpu.V[0x1] = 0x42
-        self.cpu._LD_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.V[0x0])
 
     def test_OR_Vx_Vy(self):  # 8xy1
         self.cpu.instruction = 0x8121
         self.cpu.V[0x1] = 0b01010101
         self.cpu.V[0x2] = 0b00001111
-        self.cpu._OR_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b01011111, self.cpu.V[0x1])
 
     def test_AND_Vx_Vy(self):  # 8xy2
         self.cpu.instruction = 0x8122
         self.cpu.V[0x1] = 0b01010101
         self.cpu.V[0x2] = 0b00001111
-        self.cpu._AND_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b00000101, self.cpu.V[0x1])
 
     def test_XOR_Vx_Vy(self):  # 8xy3
         self.cpu.instruction = 0x8123
         self.cpu.V[0x1] = 0b01010101
         self.cpu.V[0x2] = 0b00001111
-        self.cpu._XOR_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b01011010, self.cpu.V[0x1])
 
     def test_ADD_Vx_Vy(self):  # 8xy4
@@ -160,11 +240,11 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0xfe
         self.cpu.V[0x2] = 0x01
 
-        self.cpu._ADD_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0xff, self.cpu.V[0x1])
         self.assertEqual(0x00, self.cpu.V[0xf])
 
-        self.cpu._ADD_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0x00, self.cpu.V[0x1])
         self.assertEqual(0x01, self.cpu.V[0xf])
 
@@ -173,23 +253,23 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0x01
         self.cpu.V[0x2] = 0x01
 
-        self.cpu._SUB_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0x00, self.cpu.V[0x1])
         self.assertEqual(0x01, self.cpu.V[0xf])
 
-        self.cpu._SUB_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0xff, self.cpu.V[0x1])
         self.assertEqual(0x00, self.cpu.V[0xf])
 
     def test_SHR_Vx_Vy(self):  # 8xy6
         self.cpu.instruction = 0x8126
         self.cpu.V[0x2] = 0b11110000
-        self.cpu._SHR_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b01111000, self.cpu.V[0x1])
         self.assertEqual(0b00000000, self.cpu.V[0xf])
 
         self.cpu.V[0x2] = 0b00001111
-        self.cpu._SHR_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b00000111, self.cpu.V[0x1])
         self.assertEqual(0b00000001, self.cpu.V[0xf])
 
@@ -198,24 +278,24 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0x01
         self.cpu.V[0x2] = 0x01
 
-        self.cpu._SUBN_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0x00, self.cpu.V[0x1])
         self.assertEqual(0x01, self.cpu.V[0xf])
 
         self.cpu.V[0x1] = 0x02
-        self.cpu._SUBN_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0xff, self.cpu.V[0x1])
         self.assertEqual(0x00, self.cpu.V[0xf])
 
     def test_SHL_Vx_Vy(self):  # 8xyE
         self.cpu.instruction = 0x812E
         self.cpu.V[0x2] = 0b11110000
-        self.cpu._SHL_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b11100000, self.cpu.V[0x1])
         self.assertEqual(0b00000001, self.cpu.V[0xf])
 
         self.cpu.V[0x2] = 0b00001111
-        self.cpu._SHL_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(0b00011110, self.cpu.V[0x1])
         self.assertEqual(0b00000000, self.cpu.V[0xf])
 
@@ -225,29 +305,29 @@ class TestCPU(unittest.TestCase):
 
         self.cpu.V[0x1] = 0x42
         self.cpu.V[0x2] = 0x42
-        self.cpu._SNE_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.cpu.V[0x1] = 0x41
-        self.cpu._SNE_Vx_Vy()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
     def test_LD_I_nnn(self):  # Annn
         self.cpu.instruction = 0xA042
-        self.cpu._LD_I_nnn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.I)
 
     def test_JP_V0_nnn(self):  # Bnnn
         self.cpu.instruction = 0xB042
         self.cpu.V[0x0] = 0x42
-        self.cpu._JP_V0_nnn()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42 + 0x42, self.cpu.pc)
 
     def test_RND_Vx_nn(self):  # Cxnn
         numbers = set()
         for mask in range(0xff + 1):
             self.cpu.instruction = 0xC100 | mask
-            self.cpu._RND_Vx_nn()
+            self.cpu.opcode_handler()
             rnd = self.cpu.V[0x1]
             self.assertEqual(rnd & mask, rnd)
             numbers.add(rnd)
@@ -260,37 +340,41 @@ class TestCPU(unittest.TestCase):
         digit = 7
 
         self.cpu.instruction = 0xD125
+        self.screen.dirty_rows = 0
         self.cpu.I = digit * 5
         self.cpu.V[0x1] = x
         self.cpu.V[0x2] = y
 
-        with self.assertRaises(UpdateScreen):
-            self.cpu._DRW_Vx_Vy_n()
+        self.assertFalse(self.cpu.opcode_handler())
+        self.assertEqual(1, self.cpu.draws)
         for line in range(5):
-            self.assertEqual(cpu.font_sprites[digit * 5 + line], to_int(self.screen.buffer[y + line][x:x + 8]))
+            pixels = row_pixels(self.screen.buffer[y + line])
+            self.assertEqual(cpu.font_sprites[digit * 5 + line], to_int(pixels[x:x + 8]))
         self.assertEqual(0x00, self.cpu.V[0xf])
+        self.assertEqual(0b11111 << y, self.screen.dirty_rows)
 
-        with self.assertRaises(UpdateScreen):
-            self.cpu._DRW_Vx_Vy_n()
+        self.cpu.opcode_handler()
         for line in range(5):
-            self.assertEqual(0x00, to_int(self.screen.buffer[y + line][x:x + 8]))
+            pixels = row_pixels(self.screen.buffer[y + line])
+            self.assertEqual(0x00, to_int(pixels[x:x + 8]))
         self.assertEqual(0x01, self.cpu.V[0xf])
 
         self.cpu.V[0x1] = 62
         self.cpu.V[0x2] = 30
-        with self.assertRaises(UpdateScreen):
-            self.cpu._DRW_Vx_Vy_n()
-        self.assertEqual([True, True], self.screen.buffer[30][62:64])
-        self.assertEqual([False, False], self.screen.buffer[31][62:64])
-        self.assertEqual([False, False], self.screen.buffer[0][62:64])
-        self.assertEqual([False, True], self.screen.buffer[1][62:64])
-        self.assertEqual([False, True], self.screen.buffer[2][62:64])
-
-        self.assertEqual([True, True], self.screen.buffer[30][0:2])
-        self.assertEqual([False, True], self.screen.buffer[31][0:2])
-        self.assertEqual([True, False], self.screen.buffer[0][0:2])
-        self.assertEqual([False, False], self.screen.buffer[1][0:2])
-        self.assertEqual([False, False], self.screen.buffer[2][0:2])
+        self.screen.dirty_rows = 0
+        self.cpu.opcode_handler()
+        self.assertEqual(0b11 << 30 | 0b111, self.screen.dirty_rows)
+        self.assertEqual([True, True], row_pixels(self.screen.buffer[30])[62:64])
+        self.assertEqual([False, False], row_pixels(self.screen.buffer[31])[62:64])
+        self.assertEqual([False, False], row_pixels(self.screen.buffer[0])[62:64])
+        self.assertEqual([False, True], row_pixels(self.screen.buffer[1])[62:64])
+        self.assertEqual([False, True], row_pixels(self.screen.buffer[2])[62:64])
+
+        self.assertEqual([True, True], row_pixels(self.screen.buffer[30])[0:2])
+        self.assertEqual([False, True], row_pixels(self.screen.buffer[31])[0:2])
+        self.assertEqual([True, False], row_pixels(self.screen.buffer[0])[0:2])
+        self.assertEqual([False, False], row_pixels(self.screen.buffer[1])[0:2])
+        self.assertEqual([False, False], row_pixels(self.screen.buffer[2])[0:2])
 
     def test_SKP_Vx(self):  # Ex9E
         self.cpu.instruction = 0xE19E
@@ -298,11 +382,11 @@ class TestCPU(unittest.TestCase):
 
         self.cpu.V[0x1] = 0x1
 
-        self.cpu._SKP_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.keyboard.pressed_keys.add(0x1)
-        self.cpu._SKP_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
     def test_SKNP_Vx(self):  # ExA1
@@ -312,23 +396,22 @@ class TestCPU(unittest.TestCase):
         self.cpu.V[0x1] = 0x1
 
         self.keyboard.pressed_keys.add(0x1)
-        self.cpu._SKNP_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(addr, self.cpu.pc)
 
         self.keyboard.pressed_keys.remove(0x1)
-        self.cpu._SKNP_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(addr + 2, self.cpu.pc)
 
     def test_LD_Vx_DT(self):  # Fx07
         self.cpu.instruction = 0xF107
         self.cpu.delay_timer = 0x42
-        self.cpu._LD_Vx_DT()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.V[0x1])
 
     def test_LD_Vx_K(self):  # Fx0A
         self.cpu.instruction = 0xF10A
-        with self.assertRaises(WaitForKeypress):
-            self.cpu._LD_Vx_K()
+        self.assertTrue(self.cpu.opcode_handler())
         self.assertTrue(self.cpu.waiting_for_keypress)
 
         self.cpu.key_was_pressed(0x1)
@@ -338,41 +421,41 @@ class TestCPU(unittest.TestCase):
     def test_LD_DT_Vx(self):  # Fx15
         self.cpu.instruction = 0xF115
         self.cpu.V[0x1] = 0x42
-        self.cpu._LD_DT_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.delay_timer)
 
     def test_LD_ST_Vx(self):  # Fx18
         self.cpu.instruction = 0xF118
         self.cpu.V[0x1] = 0x42
-        self.cpu._LD_ST_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(0x42, self.cpu.sound_timer)
 
     def test_ADD_I_Vx(self):  # Fx1E
         self.cpu.instruction = 0xF11E
         self.cpu.V[0x1] = 0x1
         self.cpu.I = 0xffe
-        self.cpu._ADD_I_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(0xfff, self.cpu.I)
 
-        self.cpu._ADD_I_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(0x000, self.cpu.I)
 
     def test_LD_F_Vx(self):  # Fx29
         self.cpu.instruction = 0xF129
         self.cpu.V[0x1] = 7
-        self.cpu._LD_F_Vx()
+        self.cpu.opcode_handler()
         self.assertEqual(7 * 5, self.cpu.I)
 
     def test_LD_B_Vx(self):  # Fx33
         self.cpu.instruction = 0xF133
-        self.cpu._LD_B_Vx()
+        self.cpu.opcode_handler()
 
     def test_LD_I_Vx(self):  # Fx55
         self.cpu.instruction = 0xF755
         self.cpu.I = 0x123
         for reg in range(0x7 + 1):
             self.cpu.V[reg] = reg * 2
-        self.cpu._LD_I_Vx()
+        self.cpu.opcode_handler()
         for reg in range(0x7 + 1):
             self.assertEqual(reg * 2, self.cpu.memory[0x123 + reg])
         self.assertEqual(0x123 + 0x7 + 1, self.cpu.I)
@@ -382,7 +465,7 @@ class TestCPU(unittest.TestCase):
         self.cpu.I = 0x123
         for reg in range(0x7 + 1):
             self.cpu.memory[0x123 + reg] = reg * 2
-        self.cpu._LD_Vx_I()
+        self.cpu.opcode_handler()
         for reg in range(0x7 + 1):
             self.assertEqual(reg * 2, self.cpu.V[reg])
         self.assertEqual(0x123 + 0x7 + 1, self.cpu.I)
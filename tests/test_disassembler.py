@@ -0,0 +1,55 @@
+import unittest
+
+from chip8.disassembler import disassemble
+
+call_0x20C = b"\x22\x0c"
+ld_I_0x212 = b"\xa2\x12"
+se_V0_00 = b"\x30\x00"
+jp_0x202 = b"\x12\x02"
+ld_F_V0 = b"\xf0\x29"
+jp_0x20A = b"\x12\x0a"
+drw_V0_V0_1 = b"\xd0\x01"
+ret = b"\x00\xee"
+unknown = b"\x01\x23"
+sprite = b"\x81"
+ROM = call_0x20C + ld_I_0x212 + se_V0_00 + jp_0x202 + ld_F_V0 + jp_0x20A + drw_V0_V0_1 + ret + unknown + sprite
+
+
+class TestDisassembler(unittest.TestCase):
+    def test_control_flow(self):
+        disassembly = disassemble(ROM)
+        self.assertEqual([0x200, 0x202, 0x204, 0x206, 0x208, 0x20A, 0x20C, 0x20E], sorted(disassembly.instructions))
+        self.assertEqual([0x200, 0x202, 0x206, 0x208, 0x20A, 0x20C], sorted(disassembly.blocks))
+        self.assertEqual([0x20C, 0x202], disassembly.blocks[0x200].successors)
+        self.assertEqual([0x206, 0x208], disassembly.blocks[0x202].successors)
+        self.assertEqual(2, len(disassembly.blocks[0x202].instructions))
+        self.assertEqual([], disassembly.blocks[0x20C].successors)
+        self.assertEqual({0x20C}, disassembly.subroutines)
+        self.assertEqual({0x212}, disassembly.data_references)
+        self.assertEqual([], disassembly.invalid)
+
+    def test_code_map(self):
+        disassembly = disassemble(ROM)
+        self.assertEqual(b"\x01" * 16 + b"\x00" * 3, bytes(disassembly.code_map()))
+        self.assertTrue(disassembly.is_code(0x20F))
+        self.assertFalse(disassembly.is_code(0x210))
+
+    def test_listing(self):
+        lines = disassemble(ROM).listing().splitlines()
+        self.assertEqual("start:", lines[0])
+        self.assertEqual("    200  220C  CALL sub_20C", lines[1])
+        self.assertEqual("label_202:", lines[2])
+        self.assertEqual("    202  A212  LD I, data_212", lines[3])
+        self.assertIn("    20C  D001  DRW V0, V0, 0x1", lines)
+        self.assertEqual(["data_212:", "    212  81    DB 0x81  ; #......#"], lines[-2:])
+
+    def test_invalid(self):
+        disassembly = disassemble(unknown)
+        self.assertEqual([0x200], disassembly.invalid)
+        self.assertEqual({}, disassembly.instructions)
+
+    def test_indirect_jump(self):
+        jp_V0_0x204 = b"\xb2\x04"
+        disassembly = disassemble(jp_V0_0x204 + jp_0x202 + ret)
+        self.assertEqual([0x200], disassembly.indirect_jumps)
+        self.assertEqual([0x200, 0x204], sorted(disassembly.instructions))
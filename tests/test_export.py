@@ -0,0 +1,151 @@
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+import pygame
+
+from chip8.chip8 import Chip8
+from chip8.display import HEIGHT, WIDTH
+from chip8.export import EXPORT_QUEUE_SIZE, FrameExporter, GIFWriter, PNGSequenceWriter, RawWriter, Writer, open_writer
+
+
+class ListWriter(Writer):
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    def write(self, frame, duration):
+        self.frames.append((frame, duration))
+
+    def close(self):
+        self.closed = True
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def assertSurfaceEqual(self, frame, surface, scale):
+        self.assertEqual((WIDTH * scale, HEIGHT * scale), surface.get_size())
+        for y in range(HEIGHT * scale):
+            for x in range(WIDTH * scale):
+                lit = frame[y // scale] >> (WIDTH - 1 - x // scale) & 1
+                self.assertEqual(255 if lit else 0, surface.get_at((x, y))[0], (x, y))
+
+    def test_deduplication(self):
+        writer = ListWriter()
+        exporter = FrameExporter(writer)
+        buffer = [0] * HEIGHT
+        for frame_number in range(1, 11):
+            if frame_number in (4, 5):
+                buffer[0] = frame_number
+            exporter.capture(frame_number, buffer)
+        exporter.close()
+
+        self.assertTrue(writer.closed)
+        self.assertEqual([3, 1, 6], [duration for _, duration in writer.frames])
+        self.assertEqual([0, 4, 5], [frame[0] for frame, _ in writer.frames])
+
+    def test_error(self):
+        class FailingWriter(Writer):
+            def write(self, frame, duration):
+                raise OSError("disk full")
+
+            def close(self):
+                self.closed = True
+
+        writer = FailingWriter()
+        exporter = FrameExporter(writer)
+        # More frames than the queue holds don't block once the encoder failed.
+        for frame_number in range(1, 2 * EXPORT_QUEUE_SIZE):
+            exporter.capture(frame_number, [frame_number] * HEIGHT)
+        with self.assertRaises(OSError):
+            exporter.close()
+        self.assertTrue(writer.closed)
+
+    def test_incomplete_writer(self):
+        class NoCloseWriter(Writer):
+            def write(self, frame, duration):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoCloseWriter()
+
+    def test_backpressure(self):
+        exporter = FrameExporter(ListWriter())
+        self.assertEqual(EXPORT_QUEUE_SIZE, exporter.queue.maxsize)
+        exporter.close()
+
+    def test_raw(self):
+        frames = [(1,) * HEIGHT, (2,) * HEIGHT]
+        writer = RawWriter(self.path("frames.raw"))
+        writer.write(frames[0], 3)
+        writer.write(frames[1], 1)
+        writer.close()
+
+        with open(self.path("frames.raw"), "rb") as f:
+            data = f.read()
+        self.assertEqual((b"CH8F", 1, WIDTH, HEIGHT), struct.unpack(">4sBBB", data[:7]))
+        record = struct.Struct(f">I{HEIGHT}Q")
+        self.assertEqual((3,) + frames[0], record.unpack_from(data, 7))
+        self.assertEqual((1,) + frames[1], record.unpack_from(data, 7 + record.size))
+        self.assertEqual(7 + 2 * record.size, len(data))
+
+    def test_gif(self):
+        # Noise at this scale fills the LZW code table, which has to be cleared and restarted.
+        frame = tuple(random.Random(1).getrandbits(WIDTH) for _ in range(HEIGHT))
+        writer = open_writer(self.path("preview.gif"), scale=8)
+        self.assertIsInstance(writer, GIFWriter)
+        writer.write(frame, 1)
+        writer.write((0,) * HEIGHT, 1)
+        writer.write((1,) * HEIGHT, 60)
+        writer.close()
+
+        with open(self.path("preview.gif"), "rb") as f:
+            data = f.read()
+        self.assertTrue(data.startswith(b"GIF89a"))
+        self.assertTrue(data.endswith(b"\x3b"))
+        # The blank frame would end at 3 hundredths, one after the first frame, so it is dropped.
+        delays = [struct.unpack("<H", data[i + 4:i + 6])[0]
+                  for i in range(len(data)) if data[i:i + 3] == b"\x21\xf9\x04"]
+        self.assertEqual([2, 101], delays)
+        self.assertSurfaceEqual(frame, pygame.image.load(self.path("preview.gif")), 8)
+
+    def test_png_sequence(self):
+        frame = tuple(random.Random(2).getrandbits(WIDTH) for _ in range(HEIGHT))
+        writer = open_writer(self.path("frames"), scale=2)
+        self.assertIsInstance(writer, PNGSequenceWriter)
+        writer.write((0,) * HEIGHT, 30)
+        writer.write(frame, 90)
+        writer.close()
+
+        self.assertSurfaceEqual(frame, pygame.image.load(self.path("frames/frame_00001.png")), 2)
+        with open(self.path("frames/frames.ffconcat")) as f:
+            self.assertEqual("ffconcat version 1.0\n"
+                             "file frame_00000.png\nduration 0.5000\n"
+                             "file frame_00001.png\nduration 1.5000\n", f.read())
+
+    def test_chip8(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200, headless=True)
+        ld_F_V0 = b"\xf0\x29"
+        drw_V0_V0_5 = b"\xd0\x05"
+        add_V0_05 = b"\x70\x05"
+        jp_0x200 = b"\x12\x00"
+        chip8.load(ld_F_V0 + drw_V0_V0_5 + add_V0_05 + jp_0x200)
+        writer = ListWriter()
+        exporter = FrameExporter(writer)
+        chip8.frame_hooks.append(exporter.capture)
+        chip8.run(8)
+        exporter.close()
+
+        self.assertEqual(8, sum(duration for _, duration in writer.frames))
+        self.assertEqual([1, 4, 3], [duration for _, duration in writer.frames])
+        self.assertEqual(tuple(chip8.screen.buffer), writer.frames[-1][0])
@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import unittest
+
+from chip8.display import ALL_ROWS
+from chip8.headless import HeadlessKeyboard, HeadlessScreen, HeadlessSound
+
+
+class TestHeadlessScreen(unittest.TestCase):
+    def test_init(self):
+        screen = HeadlessScreen()
+        self.assertEqual(32, len(screen.buffer))
+        for row in range(32):
+            self.assertEqual(0, screen.buffer[row])
+        self.assertEqual(0, screen.frames)
+
+    def test_update(self):
+        screen = HeadlessScreen()
+        self.assertEqual(ALL_ROWS, screen.dirty_rows)
+        screen.update()
+        screen.update()
+        self.assertEqual(2, screen.frames)
+        self.assertEqual(0, screen.dirty_rows)
+
+
+class TestHeadlessKeyboard(unittest.TestCase):
+    def test_press_release(self):
+        keyboard = HeadlessKeyboard()
+        self.assertEqual(set(), keyboard.pressed_keys)
+
+        keyboard.press(0x1)
+        keyboard.press(0xf)
+        self.assertEqual({0x1, 0xf}, keyboard.pressed_keys)
+
+        keyboard.release(0x1)
+        keyboard.release(0x2)
+        self.assertEqual({0xf}, keyboard.pressed_keys)
+
+
+class TestHeadlessSound(unittest.TestCase):
+    def test_update(self):
+        sound = HeadlessSound()
+        self.assertFalse(sound.is_playing)
+
+        sound.update(2)
+        self.assertTrue(sound.is_playing)
+
+        sound.update(0)
+        self.assertFalse(sound.is_playing)
+
+
+class TestHeadlessImports(unittest.TestCase):
+    def test_no_pygame(self):
+        # Headless machines, batch workers and the CLI's argument parsing don't need pygame.
+        check = ("import sys, chip8.aio, chip8.batch, chip8.chip8, chip8.replay, chip8.server, main; "
+                 "from chip8.chip8 import Chip8; Chip8(1, 10, 0x200, headless=True); "
+                 "assert 'pygame' not in sys.modules")
+        subprocess.run([sys.executable, "-c", check], check=True)
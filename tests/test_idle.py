@@ -0,0 +1,73 @@
+import unittest
+
+from chip8.chip8 import Chip8
+
+ld_V0_05 = b"\x60\x05"
+ld_DT_V0 = b"\xf0\x15"
+ld_V1_DT = b"\xf1\x07"
+se_V1_00 = b"\x31\x00"
+jp_0x204 = b"\x12\x04"
+add_V2_01 = b"\x72\x01"
+jp_0x200 = b"\x12\x00"
+TIMER_LOOP = ld_V0_05 + ld_DT_V0 + ld_V1_DT + se_V1_00 + jp_0x204 + add_V2_01 + jp_0x200
+
+
+class TestIdleLoopDetector(unittest.TestCase):
+    def run_both(self, rom, frames, cycles_per_frame=50, jit=False):
+        interpreter = Chip8(scaling_factor=1, cycles_per_frame=cycles_per_frame, starting_address=0x200,
+                            headless=True)
+        skipping = Chip8(scaling_factor=1, cycles_per_frame=cycles_per_frame, starting_address=0x200,
+                         headless=True, idle_skip=True, jit=jit)
+        for chip8 in (interpreter, skipping):
+            chip8.load(rom)
+        for _ in range(frames):
+            for chip8 in (interpreter, skipping):
+                chip8.tick()
+            self.assertEqual(interpreter.cpu.snapshot(), skipping.cpu.snapshot())
+        return skipping
+
+    def test_timer_loop(self):
+        chip8 = self.run_both(TIMER_LOOP, 20)
+        self.assertEqual(3, chip8.cpu.V[2])
+        self.assertGreater(chip8.idle.skipped_cycles, 20 * 50 // 2)
+
+    def test_jit(self):
+        chip8 = self.run_both(TIMER_LOOP, 20, jit=True)
+        self.assertGreater(chip8.idle.skipped_cycles, 0)
+
+    def test_key_loop(self):
+        ld_V0_07 = b"\x60\x07"
+        sknp_V0 = b"\xe0\xa1"
+        jp_0x202 = b"\x12\x02"
+        rom = ld_V0_07 + sknp_V0 + jp_0x202 + add_V2_01 + jp_0x202
+        interpreter = Chip8(scaling_factor=1, cycles_per_frame=50, starting_address=0x200, headless=True)
+        skipping = Chip8(scaling_factor=1, cycles_per_frame=50, starting_address=0x200, headless=True,
+                         idle_skip=True)
+        for chip8 in (interpreter, skipping):
+            chip8.load(rom)
+            for frame in range(10):
+                if frame == 5:
+                    chip8.press_key(0x7)
+                chip8.tick()
+        self.assertEqual(interpreter.cpu.snapshot(), skipping.cpu.snapshot())
+        self.assertGreater(skipping.idle.skipped_cycles, 0)
+
+    def test_busy_loops(self):
+        # Loops that change state or draw are never skipped.
+        jp_0x202 = b"\x12\x02"
+        ld_F_V0 = b"\xf0\x29"
+        drw_V0_V0_5 = b"\xd0\x05"
+        self.assertEqual(0, self.run_both(add_V2_01 + jp_0x200, 5).idle.skipped_cycles)
+        self.assertEqual(0, self.run_both(ld_F_V0 + drw_V0_V0_5 + jp_0x202, 5).idle.skipped_cycles)
+
+    def test_invalidate(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=50, starting_address=0x200, headless=True, idle_skip=True)
+        chip8.load(TIMER_LOOP)
+        for _ in range(3):
+            chip8.tick()
+        loops = dict(chip8.idle.loops)
+        self.assertTrue(any(loops.values()))
+        chip8.cpu._memory_written(0x300, 2)
+        self.assertEqual(loops, chip8.idle.loops)
+        chip8.cpu._memory_written(0x206, 1)
+        self.assertEqual({}, chip8.idle.loops)
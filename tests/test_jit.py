@@ -0,0 +1,106 @@
+import unittest
+
+from chip8.cpu import CPU
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+from chip8.jit import JIT, DifferentialJIT, JITMismatch
+
+
+class TestJIT(unittest.TestCase):
+    def setUp(self):
+        self.cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        self.jit = JIT(self.cpu)
+
+    def test_translate(self):
+        ld_V0_01 = b"\x60\x01"
+        add_V1_V0 = b"\x81\x04"
+        se_V1_10 = b"\x31\x10"
+        self.cpu.load(ld_V0_01 + add_V1_V0 + se_V1_10)
+        block = self.jit.translate(0x200)
+        self.assertEqual(0x200, block.start)
+        self.assertEqual(0x206, block.end)
+        self.assertEqual(3, block.length)
+        self.assertIn("V[0x0] = 0x1", block.source)
+        self.assertIn("cpu.pc = 0x208 if V[0x1] == 0x10 else 0x206", block.source)
+
+    def test_stop_signal(self):
+        drw_V0_V0_1 = b"\xd0\x01"
+        ld_V1_K = b"\xf1\x0a"
+        self.cpu.load(drw_V0_V0_1 + ld_V1_K)
+        block = self.jit.block_at(0x200)
+        self.assertEqual(2, block.length)
+        self.assertTrue(block.function(self.cpu))
+        self.assertEqual(1, self.cpu.draws)
+        self.assertTrue(self.cpu.waiting_for_keypress)
+        self.assertEqual(0x204, self.cpu.pc)
+
+    def test_max_block_length(self):
+        self.cpu.load(b"\x70\x01" * 10)
+        jit = JIT(self.cpu, max_block_length=4)
+        block = jit.block_at(0x200)
+        self.assertEqual(4, block.length)
+        self.assertEqual(0x208, block.end)
+
+        block.function(self.cpu)
+        self.assertEqual(0x208, self.cpu.pc)
+        self.assertEqual(0x7001, self.cpu.instruction)
+        self.assertEqual(4, self.cpu.V[0])
+
+    def test_block_at(self):
+        ld_V0_FF = b"\x60\xff"
+        add_V0_V0 = b"\x80\x04"
+        jp_0x200 = b"\x12\x00"
+        self.cpu.load(ld_V0_FF + add_V0_V0 + jp_0x200)
+        block = self.jit.block_at(0x200)
+        self.assertIs(block, self.jit.block_at(0x200))
+
+        block.function(self.cpu)
+        self.assertEqual(0x200, self.cpu.pc)
+        self.assertEqual(0x1200, self.cpu.instruction)
+        self.assertEqual(0xfe, self.cpu.V[0x0])
+        self.assertEqual(0x01, self.cpu.V[0xf])
+
+    def test_invalidate(self):
+        ld_V0_61 = b"\x60\x61"
+        ld_I_0x200 = b"\xa2\x00"
+        ld_I_V0 = b"\xf0\x55"
+        self.cpu.load(ld_V0_61 + ld_I_0x200 + ld_I_V0)
+        block = self.jit.block_at(0x200)
+
+        self.jit.invalidate(0x300, 2)
+        self.assertIs(block, self.jit.block_at(0x200))
+
+        block.function(self.cpu)
+        self.assertEqual(0x61, self.cpu.memory[0x200])
+        self.assertNotIn(0x200, self.jit.blocks)
+        self.assertIn("V[0x1] = 0x61", self.jit.block_at(0x200).source)
+
+    def test_load_invalidates(self):
+        jp_0x202 = b"\x12\x02"
+        self.cpu.load(b"\x60\x01" + jp_0x202)
+        self.jit.block_at(0x200)
+        self.cpu.load(b"\x60\x02" + jp_0x202)
+        self.jit.block_at(0x200).function(self.cpu)
+        self.assertEqual(0x02, self.cpu.V[0])
+
+
+class TestDifferentialJIT(unittest.TestCase):
+    def test_matches_interpreter(self):
+        cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        jit = DifferentialJIT(cpu)
+        rnd_V0_FF = b"\xc0\xff"
+        shl_V1_V0 = b"\x81\x0e"
+        ld_F_V1 = b"\xf1\x29"
+        jp_0x200 = b"\x12\x00"
+        cpu.load(rnd_V0_FF + shl_V1_V0 + ld_F_V1 + jp_0x200)
+        jit.block_at(0x200).function(cpu)
+        self.assertEqual(0x200, cpu.pc)
+
+    def test_mismatch(self):
+        cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        jit = DifferentialJIT(cpu)
+        cpu.load(b"\x60\x01\x12\x00")
+        block = jit.translate(0x200)
+        block.source = block.source.replace("V[0x0] = 0x1", "V[0x0] = 0x2")
+        jit.translate = lambda start: block
+        with self.assertRaises(JITMismatch):
+            jit.block_at(0x200).function(cpu)
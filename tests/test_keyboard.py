@@ -41,3 +41,12 @@ class TestKeyboard(unittest.TestCase):
         key = keyboard.keyup(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_1))
         self.assertEqual(set(), keyboard.pressed_keys)
         self.assertEqual(0x1, key)
+
+    def test_press_release(self):
+        keyboard = Keyboard()
+        keyboard.press(0x1)
+        self.assertEqual({0x1}, keyboard.pressed_keys)
+
+        keyboard.release(0x1)
+        keyboard.release(0x2)
+        self.assertEqual(set(), keyboard.pressed_keys)
@@ -0,0 +1,63 @@
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.cpu import CPU, DispatchTable
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+from chip8.profiler import Profiler, ProfilingDispatchTable
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        ld_V0_01 = b"\x60\x01"
+        add_V0_01 = b"\x70\x01"
+        drw_V0_V0_1 = b"\xd0\x01"
+        self.cpu.load(ld_V0_01 + add_V0_01 + add_V0_01 + drw_V0_V0_1)
+        self.profiler = Profiler(self.cpu)
+
+    def run_program(self):
+        self.cpu.run_cycles(4)
+
+    def test_attach_detach(self):
+        self.assertIsInstance(self.cpu.dispatch_table, ProfilingDispatchTable)
+        self.profiler.detach()
+        self.assertIs(type(self.cpu.dispatch_table), DispatchTable)
+        self.run_program()
+        self.assertEqual({}, self.profiler.samples)
+
+    def test_families(self):
+        self.run_program()
+        families = self.profiler.families()
+        self.assertEqual({'LD_Vx_nn', 'ADD_Vx_nn', 'DRW_Vx_Vy_n'}, set(families))
+        self.assertEqual(2, families['ADD_Vx_nn']['count'])
+        self.assertEqual(1, self.cpu.draws)
+        self.assertEqual(3, self.cpu.V[0])
+
+    def test_addresses(self):
+        self.run_program()
+        addresses = self.profiler.addresses()
+        self.assertEqual([0x200, 0x202, 0x204, 0x206], list(addresses))
+        self.assertEqual('DRW_Vx_Vy_n', addresses[0x206]['family'])
+
+        report = self.profiler.to_dict()
+        self.assertEqual(4, report['instructions'])
+        self.assertEqual(1, report['draws'])
+        self.assertIn("0x206", report['addresses'])
+
+    def test_folded(self):
+        self.run_program()
+        lines = self.profiler.folded(by_time=False)
+        self.assertIn("ADD_Vx_nn;0x202 1", lines)
+        self.assertIn("DRW_Vx_Vy_n;0x206 1", lines)
+
+
+class TestChip8Profiling(unittest.TestCase):
+    def test_wait_cycles(self):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=10, starting_address=0x200, headless=True, profile=True)
+        ld_V0_01 = b"\x60\x01"
+        ld_V1_K = b"\xf1\x0a"
+        chip8.load(ld_V0_01 + ld_V1_K)
+        chip8.tick()
+        chip8.tick()
+        self.assertEqual(8 + 10, chip8.profiler.wait_cycles)
+        self.assertEqual(1, chip8.profiler.to_dict()['keypress_waits'])
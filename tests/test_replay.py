@@ -0,0 +1,88 @@
+import io
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.replay import (RECORDING_HEADER, Recorder, ReplayDivergence, decode_varint, encode_varint, read_events,
+                          read_header, replay)
+
+rnd_V0_FF = b"\xc0\xff"
+ld_V1_K = b"\xf1\x0a"
+skp_V0 = b"\xe0\x9e"
+add_V2_01 = b"\x72\x01"
+ld_F_V0 = b"\xf0\x29"
+drw_V2_V0_5 = b"\xd2\x05"
+jp_0x200 = b"\x12\x00"
+ROM = rnd_V0_FF + ld_V1_K + skp_V0 + add_V2_01 + ld_F_V0 + drw_V2_V0_5 + jp_0x200
+
+
+class TestReplay(unittest.TestCase):
+    def record(self, jit=False):
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=5, starting_address=0x200, headless=True, jit=jit)
+        chip8.load(ROM)
+        stream = io.BytesIO()
+        recorder = Recorder(chip8, stream)
+        for frame in range(40):
+            if frame % 4 == 1:
+                chip8.press_key(frame % 16)
+            if frame % 4 == 3:
+                chip8.release_key((frame - 2) % 16)
+            chip8.tick()
+        recorder.close()
+        stream.seek(0)
+        return chip8, stream
+
+    def test_replay(self):
+        chip8, stream = self.record()
+        replayed = replay(ROM, stream)
+        self.assertEqual(chip8.cpu.snapshot(), replayed.cpu.snapshot())
+        self.assertEqual(chip8.screen.buffer, replayed.screen.buffer)
+
+    def test_replay_jit(self):
+        chip8, stream = self.record(jit=True)
+        self.assertEqual(chip8.cpu.snapshot(), replay(ROM, stream).cpu.snapshot())
+
+    def test_format(self):
+        chip8, stream = self.record()
+        self.assertEqual((0x200, 5), read_header(stream)[:2])
+        events = list(read_events(stream))
+        self.assertEqual(chip8.cycles, events[-1][0])
+        self.assertEqual(0x30, events[-1][1])
+        self.assertEqual(chip8.cpu.V[0], [value for _, tag, value in events if tag == 0x20][-1])
+
+        with self.assertRaises(ValueError):
+            replay(ROM + b"\x00", io.BytesIO(stream.getvalue()))
+        with self.assertRaises(ValueError):
+            read_header(io.BytesIO(b"CH8S" + stream.getvalue()[4:]))
+
+    def test_divergence(self):
+        _, stream = self.record()
+        without_draws = io.BytesIO()
+        without_draws.write(stream.read(RECORDING_HEADER.size))
+        cycles = 0
+        for event_cycles, tag, _ in read_events(stream):
+            if tag != 0x20:
+                without_draws.write(encode_varint(event_cycles - cycles) + bytes([tag]))
+                cycles = event_cycles
+        without_draws.seek(0)
+        with self.assertRaises(ReplayDivergence):
+            replay(ROM, without_draws)
+
+    def test_varint(self):
+        for value in [0, 1, 0x7f, 0x80, 0x3fff, 0x4000, 2 ** 40]:
+            self.assertEqual(value, decode_varint(io.BytesIO(encode_varint(value))))
+        self.assertEqual(b"\x7f", encode_varint(0x7f))
+        self.assertEqual(b"\x80\x01", encode_varint(0x80))
+        self.assertIsNone(decode_varint(io.BytesIO(b"")))
+        with self.assertRaises(ValueError):
+            decode_varint(io.BytesIO(b"\x80"))
+
+    def test_truncated(self):
+        _, stream = self.record()
+        header = stream.read(RECORDING_HEADER.size)
+        events = stream.read()
+        # Cut after the cycles of the last event, before its tag, and after the tag of an RND event.
+        for data in [events[:-1], encode_varint(1) + b"\x20"]:
+            with self.assertRaisesRegex(ValueError, "truncated recording"):
+                list(read_events(io.BytesIO(data)))
+        with self.assertRaisesRegex(ValueError, "truncated recording"):
+            replay(ROM, io.BytesIO(header + events[:-1]))
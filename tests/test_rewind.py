@@ -0,0 +1,49 @@
+import unittest
+
+from chip8.cpu import CPU
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+from chip8.rewind import Rewind
+
+
+class TestRewind(unittest.TestCase):
+    def setUp(self):
+        self.cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        add_V0_01 = b"\x70\x01"
+        ld_I_0x300 = b"\xa3\x00"
+        ld_I_V0 = b"\xf0\x55"
+        drw_V0_V0_1 = b"\xd0\x01"
+        jp_0x200 = b"\x12\x00"
+        self.cpu.load(add_V0_01 + ld_I_0x300 + ld_I_V0 + drw_V0_V0_1 + jp_0x200)
+        self.rewind = Rewind(self.cpu, seconds=1, keyframe_interval=4)
+
+    def run_frames(self, frames):
+        snapshots = []
+        for _ in range(frames):
+            self.rewind.record()
+            snapshots.append(self.cpu.snapshot())
+            self.cpu.run_cycles(5)
+        return snapshots
+
+    def test_rewind(self):
+        snapshots = self.run_frames(10)
+        self.assertEqual(10, len(self.rewind))
+        for snapshot in reversed(snapshots):
+            self.assertEqual(snapshot, self.rewind.pop())
+        self.assertIsNone(self.rewind.pop())
+
+    def test_rewind_frames(self):
+        snapshots = self.run_frames(10)
+        self.assertTrue(self.rewind.rewind(3))
+        self.assertEqual(snapshots[7], self.cpu.snapshot())
+        self.assertEqual(0x07, self.cpu.memory[0x300])
+
+        snapshots = snapshots[:7] + self.run_frames(3)
+        for snapshot in reversed(snapshots):
+            self.assertEqual(snapshot, self.rewind.pop())
+
+        self.assertFalse(self.rewind.rewind())
+
+    def test_capacity(self):
+        self.run_frames(100)
+        self.assertEqual(60, len(self.rewind))
+        self.assertLess(self.rewind.size(), 60 * len(self.cpu.snapshot()) / 3)
@@ -0,0 +1,62 @@
+import unittest
+
+from chip8.scheduler import FrameScheduler, FrameStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFrameScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = FrameScheduler(rate=50, max_catch_up=3, clock=self.clock)
+
+    def test_pacing(self):
+        self.assertEqual(1, self.scheduler.due_frames())
+        self.assertEqual(0, self.scheduler.due_frames())
+        self.assertAlmostEqual(0.02, self.scheduler.time_until_next_frame())
+
+        # Waking up late doesn't shift the following deadlines.
+        self.clock.now += 0.025
+        self.assertEqual(1, self.scheduler.due_frames())
+        self.assertAlmostEqual(0.015, self.scheduler.time_until_next_frame())
+
+    def test_catch_up(self):
+        self.scheduler.due_frames()
+        self.clock.now += 0.05
+        self.assertEqual(2, self.scheduler.due_frames())
+        self.assertAlmostEqual(0.01, self.scheduler.time_until_next_frame())
+        self.assertEqual(0, self.scheduler.stats.dropped_frames)
+
+    def test_drop(self):
+        self.scheduler.due_frames()
+        self.clock.now += 1
+        self.assertEqual(3, self.scheduler.due_frames())
+        self.assertEqual(50 - 3, self.scheduler.stats.dropped_frames)
+        self.assertAlmostEqual(0.02, self.scheduler.time_until_next_frame())
+
+    def test_limit(self):
+        self.scheduler.due_frames()
+        self.clock.now += 0.05
+        self.assertEqual(1, self.scheduler.due_frames(limit=1))
+        self.assertEqual(2, self.scheduler.stats.frames)
+        self.clock.now += 1
+        self.assertEqual(2, self.scheduler.due_frames(limit=2))
+        self.assertEqual(0, self.scheduler.stats.dropped_frames)
+        self.assertEqual(4, self.scheduler.stats.frames)
+
+    def test_stats(self):
+        stats = FrameStats()
+        for lateness in [0.001] * 99 + [0.011]:
+            stats.record(lateness)
+        summary = stats.to_dict()
+        self.assertEqual(100, summary['frames'])
+        self.assertAlmostEqual(1.1, summary['mean_lateness_ms'])
+        self.assertAlmostEqual(11, summary['p99_lateness_ms'])
+        self.assertAlmostEqual(11, summary['max_lateness_ms'])
+        self.assertIn("100 frames, 0 dropped", str(stats))
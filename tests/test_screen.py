@@ -1,5 +1,6 @@
 import unittest
 
+from chip8.display import ALL_ROWS, RENDERERS, ROW_MASK, dirty_spans, row_pixels
 from chip8.screen import Screen
 
 BLACK = (0, 0, 0, 255)
@@ -11,7 +12,7 @@ class TestScreen(unittest.TestCase):
         screen = Screen()
         self.assertEqual(32, len(screen.buffer))
         for row in range(32):
-            self.assertEqual([False] * 64, screen.buffer[row])
+            self.assertEqual(0, screen.buffer[row])
 
     def test_update(self):
         screen = Screen()
@@ -20,18 +21,31 @@ class TestScreen(unittest.TestCase):
             for col in range(64):
                 self.assertEqual(BLACK, screen.surface.get_at((col, row)))
         for row in range(32):
-            for col in range(64):
-                screen.buffer[row][col] = True
+            screen.buffer[row] = ROW_MASK
+        screen.dirty_rows = ALL_ROWS
         screen.update()
         for row in range(32):
             for col in range(64):
                 self.assertEqual(WHITE, screen.surface.get_at((col, row)))
 
+    def test_update_dirty_rows(self):
+        screen = Screen()
+        screen.update()
+        self.assertEqual(0, screen.dirty_rows)
+
+        screen.buffer[1] = ROW_MASK
+        screen.buffer[2] = ROW_MASK
+        screen.dirty_rows = 1 << 2
+        screen.update()
+        self.assertEqual(BLACK, screen.surface.get_at((0, 1)))
+        self.assertEqual(WHITE, screen.surface.get_at((0, 2)))
+        self.assertEqual(0, screen.dirty_rows)
+
     def test_scaling_factor(self):
         screen = Screen(scaling_factor=3)
         self.assertEqual(64 * 3, screen.surface.get_width())
         self.assertEqual(32 * 3, screen.surface.get_height())
-        screen.buffer[1][2] = True
+        screen.buffer[1] = 1 << (63 - 2)
         screen.update()
         for y in range(screen.surface.get_height()):
             for x in range(screen.surface.get_width()):
@@ -39,3 +53,33 @@ class TestScreen(unittest.TestCase):
                     self.assertEqual(WHITE, screen.surface.get_at((x, y)))
                 else:
                     self.assertEqual(BLACK, screen.surface.get_at((x, y)))
+
+    def test_row_pixels(self):
+        self.assertEqual([False] * 64, row_pixels(0))
+        self.assertEqual([True] * 64, row_pixels(ROW_MASK))
+        self.assertEqual([True] + [False] * 62 + [True], row_pixels(1 << 63 | 1))
+
+    def test_renderers(self):
+        with self.assertRaises(ValueError):
+            Screen(renderer="unknown")
+
+        for renderer in RENDERERS:
+            screen = Screen(scaling_factor=2, renderer=renderer)
+            screen.buffer[1] = 1 << 63 | 0b11
+            screen.buffer[31] = 1
+            screen.update()
+            for y in range(screen.surface.get_height()):
+                for x in range(screen.surface.get_width()):
+                    lit = (y // 2 == 1 and x // 2 in [0, 62, 63]) or (y // 2 == 31 and x // 2 == 63)
+                    self.assertEqual(WHITE if lit else BLACK, screen.surface.get_at((x, y)), (renderer, x, y))
+
+            screen.buffer[1] = 0
+            screen.dirty_rows = 1 << 1
+            screen.update()
+            self.assertEqual(BLACK, screen.surface.get_at((0, 2)))
+            self.assertEqual(WHITE, screen.surface.get_at((127, 63)))
+
+    def test_dirty_spans(self):
+        self.assertEqual([], list(dirty_spans(0)))
+        self.assertEqual([(0, 31)], list(dirty_spans(ALL_ROWS)))
+        self.assertEqual([(0, 0), (2, 4), (31, 31)], list(dirty_spans(1 << 0 | 0b111 << 2 | 1 << 31)))
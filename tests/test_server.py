@@ -0,0 +1,125 @@
+import asyncio
+import random
+import unittest
+
+from chip8.aio import AsyncChip8
+from chip8.chip8 import Chip8
+from chip8.server import (PRESS, SERVER_HEADER, SERVER_MAGIC, SERVER_VERSION, ServerError, Session, apply_delta,
+                          encode_delta, read_header, read_update, run_length_decode, run_length_encode, start_server)
+
+ld_F_V1 = b"\xf1\x29"
+drw_V0_V0_5 = b"\xd0\x05"
+jp_0x200 = b"\x12\x00"
+ld_V1_07 = b"\x61\x07"
+skp_V1 = b"\xe1\x9e"
+jp_0x202 = b"\x12\x02"
+jp_0x20a = b"\x12\x0a"
+DRAW_HELD_KEY = ld_V1_07 + skp_V1 + jp_0x202 + ld_F_V1 + drw_V0_V0_5 + jp_0x20a
+
+
+class TestDelta(unittest.TestCase):
+    def test_run_length(self):
+        generator = random.Random(0)
+        for data in [b"", b"\x00", b"\x01\x00\x02", bytes(300), b"\x07" * 300,
+                     bytes(generator.choice([0, 0, 0, 1, 2]) for _ in range(256))]:
+            self.assertEqual(data, run_length_decode(run_length_encode(data)))
+        self.assertEqual(b"\xfe\x00\x07", run_length_encode(bytes(127) + b"\x07"))
+        self.assertEqual(b"\x02\x01\x00\x02\x81", run_length_encode(b"\x01\x00\x02\x00\x00"))
+
+    def test_delta(self):
+        previous = (0,) * 32
+        rows = tuple(0xf0 << 40 if 3 <= row < 8 else 0 for row in range(32))
+        mask, payload = encode_delta(previous, rows)
+        self.assertEqual(0b11111000, mask)
+        # A 5-row sprite is a handful of bytes instead of a 256-byte frame.
+        self.assertLessEqual(len(payload), 16)
+        decoded = list(previous)
+        apply_delta(decoded, mask, payload)
+        self.assertEqual(list(rows), decoded)
+
+
+class TestServer(unittest.TestCase):
+    def test_loopback(self):
+        async def play():
+            server = await start_server(DRAW_HELD_KEY, port=0, cycles_per_frame=10)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            self.assertEqual((64, 32), await read_header(reader))
+            writer.write(bytes([PRESS | 0x7]))
+            rows = [0] * 32
+            frame = await asyncio.wait_for(read_update(reader, rows), 5)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return frame, rows
+
+        frame, rows = asyncio.run(play())
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=10, starting_address=0x200, headless=True)
+        chip8.load(DRAW_HELD_KEY)
+        chip8.press_key(0x7)
+        chip8.tick()
+        self.assertGreater(frame, 0)
+        self.assertEqual(chip8.screen.buffer, rows)
+
+    def test_header(self):
+        async def read(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            return await read_header(reader)
+
+        self.assertEqual((64, 32), asyncio.run(read(SERVER_HEADER.pack(SERVER_MAGIC, SERVER_VERSION, 64, 32))))
+        # A save state isn't mistaken for a frame stream.
+        snapshot = Chip8(scaling_factor=1, cycles_per_frame=1, starting_address=0x200, headless=True).cpu.snapshot()
+        with self.assertRaisesRegex(ValueError, "Not a CHIP-8 frame stream"):
+            asyncio.run(read(snapshot))
+
+    def test_session_end(self):
+        async def play():
+            server_side = {}
+
+            async def serve(reader, writer):
+                chip8 = AsyncChip8(3, 0x200, turbo=True)
+                chip8.load(ld_F_V1 + drw_V0_V0_5 + jp_0x200)
+                session = server_side['session'] = Session(chip8, reader, writer)
+                await session.run(frames=10)
+
+            server = await asyncio.start_server(serve, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await read_header(reader)
+            rows = [0] * 32
+            frames = []
+            while not reader.at_eof():
+                try:
+                    frames.append(await asyncio.wait_for(read_update(reader, rows), 5))
+                except asyncio.IncompleteReadError:
+                    break
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return frames, server_side['session']
+
+        frames, session = asyncio.run(play())
+        # The sprite is drawn and erased every other frame.
+        self.assertEqual(list(range(1, 11)), frames)
+        self.assertLess(session.bytes_sent, 10 * 40)
+
+    def test_crash(self):
+        async def play():
+            invalid = b"\x00\x00"
+            server = await start_server(ld_F_V1 + drw_V0_V0_5 + invalid, port=0, cycles_per_frame=2)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await read_header(reader)
+            rows = [0] * 32
+            await asyncio.wait_for(read_update(reader, rows), 5)
+            with self.assertRaisesRegex(ServerError, "UnknownInstruction"):
+                await asyncio.wait_for(read_update(reader, rows), 5)
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return rows
+
+        with self.assertLogs("chip8.server", "ERROR"):
+            rows = asyncio.run(play())
+        self.assertEqual(0xf0 << 56, rows[0])
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import unittest
+
+from chip8.chip8 import Chip8
+from chip8.shm import SEQUENCE, SEQUENCE_OFFSET, SharedFramebuffer, SharedFramebufferReader
+
+ld_F_V0 = b"\xf0\x29"
+drw_V0_V0_5 = b"\xd0\x05"
+jp_0x204 = b"\x12\x04"
+
+
+class TestSharedFramebuffer(unittest.TestCase):
+    def setUp(self):
+        self.framebuffer = SharedFramebuffer()
+        self.reader = SharedFramebufferReader(self.framebuffer.name)
+
+    def tearDown(self):
+        self.reader.close()
+        self.framebuffer.close()
+
+    def test_publish(self):
+        self.assertEqual((0, (0,) * 32), self.reader.read())
+        chip8 = Chip8(scaling_factor=1, cycles_per_frame=10, starting_address=0x200, headless=True)
+        chip8.load(ld_F_V0 + drw_V0_V0_5 + jp_0x204)
+        chip8.frame_hooks.append(self.framebuffer.publish)
+        for _ in range(3):
+            chip8.tick()
+        self.assertEqual(3, self.reader.frame)
+        self.assertEqual((3, tuple(chip8.screen.buffer)), self.reader.read())
+        self.assertEqual(0xf0 << 56, self.reader.read()[1][0])
+
+    def test_torn_read(self):
+        self.framebuffer.publish(1, [1] * 32)
+        SEQUENCE.pack_into(self.framebuffer.memory.buf, SEQUENCE_OFFSET, 3)
+        self.assertIsNone(self.reader.read(retries=10))
+
+    def test_other_process(self):
+        self.framebuffer.publish(7, list(range(32)))
+        reader = ("import sys; from chip8.shm import SharedFramebufferReader; "
+                  "reader = SharedFramebufferReader(sys.argv[1]); print(reader.read()); reader.close()")
+        output = subprocess.run([sys.executable, "-c", reader, self.framebuffer.name], capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(f"{(7, tuple(range(32)))}\n", output)
+        # The reader exiting doesn't unlink the block.
+        reader = SharedFramebufferReader(self.framebuffer.name)
+        self.assertEqual(7, reader.frame)
+        reader.close()
@@ -1,6 +1,15 @@
+import array
+import os
 import unittest
+from unittest import mock
 
-from chip8.sound import Sound
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = ""
+# The tests play into the dummy audio driver unless told otherwise, so they don't need a sound card.
+os.environ.setdefault('SDL_AUDIODRIVER', "dummy")
+import pygame
+
+from chip8.headless import HeadlessSound
+from chip8.sound import Sound, open_sound, square_wave
 
 
 class TestSound(unittest.TestCase):
@@ -20,3 +29,23 @@ class TestSound(unittest.TestCase):
 
         sound.update(0)
         self.assertFalse(sound.is_playing)
+
+    def test_no_audio_device(self):
+        with mock.patch("pygame.mixer.init", side_effect=pygame.error("No available audio device")):
+            with self.assertWarnsRegex(RuntimeWarning, "No available audio device"):
+                self.assertIsInstance(open_sound(), HeadlessSound)
+
+    def test_square_wave(self):
+        # 250 Hz doesn't divide 44.1 kHz: the shortest loop is 5 periods of 176.4 samples.
+        samples = array.array('h', square_wave(250, 44100, -16, 1, volume=0.5))
+        self.assertEqual(882, len(samples))
+        self.assertEqual({16383, -16383}, set(samples))
+        edges = [i for i in range(1, len(samples)) if samples[i] != samples[i - 1]]
+        self.assertEqual(9, len(edges))
+        self.assertEqual(samples[0], -samples[-1])
+
+        samples = array.array('h', square_wave(250, 48000, -16, 2))
+        self.assertEqual(2 * 192, len(samples))
+        self.assertEqual(samples[0::2], samples[1::2])
+
+        self.assertEqual({128 + 25, 128 - 25}, set(square_wave(250, 48000, 8, 1, volume=0.2)))
@@ -0,0 +1,95 @@
+import importlib.util
+import random
+import unittest
+
+from chip8.cpu import CPU, UnknownInstruction
+from chip8.headless import HeadlessKeyboard, HeadlessScreen
+
+if importlib.util.find_spec("numpy") is not None:
+    from chip8.vector import VectorCPU
+
+
+@unittest.skipIf(importlib.util.find_spec("numpy") is None, "requires numpy")
+class TestVectorCPU(unittest.TestCase):
+    def run_scalar(self, rom, seed, frames, cycles_per_frame, key=None):
+        cpu = CPU(HeadlessScreen(), HeadlessKeyboard())
+        cpu.load(rom)
+        random.seed(seed)
+        for frame in range(frames):
+            if frame == 3 and key is not None:
+                cpu.keyboard.press(key)
+            if frame == 5 and key is not None:
+                cpu.keyboard.release(key)
+                if cpu.waiting_for_keypress:
+                    cpu.key_was_pressed(key)
+            if not cpu.waiting_for_keypress:
+                cpu.decrease_timers()
+                cpu.run_cycles(cycles_per_frame)
+        return cpu
+
+    def run_vector(self, rom, seeds, frames, cycles_per_frame, keys=None):
+        vector = VectorCPU(len(seeds), seeds=seeds)
+        vector.load(rom)
+        for frame in range(frames):
+            for lane, key in enumerate(keys or []):
+                if frame == 3:
+                    vector.press(lane, key)
+                if frame == 5:
+                    vector.release(lane, key)
+            vector.run_frame(cycles_per_frame)
+        return vector
+
+    def assertLanesMatch(self, vector, cpus):
+        for lane, cpu in enumerate(cpus):
+            self.assertEqual(cpu.snapshot(), vector.to_cpu(lane).snapshot(), f"lane {lane}")
+
+    def test_matches_scalar(self):
+        rnd_V0_FF = b"\xc0\xff"
+        ld_V1_K = b"\xf1\x0a"
+        add_V2_V0 = b"\x82\x04"
+        subn_V3_V2 = b"\x83\x27"
+        shl_V4_V0 = b"\x84\x0e"
+        ld_F_V1 = b"\xf1\x29"
+        drw_V0_V2_5 = b"\xd0\x25"
+        ld_B_V2 = b"\xf2\x33"
+        ld_DT_V0 = b"\xf0\x15"
+        sne_V0_V3 = b"\x90\x30"
+        call_0x21a = b"\x22\x1a"
+        jp_0x204 = b"\x12\x04"
+        ld_I_V4 = b"\xf4\x55"
+        ret = b"\x00\xee"
+        rom = (rnd_V0_FF + ld_V1_K + add_V2_V0 + subn_V3_V2 + shl_V4_V0 + ld_F_V1 + drw_V0_V2_5 + ld_B_V2
+               + ld_DT_V0 + sne_V0_V3 + call_0x21a + jp_0x204 + ret + ld_I_V4 + ret)
+
+        seeds = [1, 2, 3, 4]
+        keys = [0x1, 0x5, 0xa, 0xf]
+        vector = self.run_vector(rom, seeds, frames=30, cycles_per_frame=7, keys=keys)
+        cpus = [self.run_scalar(rom, seed, frames=30, cycles_per_frame=7, key=key) for seed, key in zip(seeds, keys)]
+        self.assertLanesMatch(vector, cpus)
+        self.assertEqual(keys, vector.V[:, 1].tolist())
+
+    def test_rom(self):
+        with open("roms/demos/Maze [David Winter, 199x].ch8", "rb") as f:
+            rom = f.read()
+        seeds = list(range(8))
+        vector = self.run_vector(rom, seeds, frames=60, cycles_per_frame=10)
+        cpus = [self.run_scalar(rom, seed, frames=60, cycles_per_frame=10) for seed in seeds]
+        self.assertLanesMatch(vector, cpus)
+        self.assertEqual(8, len({tuple(row) for row in vector.buffer.tolist()}))
+
+    def test_unknown_instruction(self):
+        vector = VectorCPU(2)
+        vector.load(b"\x00\x00")
+        with self.assertRaises(UnknownInstruction):
+            vector.step()
+
+    def test_stack_overflow(self):
+        vector = VectorCPU(2)
+        jp_0x200 = b"\x12\x00"
+        call_0x202 = b"\x22\x02"
+        vector.load(jp_0x200 + call_0x202)
+        vector.pc[1] = 0x202
+        for _ in range(16):
+            vector.step()
+        with self.assertRaisesRegex(IndexError, "lane 1"):
+            vector.step()